@@ -17,8 +17,12 @@ import typing as T
 import sys
 import inspect
 import functools
+import gc
+import importlib
 # 3rd party
 from twisted.internet.tcp import Port
+from twisted.internet import defer
+from twisted.internet.error import ConnectionDone
 from twisted.internet.posixbase import PosixReactorBase
 from twisted.internet import reactor  # type: PosixReactorBase
 # from twisted.python.compat import intToBytes
@@ -40,6 +44,13 @@ else:
 # Application
 from .log import getLogger
 from .resources import RoutingResource
+from .lib.route_table import RouteMiss
+from .lib.route_conflicts import RouteConflict
+from .lib.thread_pools import ThreadPools, ViewThreadPool, PoolStats, DEFAULT_POOL
+from .lib.multipart import BodyLimits
+from .lib.json_codec import JSONCodec, get_codec
+from .lib import process_pools
+from .util import prefork
 # from .resources import SimpleFile, Directory
 from .lib import StrRequest, expose_method, set_prefilter, set_postfilter
 from .web_site import WebSite
@@ -60,6 +71,16 @@ WSEndpoint = T.Callable[[MessageHandler], T.Any]
 ErrorHandler = T.NewType("ErrorHandler", T.Callable[[StrRequest, failure.Failure], T.Union[bool, None]])
 
 
+class DrainResult(T.NamedTuple):
+    """
+        What was still open when `Application.drain` gave up waiting, all empty for a clean drain.
+    """
+    requests: T.List[StrRequest]
+    # Open HTTP connections
+    connections: T.List[T.Any]
+    websockets: T.List[T.Any]
+
+
 class ApplicationWebsocketMixin:
     """
     Collection of functions and utilities specific to websocket support with Texas applications.
@@ -67,6 +88,7 @@ class ApplicationWebsocketMixin:
     """
 
     WS_EXPOSED_FUNC = "WS_EXPOSED_FUNC"
+    WS_THREADED_FUNC = "WS_THREADED_FUNC"
 
     def __init__(self, *args, **kwargs):
         """
@@ -107,7 +129,8 @@ class ApplicationWebsocketMixin:
         self.ws_resource = WebSocketResource(self.ws_factory)
         self.add_resource(route, self.ws_resource)
 
-    def ws_add(self, name: str, assign_args: bool = False) -> T.Callable[[WSEndpoint], WSEndpoint]:
+    def ws_add(self, name: str, assign_args: bool = False,
+               threaded: T.Union[bool, str] = False) -> T.Callable[[WSEndpoint], WSEndpoint]:
         """
         Add a new endpoint for use with the connected websocket.
 
@@ -125,6 +148,10 @@ class ApplicationWebsocketMixin:
 
         assign_args : bool
 
+        threaded : bool or str
+            Call the endpoint in the default (True) or the named thread pool, an ask is answered with the return
+            value once it is done.
+
 
         Returns
         -------
@@ -135,7 +162,7 @@ class ApplicationWebsocketMixin:
             if assign_args is True:
                 func = self.websocket_function_arguments_decorator(func)
 
-            self.ws_endpoints[name] = func
+            self.ws_endpoints[name] = self.thread_pools.wrap(func, threaded)
             return func
 
         return processor
@@ -197,7 +224,8 @@ class ApplicationWebsocketMixin:
 
             for method_name, method in methods:
                 # Always use assign_args with ws_class's
-                self.ws_endpoints[f"{kls_name}.{method_name.lower()}"] = method
+                self.ws_endpoints[f"{kls_name}.{method_name.lower()}"] = \
+                    self.thread_pools.wrap(method, getattr(method, self.WS_THREADED_FUNC, False))
 
             return kls
 
@@ -311,26 +339,29 @@ class ApplicationWebsocketMixin:
 
         return argument_decorator
 
-    def ws_expose(self, func: callable = None, assign_args=False):
+    def ws_expose(self, func: callable = None, assign_args=False, threaded: T.Union[bool, str] = False):
         """
         See ws_class for use
 
         :param func:
         :param assign_args:
+        :param threaded: True or a thread pool name to call the method in a thread pool, see ws_add
         :return:
 
         """
 
-        if func is None and assign_args is True:
-            def processor(real_func):
-                setattr(real_func, self.WS_EXPOSED_FUNC, True)
-                magic_func = self.websocket_class_arguments_decorator(real_func)
-                return magic_func
+        def processor(real_func):
+            setattr(real_func, self.WS_EXPOSED_FUNC, True)
+            setattr(real_func, self.WS_THREADED_FUNC, threaded)
+            if assign_args is True:
+                return self.websocket_class_arguments_decorator(real_func)
+
+            return real_func
 
+        if func is None:
             return processor
 
-        setattr(func, self.WS_EXPOSED_FUNC, True)
-        return func
+        return processor(func)
 
 
 class ApplicationRoutingHelperMixin:
@@ -344,7 +375,13 @@ class ApplicationRoutingHelperMixin:
         """
 
         :param route_str: A valid URI (starts with a forward slash and no spaces)
-        :param kwargs:
+        :param kwargs: werkzeug Rule arguments (eg methods), `host="api.example.com"` puts the route in that
+            virtual host's own routing table, `threaded=True` (or a pool name) runs the view in a thread pool,
+            see `thread_pool`, and `process_pool=True` (or a pool name) runs it in a worker process, see
+            `process_pool`.   `max_content_length`, `max_form_memory_size`, and `spool_size` override the
+            application's request body limits for this route, see `set_body_limits`, and `stream_body=True` calls
+            the view as soon as the request's headers are in with the body as `request.body`, see
+            txweb.lib.body_stream
 
         :return:
 
@@ -422,21 +459,23 @@ class ApplicationRoutingHelperMixin:
 
         :param route_str:
         :param resource:
-        :param kwargs:
+        :param kwargs: werkzeug Rule arguments, plus the optional virtual `host`
         :return:
 
         """
-        return self.router.add_resource(route_str, thing=resource, route_kwargs=kwargs)
+        host = kwargs.pop("host", None)
+        return self.router.add_resource(route_str, thing=resource, route_kwargs=kwargs, host=host)
 
     add_resource = route_resource
 
-    def route_file(self, route_str: str, filePath: str, defaultType="text/html") -> File:
+    def route_file(self, route_str: str, filePath: str, defaultType="text/html", host: str = None) -> File:
         """
         Just a simple helper for a common task of serving individual files
 
         :param route_str: A valid URI route string
         :param filepath: An absolute or relative path to a file to be served over HTTP
         :param default_type: What content type should a file be served as
+        :param host: optional virtual host to serve the file on
         :return: twisted.web.static.File
 
         """
@@ -444,16 +483,16 @@ class ApplicationRoutingHelperMixin:
         assert Path(filePath).exists()
         assert Path(filePath).is_file()
         file_resource = File(filePath, defaultType=defaultType)
-        return self.router.add(route_str)(file_resource)
+        return self.router.add(route_str, host=host)(file_resource)
 
     add_file = route_file
 
-    def route_directory(self, route_str: str, dirPath: T.Union[str, Path]) -> File:
+    def route_directory(self, route_str: str, dirPath: T.Union[str, Path], host: str = None) -> File:
         """
         TODO - remove calls to `add_staticdir2` and just use `add_staticdir`
         :param route_str:
         :param dirPath:
-        :param recurse:
+        :param host: optional virtual host to serve the directory on
         :return:
 
         """
@@ -463,7 +502,7 @@ class ApplicationRoutingHelperMixin:
 
         directory_resource = File(dirPath)
 
-        self.router.add_directory(route_str, directory_resource)
+        self.router.add_directory(route_str, directory_resource, host=host)
 
         return directory_resource
 
@@ -491,6 +530,7 @@ class ApplicationErrorHandlingMixin:
 
         self.error_handlers = dict(default=self.default_handler_cls(self))
         self.site.setErrorHandler(self.processingFailed)
+        self.site.setMissHandler(self.processingMiss)
 
     def handle_error(self, error_type: T.Union[HTTPCode, int, Exception, str], write_over=False) -> T.Callable:
         """
@@ -568,6 +608,30 @@ class ApplicationErrorHandlingMixin:
 
         return True
 
+    def processingMiss(self, request: StrRequest, miss: RouteMiss):
+        """
+        Internal method
+
+        Called when the router found no match for the request.   If the application has a handler for the code
+        (or its HTTPCode class) the miss goes through processingFailed like any other error, otherwise the default
+        handler writes the response straight away without the cost of raising and capturing a Failure.
+
+        :param request:
+        :param miss:
+        :return:
+        """
+        default_handler = self.error_handlers['default']
+
+        if miss.exception_class in self.error_handlers \
+                or miss.code in self.error_handlers \
+                or hasattr(default_handler, "write_http_code") is False:
+            return self.processingFailed(request, failure.Failure(miss.to_exception()))
+
+        default_handler.write_http_code(request, miss.response_exception())
+        request.ensureFinished()
+
+        return True
+
 
 class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin, ApplicationWebsocketMixin):
     """
@@ -578,12 +642,18 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
     """
 
     NOT_DONE_YET = NOT_DONE_YET
+    # Seconds between checks for in-flight requests while draining
+    DRAIN_POLL_INTERVAL: T.ClassVar[float] = 0.1
+    # Default seconds `shutdown` waits for in-flight requests and websockets
+    SHUTDOWN_TIMEOUT: T.ClassVar[float] = 30.0
 
     def __init__(self,
                  namespace: str = None,
                  twisted_reactor: T.Optional[PosixReactorBase] = None,
                  request_factory: StrRequest = StrRequest,
-                 enable_debug: bool = False
+                 enable_debug: bool = False,
+                 routing_engine: str = "werkzeug",
+                 json_codec: T.Union[str, JSONCodec, None] = None
                  ):
         """
         Similar to Klein and its influence Flask, the goal is to consolidate
@@ -596,15 +666,23 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
         :param twisted_reactor:
         :param request_factory:
         :param enable_debug:
+        :param routing_engine: URL matching engine for the router, "werkzeug" or "radix"
+        :param json_codec: "orjson", "ujson", "json", or a JSONCodec, the fastest one installed by default.
+            See json_codec
         """
 
-        self._router = RoutingResource()
+        self._reactor = twisted_reactor or reactor  # type: PosixReactorBase
+        self.thread_pools = ThreadPools(self._reactor)
+        self.process_pools = process_pools.ProcessPools(self._reactor)
+        self._router = RoutingResource(engine=routing_engine, thread_pools=self.thread_pools,
+                                       process_pools=self.process_pools)
         self._site = WebSite(self._router, request_factory=Application.request_factory_partial(self, request_factory))
         self._router.site = self._site
-        self._reactor = twisted_reactor or reactor  # type: PosixReactorBase
+        self.json_codec = json_codec
 
         self.name = namespace
-        self._listening_port = None
+        self._listening_ports = []  # type: T.List[Port]
+        self._shutdown_on_stop = False
 
         self._enable_debug = enable_debug
         if namespace is not None:
@@ -619,6 +697,7 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
         # Hooks
         self._before_render_handlers = []
         self._after_render_handlers = []
+        self._preload_handlers = []
 
         self.__post_init__()
 
@@ -645,6 +724,7 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
             request.add_before_render(app._call_before_render)
             request.add_after_render(app._call_after_render)
             request.site = app.site
+            app.site.track_request(request)
             return request
 
         return partial
@@ -667,6 +747,20 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
         """
         return self._site
 
+    @property
+    def json_codec(self) -> JSONCodec:
+        """
+            The JSON encoder/decoder used by request.json, request.writeJSON, and the websocket protocol.
+
+            Can be set to "orjson", "ujson", "json", None for the fastest one installed, or a
+            txweb.lib.json_codec.JSONCodec.
+        """
+        return self._site.json_codec
+
+    @json_codec.setter
+    def json_codec(self, codec: T.Union[str, JSONCodec, None]) -> None:
+        self._site.json_codec = get_codec(codec)
+
     @property
     def reactor(self) -> PosixReactorBase:
         """
@@ -679,15 +773,301 @@ class Application(ApplicationRoutingHelperMixin, ApplicationErrorHandlingMixin,
     @reactor.setter
     def reactor(self, active_reactor: PosixReactorBase):
         self._reactor = active_reactor
+        self.thread_pools.reactor = active_reactor
+        self.process_pools.reactor = active_reactor
 
-    def listenTCP(self, port: int, interface: str = "127.0.0.1") -> Port:
+    def thread_pool(self, name: str = DEFAULT_POOL, min_threads: int = None, max_threads: int = None) -> ViewThreadPool:
+        """
+            Create or resize the thread pool used by `threaded=name` views and websocket endpoints, `threaded=True`
+            uses the pool named "default".   Pools are created with ViewThreadPool's default size on first use.
+
+        Parameters
+        ----------
+        name: str
+        min_threads: int
+        max_threads: int
+
+        Returns
+        -------
+        The pool, its `stats()` reports queue depth, active workers, and wait times
+        """
+        return self.thread_pools.get(name, min_threads, max_threads)
+
+    def thread_pool_stats(self) -> T.Dict[str, PoolStats]:
+        return self.thread_pools.stats()
+
+    def process_pool(self, name: str = process_pools.DEFAULT_POOL, **settings) -> process_pools.ViewProcessPool:
+        """
+            Create or configure the worker process pool used by `process_pool=name` views, `process_pool=True`
+            uses the pool named "default".   Settings can only be changed before the pool's first call.
+
+        Parameters
+        ----------
+        name: str
+        settings:
+            workers, max_queue, max_tasks_per_child, and start_method, see txweb.lib.process_pools.ViewProcessPool
+
+        Returns
+        -------
+        The pool, its `stats()` reports pending, completed, failed, and shed (503'd) calls
+        """
+        return self.process_pools.get(name, **settings)
+
+    def process_pool_stats(self) -> T.Dict[str, process_pools.PoolStats]:
+        return self.process_pools.stats()
+
+    def set_body_limits(self, **limits: T.Optional[int]) -> BodyLimits:
+        """
+            Set the request body limits for every route that does not set its own.
+
+            A body over max_content_length or a multipart form with more than max_form_memory_size bytes of fields
+            gets a 413 Payload Too Large response.   A Content-Length over the limit is refused as soon as the headers
+            are in, without a 100 Continue and without reading any of the body.   File parts of a multipart body bigger than spool_size bytes are
+            spooled to a temporary file instead of being kept in memory.
+
+        Parameters
+        ----------
+        limits:
+            max_content_length, max_form_memory_size, and spool_size in bytes, None for no limit
+
+        Returns
+        -------
+        The new limits
+        """
+        self.site.default_body_limits = self.site.default_body_limits._replace(**limits)
+        return self.site.default_body_limits
+
+    def listenTCP(self, port: int, interface: str = "127.0.0.1", shutdown_timeout: float = None) -> Port:
         """
             Convenience helper which adds the HTTP protocol factory to the reactor and set it to listen to the provided
             interface and port
 
+            The routing table is frozen first, see `freeze`, and `shutdown` is run when the reactor stops
+
+        """
+        self.freeze()
+        listening_port = self.reactor.listenTCP(port, self._site, interface=interface)
+        self._listening_ports.append(listening_port)
+        self.shutdown_on_stop(shutdown_timeout)
+        return listening_port
+
+    def shutdown_on_stop(self, timeout: float = None) -> None:
+        """
+            Have the reactor wait on `shutdown(timeout)` before it shuts down, only the first call does anything.
+        """
+        if self._shutdown_on_stop is False:
+            self._shutdown_on_stop = True
+            self.reactor.addSystemEventTrigger("before", "shutdown", self.shutdown,
+                                               self.SHUTDOWN_TIMEOUT if timeout is None else timeout)
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> defer.Deferred:
+        """
+            Wind the application down without abandoning what it is in the middle of, called when the reactor stops.
+
+            Asks still waiting on a websocket client are failed with ConnectionDone, then everything `drain` does:
+            the port stops listening, websockets are sent a close frame, and in-flight (NOT_DONE_YET) requests get up
+            to `timeout` seconds to finish.   Whatever is still open at the deadline is logged and then dropped by the
+            reactor.
+
+        Returns
+        -------
+        A Deferred firing with a DrainResult of what was still open
+        """
+        websockets = list(self.ws_factory.connections) if self.ws_factory is not None else []
+        reason = failure.Failure(ConnectionDone("Server is shutting down"))
+        failed_asks = sum(protocol.failAsks(reason) for protocol in websockets)
+        if failed_asks:
+            log.info("Failed {count} websocket asks still waiting on a response", count=failed_asks)
+
+        return self.drain(timeout).addCallback(self._report_shutdown)
+
+    @staticmethod
+    def _report_shutdown(result: DrainResult) -> DrainResult:
+        if result.requests or result.connections or result.websockets:
+            log.warn("Shutdown deadline passed with {requests} requests ({uris}), {connections} connections, and "
+                     "{websockets} websockets still open",
+                     requests=len(result.requests), connections=len(result.connections),
+                     websockets=len(result.websockets),
+                     uris=", ".join(f"{request.method.decode()} {request.uri.decode()}"
+                                    for request in result.requests))
+        return result
+
+    def drain(self, timeout: float = 30.0) -> defer.Deferred:
+        """
+            Stop accepting connections on every port, send a "going away" close frame to every websocket, and wait up
+            to `timeout` seconds for in-flight HTTP requests to finish and the websockets to close.
+
+            HTTP connections are closed as they go idle, after their last response is flushed, the reactor would
+            otherwise drop whatever is still buffered when it shuts down.   Connections accepted just before the port
+            closed are waited on for their first request.
+
+        Returns
+        -------
+        A Deferred firing with a DrainResult of whatever was still open when the wait ended
+        """
+        ports, self._listening_ports = self._listening_ports, []
+        stopping = []
+        for port in ports:
+            stopping.append(defer.maybeDeferred(port.stopListening))
+            stopping[-1].addErrback(lambda reason: log.failure("Failed to stop listening", reason))
+        stopped = defer.DeferredList(stopping)
+
+        websockets = self.ws_factory.connections if self.ws_factory is not None else set()
+        for protocol in list(websockets):
+            protocol.sendClose(protocol.CLOSE_STATUS_CODE_GOING_AWAY, "Server is shutting down")
+
+        deadline = self.reactor.seconds() + timeout
+        finished = defer.Deferred()
+
+        def check(_=None):
+            self._site.close_idle_connections()
+            requests, connections = self._site.in_flight, self._site.connections
+            if (requests or connections or websockets) and self.reactor.seconds() < deadline:
+                self.reactor.callLater(self.DRAIN_POLL_INTERVAL, check)
+            else:
+                finished.callback(DrainResult(requests, connections, list(websockets)))
+
+        stopped.addCallback(check)
+        return finished
+
+    def run(self, port: int = 8080, interface: str = "127.0.0.1", workers: int = 1, reuse_port: bool = False,
+            backlog: int = 50, stop_timeout: float = 30.0, preload: bool = True,
+            preload_modules: T.Iterable[str] = (), drain_timeout: float = None) -> int:
+        """
+            Listen on `port` and run the reactor until it is stopped, blocks.
+
+            With workers > 1 this process binds the port, forks that many children that each run their own reactor
+            and serve the same (frozen) routes from the same socket, and then supervises them: crashed children are
+            replaced and stop/reload signals are passed on, see txweb.util.prefork.   Each child re-initializes the
+            reactor it inherited, triggers added before the fork (addSystemEventTrigger, callWhenRunning) carry over.
+
+            SIGHUP reloads without downtime: this program is started again in place with the listening socket, its
+            new children start serving, and the old ones stop accepting and `drain` before they exit.
+
+        Parameters
+        ----------
+        port: int
+        interface: str
+        workers: int
+            Number of reactor processes, 1 runs in this process without forking
+        reuse_port: bool
+            Each child binds its own SO_REUSEPORT socket instead of sharing the parent's, the kernel then spreads
+            connections evenly between children
+        backlog: int
+        stop_timeout: float
+            Seconds children get to finish after SIGTERM/SIGINT or a reload before they are killed
+        preload: bool
+            Call `warm_up(preload_modules)` before forking so the children share everything it loads
+        preload_modules: list of str
+            See warm_up
+        drain_timeout: float
+            Seconds `shutdown` waits on in-flight requests and websockets, a second less than stop_timeout by
+            default so a stopping child exits on its own before it would be killed
+
+        Returns
+        -------
+        The exit code, non zero if children had to be killed
+        """
+        if drain_timeout is None:
+            drain_timeout = max(stop_timeout - 1.0, 0.0)
+
+        if workers <= 1:
+            self.listenTCP(port, interface=interface, shutdown_timeout=drain_timeout)
+            self.reactor.run()
+            return 0
+
+        if preload:
+            self.warm_up(preload_modules)
+        else:
+            self.freeze()
+
+        # Reserves the address, children with reuse_port bind their own listening sockets to it.   After a reload
+        #  it is the socket the previous program bound
+        sock = prefork.inherited_socket()
+        if sock is None:
+            sock = prefork.bind_socket(port, interface, backlog, reuse_port=reuse_port, listen=reuse_port is False)
+
+        def worker_main(_slot: int) -> int:
+            prefork.reinit_reactor(self.reactor)
+            if reuse_port:
+                child_sock = prefork.bind_socket(port, interface, backlog, reuse_port=True)
+                sock.close()
+            else:
+                child_sock = sock
+
+            self._listening_ports.append(
+                self.reactor.adoptStreamPort(child_sock.fileno(), child_sock.family, self._site))
+            # adoptStreamPort works on a duplicate of the descriptor
+            child_sock.close()
+
+            # Twisted turns SIGTERM into reactor.stop(), which waits on shutdown() before shutting down
+            self.shutdown_on_stop(drain_timeout)
+            self.reactor.callWhenRunning(supervisor.notify_ready)
+            self.reactor.run()
+            return 0
+
+        supervisor = prefork.Supervisor(worker_main, workers, stop_timeout=stop_timeout, listen_fd=sock.fileno())
+        try:
+            return supervisor.run()
+        finally:
+            sock.close()
+
+    def preload(self, func: T.Callable[[Application], None]) -> T.Callable[[Application], None]:
+        """
+        Decorator for a function that loads data the application needs at runtime (reference tables, model
+        weights, configuration) which warm_up calls once before the worker processes are forked.
+
+        Arguments:
+            func: a callable that expects to receive the Application
+
+        """
+        self._preload_handlers.append(func)
+        return func
+
+    def warm_up(self, modules: T.Iterable[str] = (), freeze_gc: bool = True) -> None:
+        """
+            Load everything the workers of a pre-forked server need while still in the parent process, so the
+            memory holding it is shared copy-on-write by the children instead of each child allocating its own.
+
+            In order: imports `modules` (eg view modules that are otherwise imported lazily), calls every `preload`
+            hook, freezes the route table, compiles every Jinja2 template if txweb.util.templating is in use, and
+            finally moves everything allocated so far into the garbage collector's permanent generation with
+            gc.freeze() so the collector running in a child never writes to (and so copies) those pages.
+
+            View classes added with add_class and Resource classes are already instantiated when they are added.
+
+        Parameters
+        ----------
+        modules: list of str
+            Module names to import
+        freeze_gc: bool
+            Call gc.freeze() at the end, see https://docs.python.org/3/library/gc.html#gc.freeze
+        """
+        for module_name in modules:
+            importlib.import_module(module_name)
+
+        for func in self._preload_handlers:
+            func(self)
+
+        self.freeze()
+
+        templating = sys.modules.get("txweb.util.templating")
+        if templating is not None:
+            templating.precompile_templates()
+
+        if freeze_gc:
+            gc.collect()
+            gc.freeze()
+
+    def freeze(self) -> T.List[RouteConflict]:
+        """
+            Compile the routing table and refuse any further routes, resources, or classes being added.
+
+            Called automatically by listenTCP so startup pays the compilation cost instead of the first requests.
+            Shadowed or ambiguous routes are logged as warnings and returned.
+
         """
-        self._listening_port = self.reactor.listenTCP(port, self._site, interface=interface)
-        return self._listening_port
+        return self._router.freeze()
 
     def before_render(self, func: T.Callable[[StrRequest], None]):
         """
@@ -0,0 +1,8 @@
+"""
+    Micro-benchmarks for txweb internals, each module is runnable with `python -m txweb.benchmarks.<name>`
+
+    Results are written as JSON so a run can be compared against a saved baseline, see `compare`.
+"""
+from .common import compare, load_results, save_results, Comparison
+
+__ALL__ = ["compare", "load_results", "save_results", "Comparison"]
@@ -0,0 +1,148 @@
+"""
+    Shared plumbing for the benchmark modules: timing, allocation sampling, and the JSON result format.
+
+    A results file looks like
+
+    ```json
+        {
+            "meta": {"benchmark": "routing", "python": "3.11.7", "created": "..."},
+            "results": {"werkzeug:1000": {"hit_ns": 5120.3, ...}, ...}
+        }
+    ```
+
+    Every metric is "lower is better" so two files can be compared key by key.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import typing as T
+from datetime import datetime
+from pathlib import Path
+
+Results = T.Dict[str, T.Dict[str, float]]
+
+
+class Comparison(T.NamedTuple):
+    """
+        One metric of one benchmark case compared against the baseline.
+    """
+    case: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """
+            Relative change, 0.10 is 10% slower/bigger than the baseline.
+        """
+        if self.baseline == 0:
+            return 0.0 if self.current == 0 else float("inf")
+        return (self.current - self.baseline) / self.baseline
+
+    def __str__(self):
+        return f"{self.case:<24} {self.metric:<28} {self.baseline:>14.1f} {self.current:>14.1f} {self.change:>+8.1%}"
+
+
+def time_calls(func: T.Callable[[T.Any], T.Any], items: T.Sequence[T.Any], repeat: int = 3) -> float:
+    """
+        Call func once per item, `repeat` times over, and return the best average in nanoseconds per call.
+
+        The best run is used rather than the mean as anything slower than it is noise from the rest of the system.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / max(len(items), 1)
+
+
+def allocations(func: T.Callable[[T.Any], T.Any], items: T.Sequence[T.Any]) -> T.Dict[str, float]:
+    """
+        Sample memory behaviour per call with tracemalloc.
+
+    Returns
+    -------
+    peak_bytes_per_call: the average high water mark of memory allocated during a call, ie transient garbage
+    retained_blocks_per_call: memory blocks still alive after all calls, averaged, ie growth of caches or leaks
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing is False:
+        tracemalloc.start()
+
+    try:
+        peak_total = 0
+        blocks_before = sys.getallocatedblocks()
+        for item in items:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(item)
+            peak_total += tracemalloc.get_traced_memory()[1] - before
+        blocks_after = sys.getallocatedblocks()
+    finally:
+        if was_tracing is False:
+            tracemalloc.stop()
+
+    count = max(len(items), 1)
+    return {
+        "peak_bytes_per_call": peak_total / count,
+        "retained_blocks_per_call": max(blocks_after - blocks_before, 0) / count,
+    }
+
+
+def save_results(path: T.Union[str, Path], benchmark: str, results: Results,
+                 meta: T.Optional[T.Dict[str, T.Any]] = None) -> T.Dict[str, T.Any]:
+    document = {
+        "meta": {
+            "benchmark": benchmark,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            **(meta or {}),
+        },
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(document, indent=2, sort_keys=True))
+    return document
+
+
+def load_results(path: T.Union[str, Path]) -> Results:
+    return json.loads(Path(path).read_text())["results"]
+
+
+def compare(baseline: Results, current: Results) -> T.List[Comparison]:
+    """
+        Pair up every metric present in both result sets.
+    """
+    comparisons = []
+    for case, metrics in sorted(current.items()):
+        for metric, value in sorted(metrics.items()):
+            if case in baseline and metric in baseline[case]:
+                comparisons.append(Comparison(case, metric, baseline[case][metric], value))
+
+    return comparisons
+
+
+def report(comparisons: T.List[Comparison], threshold: float) -> bool:
+    """
+        Print the comparison table, returns False if anything regressed by more than `threshold`.
+    """
+    print(f"{'case':<24} {'metric':<28} {'baseline':>14} {'current':>14} {'change':>8}")
+    regressed = False
+    for comparison in comparisons:
+        flag = ""
+        if comparison.change > threshold:
+            regressed = True
+            flag = "  <-- regression"
+        print(f"{comparison}{flag}")
+
+    return regressed is False
@@ -0,0 +1,181 @@
+"""
+    Pre-fork memory benchmark, Linux only.
+
+    Forks N workers the way `Application.run(workers=N)` does and measures how much memory each one holds privately
+    after serving some traffic in three modes:
+
+    no_preload: every worker builds the application itself after the fork
+    preload_no_gc_freeze: the application is built and warmed up in the parent, `warm_up(freeze_gc=False)`
+    preload: as above with gc.freeze(), what `Application.run(workers=N)` does
+
+    ```
+        python -m txweb.benchmarks.prefork_memory --workers 4 --output prefork.json
+        python -m txweb.benchmarks.prefork_memory --workers 4 --baseline prefork.json
+    ```
+
+    Reported per mode and worker count, all lower is better:
+
+    uss_kb: unique set size, memory only that worker holds (Private_Clean + Private_Dirty), averaged over workers
+    pss_kb: proportional set size, private memory plus each worker's share of the memory shared with the others
+
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import random
+import signal
+import sys
+import typing as T
+from pathlib import Path
+
+from txweb.application import Application
+
+from . import routing
+from .common import save_results, load_results, compare, report, Results
+
+NO_PRELOAD, PRELOAD_NO_GC_FREEZE, PRELOAD = "no_preload", "preload_no_gc_freeze", "preload"
+
+
+def read_memory(pid: int) -> T.Dict[str, float]:
+    """
+        USS and PSS in kilobytes from /proc/<pid>/smaps_rollup, or the slower full smaps on older kernels.
+    """
+    rollup = Path(f"/proc/{pid}/smaps_rollup")
+    source = rollup if rollup.exists() else Path(f"/proc/{pid}/smaps")
+
+    totals = {"Private_Clean": 0, "Private_Dirty": 0, "Pss": 0}
+    for line in source.read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key in totals:
+            totals[key] += int(value.split()[0])
+
+    return {"uss_kb": float(totals["Private_Clean"] + totals["Private_Dirty"]), "pss_kb": float(totals["Pss"])}
+
+
+def build_app(route_count: int, reference_rows: int) -> T.Tuple[Application, T.List[T.Tuple[str, int]]]:
+    """
+        routing.build_app's synthetic routes plus a preload hook loading some reference data.
+    """
+    app, routes = routing.build_app(route_count)
+
+    @app.preload
+    def load_reference_data(application):
+        application.reference_data = {f"key{row}": {"id": row, "name": f"row {row}", "tags": [row % 7, row % 11]}
+                                      for row in range(reference_rows)}
+
+    return app, routes
+
+
+def serve(app: Application, routes: T.List[T.Tuple[str, int]], request_count: int, seed: int) -> None:
+    """
+        What a worker does with its share of memory: route some traffic and use the reference data.
+    """
+    hits, misses = routing.make_traffic(routes, request_count, seed=seed)
+    for request in hits + misses:
+        app.router.getChildWithDefault(None, request)
+
+    rnd = random.Random(seed)
+    for _ in range(request_count):
+        app.reference_data.get(f"key{rnd.randrange(len(app.reference_data))}")
+
+    gc.collect()
+
+
+def run_case(mode: str, workers: int, route_count: int, reference_rows: int, request_count: int,
+             seed: int) -> T.Dict[str, float]:
+    preload = mode != NO_PRELOAD
+    app = routes = None
+    if preload:
+        app, routes = build_app(route_count, reference_rows)
+        app.warm_up(freeze_gc=mode == PRELOAD)
+
+    read_fd, write_fd = os.pipe()
+    children = []
+    try:
+        for slot in range(workers):
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover - child
+                try:
+                    os.close(read_fd)
+                    if preload:
+                        serve(app, routes, request_count, seed + slot)
+                    else:
+                        worker_app, worker_routes = build_app(route_count, reference_rows)
+                        worker_app.warm_up(freeze_gc=False)
+                        serve(worker_app, worker_routes, request_count, seed + slot)
+                    os.write(write_fd, b".")
+                    signal.pause()
+                finally:
+                    os._exit(0)  # pylint: disable=W0212
+
+            children.append(pid)
+
+        ready = b""
+        while len(ready) < workers:
+            chunk = os.read(read_fd, workers)
+            if not chunk:
+                raise RuntimeError("A worker exited before it was measured")
+            ready += chunk
+
+        memory = [read_memory(pid) for pid in children]
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+        for pid in children:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+        if mode == PRELOAD:
+            gc.unfreeze()
+
+    return {metric: sum(sample[metric] for sample in memory) / len(memory) for metric in memory[0]}
+
+
+def run(workers: T.Iterable[int] = (4,), route_count: int = 1000, reference_rows: int = 50000,
+        request_count: int = 2000, seed: int = 0) -> Results:
+    if Path("/proc/self/smaps").exists() is False:
+        raise EnvironmentError("The pre-fork memory benchmark reads /proc/<pid>/smaps and only runs on Linux")
+
+    results = {}
+    for worker_count in workers:
+        for mode in (NO_PRELOAD, PRELOAD_NO_GC_FREEZE, PRELOAD):
+            results[f"{mode}:{worker_count}"] = run_case(mode, worker_count, route_count, reference_rows,
+                                                         request_count, seed)
+
+    return results
+
+
+def main(argv: T.Optional[T.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[4])
+    parser.add_argument("--routes", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=50000, help="reference data rows loaded by the preload hook")
+    parser.add_argument("--requests", type=int, default=2000, help="requests routed by each worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previously written JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="exit with status 1 if a metric is this much worse than the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.workers, args.routes, args.rows, args.requests, args.seed)
+
+    print(f"{'case':<24} {'uss_kb':>12} {'pss_kb':>12}")
+    for case, metrics in results.items():
+        print(f"{case:<24} {metrics['uss_kb']:>12.0f} {metrics['pss_kb']:>12.0f}")
+
+    if args.output:
+        save_results(args.output, "prefork_memory", results, meta={"routes": args.routes, "rows": args.rows,
+                                                                    "requests": args.requests})
+
+    if args.baseline:
+        if report(compare(load_results(args.baseline), results), args.threshold) is False:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+    Routing micro-benchmark.
+
+    Builds an Application with N synthetic routes (static paths, int and string converters, add_class submounts,
+    and add_directory rules), freezes it the same way listenTCP does, and then drives
+    `RoutingResource.getChildWithDefault` with a Zipf distributed mix of paths plus a share of 404/405/redirect
+    misses.
+
+    ```
+        python -m txweb.benchmarks.routing --routes 100 1000 10000 --output routing.json
+        python -m txweb.benchmarks.routing --routes 1000 --baseline routing.json
+    ```
+
+    Reported per engine and route count, all lower is better:
+
+    build_ms / freeze_ms: startup cost of adding the routes and of Application.freeze
+    mixed_ns / hit_ns / miss_ns: nanoseconds per getChildWithDefault call for all traffic, matches only, and
+        misses only, after the traffic has been seen once so mostly static index and match cache hits
+    engine_ns: the same traffic straight through the matching engine, bypassing the static index and match cache
+    cold_ns: nanoseconds per getChildWithDefault call for int converter paths that were never requested before, so
+        the match cache misses (and evicts) every time
+    peak_bytes_per_match / retained_blocks_per_match: see txweb.benchmarks.common.allocations
+    cache_miss_ratio: share of non static requests the route match cache could not answer
+
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import typing as T
+from pathlib import Path
+
+from txweb.application import Application
+from txweb.lib.view_class_assembler import expose
+
+from .common import time_calls, allocations, save_results, load_results, compare, report, Results
+
+HERE = Path(__file__).parent
+
+# Share of each kind of route, by index modulo 20
+STATIC, INT, STRING, CLASS, DIRECTORY = "static", "int", "string", "class", "directory"
+ROUTE_MIX = [STATIC] * 8 + [INT] * 5 + [STRING] * 3 + [CLASS] * 2 + [DIRECTORY] * 2
+
+
+class HostAddress(T.NamedTuple):
+    host: str
+    port: int
+
+
+class BenchRequest:
+    """
+        Just enough of StrRequest for RoutingResource, so only routing is measured.
+    """
+    __slots__ = ("method", "path", "rule", "route_args", "postpath", "route_miss")
+
+    HOST = HostAddress("127.0.0.1", 80)
+
+    def __init__(self, method: bytes, path: bytes):
+        self.method = method
+        self.path = path
+        self.rule = None
+        self.route_args = None
+        self.postpath = []
+        self.route_miss = None
+
+    def getHost(self):  # pylint: disable=C0103
+        return self.HOST
+
+    @staticmethod
+    def getRequestHostname():  # pylint: disable=C0103
+        return b"bench.local"
+
+    @staticmethod
+    def isSecure():  # pylint: disable=C0103
+        return False
+
+
+def _view(name: str) -> T.Callable:
+    def view(request, **kwargs):  # pylint: disable=W0613
+        return b""
+
+    view.__name__ = view.__qualname__ = name
+    return view
+
+
+def _view_class(name: str) -> type:
+    def listing(self, request):  # pylint: disable=W0613
+        return b""
+
+    def detail(self, request, pk):  # pylint: disable=W0613
+        return b""
+
+    return type(name, (), {"listing": expose("/list")(listing), "detail": expose("/<int:pk>")(detail)})
+
+
+def build_app(route_count: int, engine: str = "werkzeug") -> T.Tuple[Application, T.List[T.Tuple[str, int]]]:
+    """
+        Build an application with `route_count` synthetic routes.
+
+    Returns
+    -------
+    The application and a list of (kind, index) for every route added
+    """
+    app = Application(routing_engine=engine)
+    routes = []
+
+    for index in range(route_count):
+        kind = ROUTE_MIX[index % len(ROUTE_MIX)]
+        if kind == STATIC:
+            app.route(f"/static{index}/page")(_view(f"static{index}"))
+        elif kind == INT:
+            app.route(f"/items{index}/<int:item_id>", methods=["GET"])(_view(f"items{index}"))
+        elif kind == STRING:
+            app.route(f"/users{index}/<name>/profile")(_view(f"users{index}"))
+        elif kind == CLASS:
+            app.add_class(f"/cls{index}")(_view_class(f"BenchView{index}"))
+        else:
+            app.route_directory(f"/files{index}/", HERE)
+
+        routes.append((kind, index))
+
+    return app, routes
+
+
+def sample_hit(kind: str, index: int, rnd: random.Random) -> BenchRequest:
+    if kind == STATIC:
+        path = f"/static{index}/page"
+    elif kind == INT:
+        path = f"/items{index}/{rnd.randint(1, 500)}"
+    elif kind == STRING:
+        path = f"/users{index}/user{rnd.randint(1, 200)}/profile"
+    elif kind == CLASS:
+        path = f"/cls{index}/list" if rnd.random() < 0.5 else f"/cls{index}/{rnd.randint(1, 500)}"
+    else:
+        path = f"/files{index}/css/site{rnd.randint(1, 50)}.css"
+
+    return BenchRequest(b"GET", path.encode())
+
+
+def sample_miss(routes: T.List[T.Tuple[str, int]], rnd: random.Random) -> BenchRequest:
+    roll = rnd.random()
+    if roll < 0.7:
+        return BenchRequest(b"GET", f"/no/such/page{rnd.randint(1, 1000)}".encode())
+
+    kind, index = rnd.choice(routes)
+    if roll < 0.9 and kind == INT:
+        # GET only rule, 405
+        return BenchRequest(b"POST", f"/items{index}/{rnd.randint(1, 500)}".encode())
+    elif kind == DIRECTORY:
+        # missing trailing slash, 308 redirect
+        return BenchRequest(b"GET", f"/files{index}".encode())
+
+    return BenchRequest(b"GET", f"/{kind}{index}/missing/{rnd.randint(1, 1000)}".encode())
+
+
+def make_traffic(routes: T.List[T.Tuple[str, int]], count: int, miss_ratio: float = 0.1, zipf_s: float = 1.1,
+                 seed: int = 0) -> T.Tuple[T.List[BenchRequest], T.List[BenchRequest]]:
+    """
+        Zipf distributed hits over a shuffled popularity ranking of the routes, so hot routes are spread across
+        the whole table instead of being the first ones registered, plus `miss_ratio` unmatched requests.
+
+    Returns
+    -------
+    (hits, misses)
+    """
+    rnd = random.Random(seed)
+    ranking = list(routes)
+    rnd.shuffle(ranking)
+    weights = [1 / (rank ** zipf_s) for rank in range(1, len(ranking) + 1)]
+
+    miss_count = int(count * miss_ratio)
+    hits = [sample_hit(kind, index, rnd) for kind, index in rnd.choices(ranking, weights, k=count - miss_count)]
+    misses = [sample_miss(routes, rnd) for _ in range(miss_count)]
+    return hits, misses
+
+
+def make_cold_traffic(routes: T.List[T.Tuple[str, int]], count: int, batch: int = 0,
+                      seed: int = 0) -> T.List[BenchRequest]:
+    """
+        `count` requests for int converter routes, every one with an id make_traffic never produces and no other
+        batch repeats, so none of them can be answered from the match cache.
+    """
+    rnd = random.Random(seed)
+    dynamic = [(kind, index) for kind, index in routes if kind in (INT, CLASS)]
+    if not dynamic:
+        return []
+
+    first_id = 1_000_000 + batch * count
+    requests = []
+    for number, (kind, index) in enumerate(rnd.choices(dynamic, k=count)):
+        prefix = "items" if kind == INT else "cls"
+        requests.append(BenchRequest(b"GET", f"/{prefix}{index}/{first_id + number}".encode()))
+
+    return requests
+
+
+def engine_call(router: T.Any, request: BenchRequest) -> T.Callable[[], T.Any]:
+    """
+        A call that matches request with its table's engine alone, the way RouteTable.match does on a cache miss.
+    """
+    table = router._table_for(request)  # pylint: disable=W0212
+    bind_key = table.bind_key(request)
+    path_info = request.path.decode("utf-8")
+    method = request.method.decode("utf-8").upper()
+    return lambda: table.engine_match(request, bind_key, path_info, method)
+
+
+def run_case(route_count: int, engine: str, request_count: int, miss_ratio: float, seed: int,
+             repeat: int = 3) -> T.Dict[str, float]:
+    started = time.perf_counter()
+    app, routes = build_app(route_count, engine)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    app.freeze()
+    freeze_ms = (time.perf_counter() - started) * 1000
+
+    hits, misses = make_traffic(routes, request_count, miss_ratio, seed=seed)
+    mixed = hits + misses
+    random.Random(seed).shuffle(mixed)
+
+    router = app.router
+
+    def route(request: BenchRequest):
+        return router.getChildWithDefault(None, request)
+
+    # warm up adapters and caches the way a running server would be
+    for request in mixed:
+        route(request)
+
+    results = {
+        "build_ms": build_ms,
+        "freeze_ms": freeze_ms,
+        "mixed_ns": time_calls(route, mixed, repeat),
+        "hit_ns": time_calls(route, hits, repeat),
+        "miss_ns": time_calls(route, misses, repeat),
+        "engine_ns": time_calls(lambda call: call(), [engine_call(router, request) for request in mixed], repeat),
+    }
+
+    # A fresh batch per run, a repeated one would be answered by the cache the second time
+    cold = [make_cold_traffic(routes, request_count, batch, seed) for batch in range(repeat)]
+    results["cold_ns"] = min(time_calls(route, batch, 1) for batch in cold)
+
+    memory = allocations(route, mixed[:2000])
+    results["peak_bytes_per_match"] = memory["peak_bytes_per_call"]
+    results["retained_blocks_per_match"] = memory["retained_blocks_per_call"]
+
+    cache = router.route_cache_info()
+    results["cache_miss_ratio"] = cache.misses / max(cache.hits + cache.misses, 1)
+
+    return results
+
+
+def run(route_counts: T.Iterable[int], engines: T.Iterable[str], request_count: int = 5000,
+        miss_ratio: float = 0.1, seed: int = 0, repeat: int = 3) -> Results:
+    results = {}
+    for engine in engines:
+        for route_count in route_counts:
+            results[f"{engine}:{route_count}"] = run_case(route_count, engine, request_count, miss_ratio, seed,
+                                                          repeat)
+    return results
+
+
+def main(argv: T.Optional[T.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--routes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--engines", nargs="+", default=["werkzeug", "radix"])
+    parser.add_argument("--requests", type=int, default=5000, help="requests per traffic sample")
+    parser.add_argument("--miss-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per metric, the best is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previously written JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="exit with status 1 if a metric is this much worse than the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.routes, args.engines, args.requests, args.miss_ratio, args.seed, args.repeat)
+
+    for case, metrics in results.items():
+        print(case)
+        for metric, value in sorted(metrics.items()):
+            print(f"    {metric:<28} {value:>14.3f}")
+
+    if args.output:
+        save_results(args.output, "routing", results, meta={"requests": args.requests,
+                                                              "miss_ratio": args.miss_ratio,
+                                                              "seed": args.seed})
+
+    if args.baseline:
+        if report(compare(load_results(args.baseline), results), args.threshold) is False:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+    View dispatch micro-benchmark.
+
+    Measures the per request cost ViewFunctionResource and ViewClassResource add on top of calling the view
+    directly, for plain views and views with pre/post filters.   The per request getattr/hasattr dispatch both
+    resources used before their dispatch tables were precompiled is kept here as a reference so a single run
+    shows the difference.
+
+    ```
+        python -m txweb.benchmarks.views --output views.json
+        python -m txweb.benchmarks.views --baseline views.json
+    ```
+
+    Reported per case, all lower is better:
+
+    render_ns: resource.render(request)
+    overhead_ns: render_ns minus calling the view and sanitize_render_output directly
+    reference_render_ns / reference_overhead_ns: the same using the old per request lookups
+
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import typing as T
+
+from txweb.resources import ViewClassResource, ViewFunctionResource
+from txweb.util.basic import sanitize_render_output
+
+from .common import time_calls, save_results, load_results, compare, report, Results
+
+
+class BenchRequest:
+    """
+        Just enough of StrRequest for the view resources.
+    """
+    __slots__ = ("method", "route_args")
+
+    def __init__(self, method: bytes = b"GET"):
+        self.method = method
+        self.route_args = {"item_id": 7}
+
+
+def view_function(request, item_id):  # pylint: disable=W0613
+    return b"item"
+
+
+def function_prefilter(request, func_name):  # pylint: disable=W0613
+    return None
+
+
+def function_postfilter(request, func_name, body):  # pylint: disable=W0613
+    return body
+
+
+class RenderView:
+    def render(self, request):  # pylint: disable=W0613
+        return b"render"
+
+
+class MethodView:
+    def render_GET(self, request):  # pylint: disable=C0103,W0613
+        return b"get"
+
+    def render_POST(self, request):  # pylint: disable=C0103,W0613
+        return b"post"
+
+
+class FilteredView(MethodView):
+    def prefilter(self, request, view_resource):  # pylint: disable=W0613
+        return None
+
+    def post_filter(self, request, output):  # pylint: disable=W0613
+        return output
+
+
+def reference_function_render(resource: ViewFunctionResource, request) -> T.Union[int, bytes]:
+    """
+        ViewFunctionResource.render as it was before the handler was precompiled.
+    """
+    request_view_kwargs = getattr(request, "route_args", {})
+    func_name = getattr(resource.func, "__qualname__", getattr(resource.func, "__name__", repr(resource.func)))
+
+    if resource.prefilter:
+        resource.prefilter(request, func_name)
+
+    result_body = resource.func(request, **request_view_kwargs)
+
+    if resource.postfilter:
+        result_body = resource.postfilter(request, func_name, result_body)
+
+    return sanitize_render_output(result_body)
+
+
+def reference_class_render(resource: ViewClassResource, request) -> T.Union[int, bytes]:
+    """
+        ViewClassResource.render as it was before the dispatch table was precompiled.
+    """
+    request_kwargs = getattr(request, "_view_args", {})
+    request_method = getattr(request, "method").decode("utf-8").upper()
+
+    if hasattr(resource.instance, "prefilter"):
+        getattr(resource.instance, "prefilter")(request, resource)
+
+    if hasattr(resource.instance, "render"):
+        render_target = getattr(resource.instance, "render", None)
+    else:
+        render_target = getattr(resource.instance, f"render_{request_method}", None)
+
+    result = render_target(request, **request_kwargs)
+
+    if hasattr(resource.instance, "post_filter"):
+        result = getattr(resource.instance, "post_filter")(request, result)
+
+    return sanitize_render_output(result)
+
+
+def build_cases() -> T.Dict[str, T.Tuple[T.Any, T.Callable, T.Callable]]:
+    """
+        case name -> (resource, direct call of the view, reference render)
+    """
+    plain = ViewFunctionResource(view_function)
+    filtered = ViewFunctionResource(view_function, prefilter=function_prefilter, postfilter=function_postfilter)
+    render_view, method_view, filtered_view = RenderView(), MethodView(), FilteredView()
+
+    def direct_function(request):
+        return sanitize_render_output(view_function(request, **request.route_args))
+
+    return {
+        "function:plain": (plain, direct_function, reference_function_render),
+        "function:filtered": (filtered, direct_function, reference_function_render),
+        "class:render": (ViewClassResource(RenderView, render_view),
+                         lambda request: sanitize_render_output(render_view.render(request)),
+                         reference_class_render),
+        "class:render_method": (ViewClassResource(MethodView, method_view),
+                                lambda request: sanitize_render_output(method_view.render_GET(request)),
+                                reference_class_render),
+        "class:filtered": (ViewClassResource(FilteredView, filtered_view),
+                           lambda request: sanitize_render_output(filtered_view.render_GET(request)),
+                           reference_class_render),
+    }
+
+
+def run(request_count: int = 100000, repeat: int = 5) -> Results:
+    requests = [BenchRequest() for _ in range(request_count)]
+    results = {}
+
+    for case, (resource, direct, reference) in build_cases().items():
+        direct_ns = time_calls(direct, requests, repeat)
+        render_ns = time_calls(resource.render, requests, repeat)
+        reference_ns = time_calls(lambda request, resource=resource: reference(resource, request), requests, repeat)
+
+        results[case] = {
+            "render_ns": render_ns,
+            "overhead_ns": max(render_ns - direct_ns, 0.0),
+            "reference_render_ns": reference_ns,
+            "reference_overhead_ns": max(reference_ns - direct_ns, 0.0),
+        }
+
+    return results
+
+
+def main(argv: T.Optional[T.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per metric, the best is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previously written JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="exit with status 1 if a metric is this much worse than the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.requests, args.repeat)
+
+    print(f"{'case':<24} {'render_ns':>12} {'overhead_ns':>12} {'reference_ns':>14} {'ref_overhead_ns':>16}")
+    for case, metrics in results.items():
+        print(f"{case:<24} {metrics['render_ns']:>12.1f} {metrics['overhead_ns']:>12.1f} "
+              f"{metrics['reference_render_ns']:>14.1f} {metrics['reference_overhead_ns']:>16.1f}")
+
+    if args.output:
+        save_results(args.output, "views", results, meta={"requests": args.requests})
+
+    if args.baseline:
+        if report(compare(load_results(args.baseline), results), args.threshold) is False:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
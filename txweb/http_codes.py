@@ -6,6 +6,15 @@
     refer to https://en.wikipedia.org/wiki/List_of_HTTP_status_codes
 """
 import typing as T
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def encode_message(message: T.Union[str, bytes]) -> bytes:
+    """
+        Status messages are a handful of fixed strings, encode each one once instead of on every error response.
+    """
+    return message if isinstance(message, bytes) else message.encode("utf-8")
 
 
 class HTTPCode(RuntimeError):
@@ -23,6 +32,13 @@ class HTTPCode(RuntimeError):
         self.message = message
         self.exc = exc
 
+    @property
+    def encoded_message(self) -> bytes:
+        """
+            The message as utf-8 bytes, suitable for both the status line and response body.
+        """
+        return encode_message(self.message)
+
 
 class HTTP3xx(HTTPCode):
     """
@@ -183,6 +199,17 @@ class HTTP410(HTTP4xx):
         super().__init__(self.CODE, "Gone")
 
 
+class HTTP413(HTTP4xx):
+    """
+    413 Payload Too Large (RFC 7231)
+    The request is larger than the server is willing or able to process.
+    """
+    CODE = 413
+
+    def __init__(self):
+        super().__init__(self.CODE, "Payload Too Large")
+
+
 class HTTP405(HTTP4xx):
     """
     A request method is not supported for the requested resource;
@@ -191,8 +218,9 @@ class HTTP405(HTTP4xx):
     """
     CODE = 405
 
-    def __init__(self, exc=None):
+    def __init__(self, exc=None, valid_methods: T.Optional[T.Iterable[str]] = None):
         super().__init__(self.CODE, "Method not allowed", exc=exc)
+        self.valid_methods = tuple(sorted(valid_methods)) if valid_methods else ()
 
 
 class HTTP5xx(HTTPCode):
@@ -221,6 +249,20 @@ class HTTP500(HTTP5xx):
         super().__init__(self.CODE, message)
 
 
+class HTTP503(HTTP5xx):
+    """
+    503 Service Unavailable
+    The server cannot handle the request (because it is overloaded or down for maintenance).
+    Generally, this is a temporary state.
+    """
+    CODE = 503
+
+    def __init__(self, message="Service Unavailable", retry_after: T.Optional[int] = None):
+        super().__init__(self.CODE, message)
+        # seconds, sent as the Retry-After header
+        self.retry_after = retry_after
+
+
 class Unrenderable(EnvironmentError):
     """
     An class definition or view function's result cannot be rendered to the client.
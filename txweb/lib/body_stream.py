@@ -0,0 +1,196 @@
+"""
+    Request bodies read by the view while they are still arriving.
+
+    A route added with `stream_body=True` is routed and its view called as soon as the request's headers are in, the
+    body is `request.body`, a `BodyStream`, instead of `request.content`.   It can be read either way:
+
+    ```
+        @app.route("/ingest", methods=["POST"], stream_body=True)
+        async def ingest(request):
+            size = 0
+            async for chunk in request.body:
+                size += len(chunk)
+            return f"{size} bytes"
+
+        @app.route("/upload", methods=["POST"], stream_body=True)
+        def upload(request):
+            request.body.deliverBody(SomeProtocol(request))
+            return NOT_DONE_YET
+    ```
+
+    `deliverBody` works like twisted.web.client's Response.deliverBody: the protocol's dataReceived gets every chunk and
+    its connectionLost gets ResponseDone once the whole body is in, or the reason it never will be.   The protocol's
+    transport is the BodyStream, pausing it stops reading from the connection.
+
+    Either way only a bounded amount of the body is held in memory, reading from the connection is paused while more
+    than HIGH_WATER bytes are waiting to be read.   The response can be written at any time but the request is only
+    finished once all of its body has arrived.
+"""
+from __future__ import annotations
+
+import typing as T
+from collections import deque
+
+from twisted.internet import defer
+from twisted.internet.interfaces import IProtocol
+from twisted.python import failure
+from twisted.web.client import ResponseDone
+
+
+class BodyStream:
+    """
+        The body of one request, see the module docstring.
+    """
+    # Reading from the connection is paused while more than this many bytes are buffered
+    HIGH_WATER: T.ClassVar[int] = 1024 * 1024
+
+    def __init__(self, transport: T.Any):
+        """
+        :param transport: what to pause and resume, the request's connection
+        """
+        self._transport = transport
+        self._chunks = deque()  # type: T.Deque[bytes]
+        self._buffered = 0
+        self._reading = None  # type: T.Optional[defer.Deferred]
+        self._protocol = None  # type: T.Optional[IProtocol]
+        self._waiters = []  # type: T.List[defer.Deferred]
+        self._paused = False
+        self._stopped = False
+        self.received = 0
+        self.complete = False
+        # None for a body that arrived in full
+        self.error = None  # type: T.Optional[failure.Failure]
+
+    # StrRequest's side
+
+    def write(self, data: bytes) -> None:
+        self.received += len(data)
+        if self._stopped:
+            return
+
+        if self._protocol is not None:
+            self._protocol.dataReceived(data)
+        elif self._reading is not None:
+            reading, self._reading = self._reading, None
+            reading.callback(data)
+        else:
+            self._chunks.append(data)
+            self._buffered += len(data)
+            if self._buffered > self.HIGH_WATER:
+                self._pauseTransport()
+
+    def finish(self) -> None:
+        """
+            All of the body has arrived.
+        """
+        self._complete(None)
+
+    def fail(self, reason: T.Union[failure.Failure, Exception]) -> None:
+        """
+            The rest of the body will never arrive, eg the connection was lost or the body went over its limits.
+        """
+        if self.complete is False:
+            self._complete(reason if isinstance(reason, failure.Failure) else failure.Failure(reason))
+
+    def _complete(self, error: T.Optional[failure.Failure]) -> None:
+        if error is None:
+            # The connection goes on to the next request
+            self._resumeTransport()
+        self.complete, self.error = True, error
+        self._transport = None
+
+        if self._protocol is not None:
+            self._protocol.connectionLost(error or failure.Failure(ResponseDone()))
+        elif self._reading is not None:
+            reading, self._reading = self._reading, None
+            self._failRead(reading)
+
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.callback(error)
+
+    # The view's side
+
+    def whenComplete(self) -> defer.Deferred:
+        """
+            A Deferred fired with None once all of the body has arrived, or with the Failure it never will.
+        """
+        if self.complete:
+            return defer.succeed(self.error)
+
+        waiter = defer.Deferred()
+        self._waiters.append(waiter)
+        return waiter
+
+    def deliverBody(self, protocol: IProtocol) -> None:
+        """
+            Deliver what is left of the body to protocol, see the module docstring.
+        """
+        if self._protocol is not None or self._reading is not None:
+            raise RuntimeError("The request body is already being read")
+
+        self._protocol = protocol
+        protocol.makeConnection(self)
+
+        while self._chunks and self._stopped is False:
+            protocol.dataReceived(self._chunks.popleft())
+        self._buffered = 0
+        self._resumeTransport()
+
+        if self.complete:
+            protocol.connectionLost(self.error or failure.Failure(ResponseDone()))
+
+    def __aiter__(self) -> BodyStream:
+        return self
+
+    def __anext__(self) -> defer.Deferred:
+        """
+            The next chunk, `async for chunk in request.body` reads the body until it is complete.
+        """
+        if self._protocol is not None or self._reading is not None:
+            return defer.fail(RuntimeError("The request body is already being read"))
+
+        if self._chunks:
+            chunk = self._chunks.popleft()
+            self._buffered -= len(chunk)
+            if self._buffered <= self.HIGH_WATER // 2:
+                self._resumeTransport()
+            return defer.succeed(chunk)
+
+        if self.complete:
+            return self._failRead(defer.Deferred())
+
+        self._resumeTransport()
+        self._reading = defer.Deferred()
+        return self._reading
+
+    def _failRead(self, reading: defer.Deferred) -> defer.Deferred:
+        reading.errback(self.error or failure.Failure(StopAsyncIteration()))
+        return reading
+
+    # The producer a deliverBody protocol sees as its transport
+
+    def pauseProducing(self) -> None:
+        self._pauseTransport()
+
+    def resumeProducing(self) -> None:
+        self._resumeTransport()
+
+    def stopProducing(self) -> None:
+        """
+            The protocol wants no more of the body, the rest is read from the connection and thrown away.
+        """
+        self._stopped = True
+        self._chunks.clear()
+        self._buffered = 0
+        self._resumeTransport()
+
+    def _pauseTransport(self) -> None:
+        if self._paused is False and self._transport is not None:
+            self._paused = True
+            self._transport.pauseProducing()
+
+    def _resumeTransport(self) -> None:
+        if self._paused is True and self._transport is not None:
+            self._paused = False
+            self._transport.resumeProducing()
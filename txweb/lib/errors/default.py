@@ -61,17 +61,7 @@ class DefaultHandler(BaseHandler):
             reason.raiseException()
 
         elif isinstance(http_codes.HTTPCode, reason.type) or issubclass(reason.type, http_codes.HTTPCode):
-
-            if issubclass(reason.type, http_codes.HTTP3xx):
-                exc = reason.value
-                request.redirect(exc.redirect, exc.code)
-                response = html.REDIRECT_BODY.format(url=exc.redirect)
-                request.writeTotal(response, code=exc.code, message=exc.message)
-            else:
-                exc = reason.value  # type: HTTPCode
-                request.setResponseCode(exc.code, exc.message)
-                request.setHeader("Content-length", intToBytes(len(exc.message)))
-                request.write(exc.message)
+            self.write_http_code(request, reason.value)
 
         else:
             request.setResponseCode(500, b"Internal server error")
@@ -82,4 +72,32 @@ class DefaultHandler(BaseHandler):
         request.ensureFinished()
         return True
 
+    @staticmethod
+    def write_http_code(request: StrRequest, exc: http_codes.HTTPCode) -> None:
+        """
+            Write the response for an HTTPCode without needing a Failure, 3xx codes redirect and everything else
+            writes the code's message as the body.
+
+            Used directly by Application.processingMiss for unmatched routes.
+
+        Parameters
+        ----------
+        request: StrRequest
+        exc: HTTPCode
+            Does not need to have been raised
+        """
+        if isinstance(exc, http_codes.HTTP3xx):
+            request.redirect(exc.redirect, exc.code)
+            response = html.REDIRECT_BODY.format(url=exc.redirect)
+            request.writeTotal(response, code=exc.code, message=exc.encoded_message)
+        else:
+            message = exc.encoded_message
+            request.setResponseCode(exc.code, message)
+            if getattr(exc, "valid_methods", None):
+                request.setHeader(b"Allow", ", ".join(exc.valid_methods))
+            if getattr(exc, "retry_after", None) is not None:
+                request.setHeader(b"Retry-After", intToBytes(exc.retry_after))
+            request.setHeader(b"Content-Length", intToBytes(len(message)))
+            request.write(message)
+
 
@@ -0,0 +1,83 @@
+"""
+    The JSON encoder/decoder shared by request.json, StrRequest.writeJSON, and the websocket protocol.
+
+    orjson is used if it is installed, then ujson, and finally the standard library's json.   An application can pick
+    one by name, `Application(json_codec="ujson")` or `app.json_codec = "json"`, or plug in its own JSONCodec.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import typing as T
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(T.NamedTuple):
+    """
+        A JSON implementation, whatever it is built on dumps returns utf-8 bytes, encodes dataclass instances as
+        dicts, and loads raises a ValueError (or a subclass) for anything that is not valid JSON.
+    """
+    name: str
+    dumps: T.Callable[[T.Any], bytes]
+    loads: T.Callable[[T.Union[bytes, str]], T.Any]
+
+
+def _default(obj: T.Any) -> T.Any:
+    """
+        Dataclass instances are encoded as dicts, orjson does this natively.
+    """
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(obj: T.Any) -> bytes:
+    return json.dumps(obj, default=_default).encode("utf-8")
+
+
+def _ujson_dumps(obj: T.Any) -> bytes:
+    return ujson.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _orjson_dumps(obj: T.Any) -> bytes:
+    # The standard library turns int, float, and bool keys into strings, orjson refuses them by default
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+CODECS = {"json": JSONCodec("json", _json_dumps, json.loads)}  # type: T.Dict[str, JSONCodec]
+if ujson is not None:
+    CODECS["ujson"] = JSONCodec("ujson", _ujson_dumps, ujson.loads)
+if orjson is not None:
+    CODECS["orjson"] = JSONCodec("orjson", _orjson_dumps, orjson.loads)
+
+# Fastest first
+PREFERENCE = ("orjson", "ujson", "json")
+DEFAULT_CODEC = next(CODECS[name] for name in PREFERENCE if name in CODECS)
+
+
+def get_codec(codec: T.Union[str, JSONCodec, None] = None) -> JSONCodec:
+    """
+        The codec named `codec`, the fastest one installed if None.   A JSONCodec is returned as is.
+
+        Raises ValueError for an unknown name or a codec that is not installed.
+    """
+    if codec is None:
+        return DEFAULT_CODEC
+
+    if isinstance(codec, JSONCodec):
+        return codec
+
+    try:
+        return CODECS[codec]
+    except KeyError:
+        raise ValueError(f"JSON codec {codec!r} is unknown or not installed, choose from {sorted(CODECS)}") from None
@@ -0,0 +1,235 @@
+"""
+    Streaming multipart/form-data parsing for StrRequest.
+
+    A multipart body is fed to `MultipartParser` chunk by chunk as twisted reads it off the socket, it is never held
+    in memory as a whole.   Form fields are kept in memory up to `max_form_memory_size` bytes in total, file parts go
+    into a SpooledTemporaryFile that moves itself to disk once it holds more than `spool_size` bytes.
+
+    `UploadedFile.save` copies a spooled upload to its destination inside the kernel with copy_file_range (or
+    sendfile on Linux) when both ends are real files instead of a read/write loop through Python.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import typing as T
+
+from werkzeug.datastructures import FileStorage, Headers, MultiDict
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, NeedData, State
+
+from ..http_codes import HTTP400, HTTP413
+
+# File parts larger than this many bytes are moved from memory to a temporary file
+SPOOL_SIZE = 512 * 1024
+# Buffer size of the read/write copy used when a kernel copy is not possible
+COPY_BUFFER = 64 * 1024
+# copy_file_range/sendfile refusing a pair of files for these is not an error, the next strategy is tried
+FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+                             errno.ENOTSOCK})
+# Only Linux's sendfile writes to a regular file, BSD and macOS need a socket and Windows has no sendfile at all
+SENDFILE_TO_FILES = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+
+class BodyLimits(T.NamedTuple):
+    """
+        Request body limits in bytes, None for no limit.
+    """
+    # The whole request body as sent, before any decoding
+    max_content_length: T.Optional[int] = None
+    # All of the form fields of a multipart body together, file parts are not counted
+    max_form_memory_size: T.Optional[int] = None
+    spool_size: int = SPOOL_SIZE
+
+
+def file_descriptor(stream: T.IO) -> T.Optional[int]:
+    """
+        stream's file descriptor, None if it has none or is a SpooledTemporaryFile still in memory.
+    """
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:  # pylint: disable=W0212
+        return None
+
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _kernel_copy(source_fd: int, target_fd: int, offset: int, target_offset: int, count: int) -> int:
+    """
+        Copy up to count bytes with copy_file_range, or sendfile where that is not supported.
+
+        Returns how many bytes were copied, the caller copies whatever is left if both refused or neither exists.
+    """
+    copied = 0
+    use_copy_file_range = hasattr(os, "copy_file_range")
+    use_sendfile = SENDFILE_TO_FILES
+    if use_copy_file_range is False and use_sendfile is False:
+        return copied
+
+    os.lseek(target_fd, target_offset, os.SEEK_SET)
+
+    while copied < count:
+        try:
+            if use_copy_file_range:
+                sent = os.copy_file_range(source_fd, target_fd, count - copied, offset + copied,
+                                          target_offset + copied)
+            else:
+                sent = os.sendfile(target_fd, source_fd, offset + copied, count - copied)
+        except OSError as exc:
+            if exc.errno not in FALLBACK_ERRNOS:
+                raise
+            if use_copy_file_range is False or use_sendfile is False:
+                break
+            use_copy_file_range = False
+            continue
+
+        if sent == 0:
+            break
+        copied += sent
+
+    return copied
+
+
+def copy_file(source: T.BinaryIO, target: T.BinaryIO, buffer_size: int = COPY_BUFFER) -> None:
+    """
+        Copy source, from its current position to its end, into target at target's current position.
+
+        Both file positions end up after the copied data, the same as shutil.copyfileobj leaves them.
+    """
+    source_fd, target_fd = file_descriptor(source), file_descriptor(target)
+    if source_fd is not None and target_fd is not None:
+        target.flush()
+        offset, target_offset = source.tell(), target.tell()
+        copied = _kernel_copy(source_fd, target_fd, offset, target_offset,
+                              max(os.fstat(source_fd).st_size - offset, 0))
+        source.seek(offset + copied)
+        target.seek(target_offset + copied)
+
+    shutil.copyfileobj(source, target, buffer_size)
+
+
+class UploadedFile(FileStorage):
+    """
+        A file part of a multipart body, `stream` is the SpooledTemporaryFile it was received into.
+    """
+
+    def save(self, dst: T.Union[str, os.PathLike, T.BinaryIO], buffer_size: int = COPY_BUFFER) -> None:
+        """
+            Save the upload to a path or an open binary file, see copy_file.
+
+            An open file is not closed, like FileStorage.save.
+        """
+        close_dst = False
+        if isinstance(dst, (str, os.PathLike)):
+            dst = open(dst, "wb")  # pylint: disable=R1732
+            close_dst = True
+
+        try:
+            copy_file(self.stream, dst, buffer_size)
+        finally:
+            if close_dst:
+                dst.close()
+
+
+class _Part(T.NamedTuple):
+    name: str
+    headers: Headers
+    filename: T.Optional[str]
+    # bytearray for form fields, SpooledTemporaryFile for files
+    data: T.Union[bytearray, T.BinaryIO]
+
+
+class MultipartParser:
+    """
+        Incremental multipart/form-data parser, `feed` it the body as it arrives and `close` it at the end.
+
+        HTTP413 is raised as soon as the form fields go over limits.max_form_memory_size and HTTP400 for a
+        malformed or truncated body.   Call `abort` after either to throw away any spooled files.
+    """
+
+    def __init__(self, boundary: bytes, limits: BodyLimits = BodyLimits(), charset: str = "utf-8"):
+        self.limits = limits
+        self.charset = charset
+        self._decoder = MultipartDecoder(boundary)
+        self._part = None  # type: T.Optional[_Part]
+        self._form_size = 0
+        self._form = []  # type: T.List[T.Tuple[str, str]]
+        self._files = []  # type: T.List[T.Tuple[str, UploadedFile]]
+
+    def feed(self, data: bytes) -> None:
+        self._decoder.receive_data(data)
+        self._process()
+
+    def close(self) -> T.Tuple[MultiDict, MultiDict]:
+        """
+            The end of the body has been received.
+
+        Returns
+        -------
+        The form fields and the files, the same as werkzeug's FormDataParser.parse
+        """
+        self._decoder.receive_data(None)
+        self._process()
+        if self._decoder.state != State.COMPLETE:
+            raise HTTP400()
+
+        return MultiDict(self._form), MultiDict(self._files)
+
+    def abort(self) -> None:
+        """
+            Close every file received so far, their temporary files are deleted.
+        """
+        if self._part is not None and self._part.filename is not None:
+            self._part.data.close()
+        for _, upload in self._files:
+            upload.close()
+
+        self._part = None
+        self._files = []
+
+    def _process(self) -> None:
+        try:
+            while self._decoder.state != State.COMPLETE:
+                event = self._decoder.next_event()
+                if isinstance(event, NeedData):
+                    return
+                elif isinstance(event, File):
+                    stream = tempfile.SpooledTemporaryFile(max_size=self.limits.spool_size)
+                    self._part = _Part(event.name, event.headers, event.filename, stream)
+                elif isinstance(event, Field):
+                    self._part = _Part(event.name, event.headers, None, bytearray())
+                elif isinstance(event, Data) and self._part is not None:
+                    self._receive(event.data)
+                    if event.more_data is False:
+                        self._finish_part()
+        except ValueError as exc:
+            # werkzeug's decoder raises ValueError for anything it cannot parse
+            raise HTTP400() from exc
+
+    def _receive(self, data: bytes) -> None:
+        if self._part.filename is not None:
+            self._part.data.write(data)
+            return
+
+        self._form_size += len(data)
+        limit = self.limits.max_form_memory_size
+        if limit is not None and self._form_size > limit:
+            raise HTTP413()
+
+        self._part.data.extend(data)
+
+    def _finish_part(self) -> None:
+        part, self._part = self._part, None
+        content_type, options = parse_options_header(part.headers.get("content-type", ""))
+
+        if part.filename is None:
+            self._form.append((part.name, part.data.decode(options.get("charset", self.charset), "replace")))
+            return
+
+        part.data.seek(0)
+        self._files.append((part.name, UploadedFile(part.data, part.filename, part.name,
+                                                    content_type=content_type or None, headers=part.headers)))
@@ -0,0 +1,286 @@
+"""
+    Named pools of worker processes for CPU bound views.
+
+    ```python
+        app.process_pool("gifs", workers=4, max_queue=16, max_tasks_per_child=200)
+
+        @app.route("/gif/<int:frames>", process_pool="gifs")
+        def make_gif(request, frames):
+            return render_frames(request.content, frames)  # runs in a worker process
+    ```
+
+    Workers are started once and kept warm, `max_tasks_per_child` replaces a worker after that many calls so leaks
+    in the view's libraries can't grow forever.   Once `max_queue` calls are waiting or running new ones are
+    answered with a 503 instead of queueing without bound.
+
+    Everything crossing the process boundary is pickled: the view itself (so it must be a module level function),
+    a ProcessRequest snapshot of the request, the route arguments, and the returned body.
+
+"""
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import typing as T
+
+from twisted.internet import defer
+from twisted.internet import reactor as default_reactor
+from twisted.python import failure
+
+from ..http_codes import HTTP503
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .str_request import StrRequest
+
+DEFAULT_POOL = "default"
+
+
+class ProcessRequest(T.NamedTuple):
+    """
+        The picklable parts of a StrRequest that a view running in a worker process receives in its place.
+    """
+    method: bytes
+    uri: bytes
+    path: bytes
+    args: T.Dict[bytes, T.List[bytes]]
+    headers: T.Dict[bytes, T.List[bytes]]
+    content: bytes
+
+    @classmethod
+    def from_request(cls, request: StrRequest) -> ProcessRequest:
+        content = b""
+        if request.content is not None:
+            request.content.seek(0, 0)
+            content = request.content.read()
+            request.content.seek(0, 0)
+
+        return cls(request.method, request.uri, request.path, dict(request.args),
+                   {name.lower(): list(values) for name, values in request.requestHeaders.getAllRawHeaders()},
+                   content)
+
+    def getHeader(self, name: T.Union[str, bytes]) -> T.Optional[bytes]:  # pylint: disable=C0103
+        if isinstance(name, str):
+            name = name.encode("utf-8")
+
+        values = self.headers.get(name.lower())
+        return values[-1] if values else None
+
+
+class PoolStats(T.NamedTuple):
+    """
+        A snapshot of one process pool's load.   `pending` is queued and running calls, `shed` the calls refused
+        with a 503 because pending was at max_queue.
+    """
+    name: str
+    workers: int
+    max_queue: int
+    max_tasks_per_child: int
+    pending: int
+    completed: int
+    failed: int
+    shed: int
+
+
+class ViewProcessPool:
+    """
+        A multiprocessing.Pool whose results are delivered to the reactor thread as Deferreds.
+    """
+
+    DEFAULT_MAX_QUEUE: T.ClassVar[int] = 64
+    DEFAULT_MAX_TASKS_PER_CHILD: T.ClassVar[int] = 1000
+    # Seconds sent with the Retry-After header on shed requests
+    RETRY_AFTER: T.ClassVar[int] = 1
+
+    def __init__(self, name: str, twisted_reactor,
+                 workers: int = None,
+                 max_queue: int = None,
+                 max_tasks_per_child: int = None,
+                 start_method: str = None):
+        """
+        Parameters
+        ----------
+        name: str
+        twisted_reactor:
+            The reactor results are delivered to
+        workers: int
+            Number of worker processes, defaults to the number of CPU's
+        max_queue: int
+            Calls allowed to wait or run at once before new ones are refused with HTTP503
+        max_tasks_per_child: int
+            Calls a worker process handles before it is replaced
+        start_method: str
+            multiprocessing start method ("fork", "spawn", "forkserver"), the platform default if None
+        """
+        self.name = name
+        self.reactor = twisted_reactor
+        self.workers = os.cpu_count() or 1
+        self.max_queue = self.DEFAULT_MAX_QUEUE
+        self.max_tasks_per_child = self.DEFAULT_MAX_TASKS_PER_CHILD
+        self.start_method = None  # type: T.Optional[str]
+        self.pool = None  # type: T.Optional[multiprocessing.pool.Pool]
+        self.configure(workers, max_queue, max_tasks_per_child, start_method)
+
+        # Only touched from the reactor thread, results are handed over with callFromThread
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._shed = 0
+        self._shutdown_trigger = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name!r} workers={self.workers} max_queue={self.max_queue}>"
+
+    @property
+    def started(self) -> bool:
+        return self.pool is not None
+
+    def configure(self, workers: int = None, max_queue: int = None, max_tasks_per_child: int = None,
+                  start_method: str = None) -> None:
+        """
+            Change the pool's settings, arguments left as None are unchanged.
+
+        Raises
+        ------
+        RuntimeError
+            If the workers are already running
+        """
+        if self.pool is not None:
+            raise RuntimeError(f"Process pool {self.name!r} is already running and can't be reconfigured")
+
+        self.workers = self.workers if workers is None else workers
+        self.max_queue = self.max_queue if max_queue is None else max_queue
+        self.max_tasks_per_child = self.max_tasks_per_child if max_tasks_per_child is None else max_tasks_per_child
+        self.start_method = self.start_method if start_method is None else start_method
+
+    def start(self) -> None:
+        """
+            Start the worker processes and stop them again when the reactor shuts down.   Called by the first `run`.
+        """
+        if self.pool is not None:
+            return
+
+        context = multiprocessing.get_context(self.start_method)
+        self.pool = context.Pool(self.workers, maxtasksperchild=self.max_tasks_per_child)
+        self._shutdown_trigger = self.reactor.addSystemEventTrigger("during", "shutdown", self.stop)
+
+    def stop(self, graceful: bool = True) -> None:
+        """
+            Shut the workers down, graceful waits for queued calls to finish first.
+        """
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            if graceful:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+
+        if self._shutdown_trigger is not None:
+            trigger, self._shutdown_trigger = self._shutdown_trigger, None
+            try:
+                self.reactor.removeSystemEventTrigger(trigger)
+            except (ValueError, KeyError):
+                # Already fired, ie stop was called by the trigger itself
+                pass
+
+    def run(self, func: T.Callable[..., T.Any], *args, **kwargs) -> defer.Deferred:
+        """
+            Call func(*args, **kwargs) in a worker process.
+
+        Returns
+        -------
+        A Deferred that fires on the reactor thread with func's return value, or fails with HTTP503 right away if
+        max_queue calls are already pending
+        """
+        if self._pending >= self.max_queue:
+            self._shed += 1
+            return defer.fail(HTTP503(retry_after=self.RETRY_AFTER))
+
+        if self.pool is None:
+            self.start()
+
+        deferred = defer.Deferred()
+        self._pending += 1
+
+        # Both callbacks run in the pool's result handler thread
+        self.pool.apply_async(func, args, kwargs,
+                              callback=lambda result: self.reactor.callFromThread(self._finished, deferred, result),
+                              error_callback=lambda exc: self.reactor.callFromThread(self._finished, deferred,
+                                                                                     failure.Failure(exc)))
+        return deferred
+
+    def _finished(self, deferred: defer.Deferred, result: T.Any) -> None:
+        self._pending -= 1
+        self._completed += 1
+
+        if isinstance(result, failure.Failure):
+            self._failed += 1
+            deferred.errback(result)
+        else:
+            deferred.callback(result)
+
+    def wrap(self, func: T.Callable[..., T.Any]) -> T.Callable[..., defer.Deferred]:
+        """
+            Decorate a view so calling it with (request, **route_args) runs it in this pool with a ProcessRequest
+            in place of the request.
+        """
+        @functools.wraps(func)
+        def offloaded(request, **route_args):
+            return self.run(func, ProcessRequest.from_request(request), **route_args)
+
+        return offloaded
+
+    def stats(self) -> PoolStats:
+        return PoolStats(self.name, self.workers, self.max_queue, self.max_tasks_per_child, self._pending,
+                         self._completed, self._failed, self._shed)
+
+
+class ProcessPools:
+    """
+        Application wide registry of ViewProcessPool's by name, pools are created on first use.
+    """
+
+    def __init__(self, twisted_reactor=None):
+        self.reactor = twisted_reactor or default_reactor
+        self._pools = {}  # type: T.Dict[str, ViewProcessPool]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._pools
+
+    def get(self, name: str = DEFAULT_POOL, **settings) -> ViewProcessPool:
+        """
+            Return the named pool, creating it if needed.   `settings` are passed to ViewProcessPool.configure
+        """
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = self._pools[name] = ViewProcessPool(name, self.reactor, **settings)
+        elif settings:
+            pool.configure(**settings)
+
+        return pool
+
+    @staticmethod
+    def pool_name(process_pool: T.Union[bool, str, None]) -> T.Optional[str]:
+        """
+            Convert the value of a `process_pool=` argument into a pool name, None for not offloaded.
+        """
+        if process_pool is None or process_pool is False:
+            return None
+        elif process_pool is True:
+            return DEFAULT_POOL
+        elif isinstance(process_pool, str):
+            return process_pool
+
+        raise ValueError(f"process_pool must be True, False, or a process pool name, got {process_pool!r}")
+
+    def wrap(self, func: T.Callable[..., T.Any], process_pool: T.Union[bool, str, None]) -> T.Callable[..., T.Any]:
+        name = self.pool_name(process_pool)
+        return func if name is None else self.get(name).wrap(func)
+
+    def stats(self) -> T.Dict[str, PoolStats]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def stop(self, graceful: bool = True) -> None:
+        for pool in self._pools.values():
+            pool.stop(graceful)
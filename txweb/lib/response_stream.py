@@ -0,0 +1,176 @@
+"""
+    Response bodies sent while the view is still producing them.
+
+    A view can return a generator, an async generator, or any other iterator or async iterable of bytes/str chunks
+    and the chunks are written as they are produced instead of being joined into one body first:
+
+    ```
+        @app.route("/export.csv")
+        def export(request):
+            request.setHeader("content-type", "text/csv")
+            for row in fetch_rows():
+                yield ",".join(row) + "\\r\\n"
+
+        @app.route("/events")
+        async def events(request):
+            async for event in subscribe():
+                yield json_codec.dumps(event) + b"\\n"
+    ```
+
+    There is no Content-Length, HTTP/1.1 clients get the body with chunked transfer encoding and HTTP/1.0 clients
+    until the connection closes.   The ResponseStream is registered as the request's push producer: iteration stops
+    while the connection's write buffer is full and carries on once it drains, so only a bounded part of the body is
+    ever held in memory.
+
+    Sync iterators are run by a twisted Cooperator, a slow or CPU heavy generator shares the reactor with every other
+    connection, but each of its steps still blocks it.   Anything slow (database cursors, network calls) belongs in an
+    async generator.
+"""
+from __future__ import annotations
+
+import typing as T
+
+from twisted.internet import defer, task
+from twisted.internet.interfaces import IPushProducer
+from twisted.python import failure
+from zope.interface import implementer
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .str_request import StrRequest
+
+
+@implementer(IPushProducer)
+class ResponseStream:
+    """
+        Writes the chunks of one streamed response, see the module docstring.
+    """
+    # None for twisted's global cooperator
+    COOPERATOR: T.ClassVar[T.Optional[task.Cooperator]] = None
+
+    def __init__(self, request: StrRequest, chunks: T.Union[T.Iterable, T.AsyncIterable]):
+        """
+        :param request: the request to write the response to
+        :param chunks: the view's output, bytes and str chunks
+        """
+        self._request = request
+        self._chunks = chunks
+        self._task = None  # type: T.Optional[task.CooperativeTask]
+        self._running = None  # type: T.Optional[defer.Deferred]
+        self._resumed = None  # type: T.Optional[defer.Deferred]
+        self._paused = False
+        self._stopped = False
+        self.written = 0
+
+    def start(self) -> defer.Deferred:
+        """
+            Register with the request and start writing.
+
+        :return: A Deferred fired once every chunk is written or with the Failure that stopped the stream.
+        """
+        self._request.registerProducer(self, True)
+        if getattr(self._request.channel, "_waitingForTransport", False):
+            # The channel only pauses producers that are registered when its transport fills up
+            self.pauseProducing()
+
+        if hasattr(self._chunks, "__aiter__"):
+            self._running = defer.ensureDeferred(self._writeAsync())
+        else:
+            cooperator = self.COOPERATOR if self.COOPERATOR is not None else task
+            self._task = cooperator.cooperate(self._writeSync())
+            if self._paused:
+                self._task.pause()
+            self._running = self._task.whenDone()
+
+        self._running.addBoth(self._done)
+        return self._running
+
+    def _writeSync(self) -> T.Iterator[None]:
+        # One chunk per step of the cooperator
+        for chunk in self._chunks:
+            self._write(chunk)
+            yield None
+
+    async def _writeAsync(self) -> None:
+        iterator = self._chunks.__aiter__()
+        try:
+            while True:
+                while self._paused:
+                    self._resumed = defer.Deferred()
+                    await self._resumed
+
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+
+                self._write(chunk)
+        finally:
+            # Let an async generator that did not run to the end run its finally clauses
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _write(self, chunk: T.Union[bytes, str]) -> None:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        elif not isinstance(chunk, bytes):
+            raise TypeError(f"Streamed responses are made of bytes or str chunks, got {type(chunk)}")
+
+        if chunk:
+            # An empty chunk would end a chunked response early
+            self.written += len(chunk)
+            self._request.write(chunk)
+
+    def _done(self, result: T.Union[None, T.Iterator, failure.Failure]) -> T.Union[None, failure.Failure]:
+        self._task = self._resumed = None
+        if self._request.channel is not None:
+            self._request.unregisterProducer()
+
+        if self._stopped:
+            # The client is gone, there is no one to tell
+            self._closeSync()
+            return None
+
+        if isinstance(result, failure.Failure):
+            self._closeSync()
+            return result
+
+        return None
+
+    def _closeSync(self) -> None:
+        """
+            Let a generator that did not run to the end run its finally clauses.
+        """
+        close = getattr(self._chunks, "close", None)
+        if close is not None and not hasattr(self._chunks, "__aiter__"):
+            close()
+
+    # IPushProducer, the request's channel pauses and resumes the stream as its transport fills and drains
+
+    def pauseProducing(self) -> None:
+        if self._paused is False:
+            self._paused = True
+            if self._task is not None:
+                self._task.pause()
+
+    def resumeProducing(self) -> None:
+        if self._paused is True:
+            self._paused = False
+            if self._task is not None:
+                self._task.resume()
+            elif self._resumed is not None:
+                resumed, self._resumed = self._resumed, None
+                resumed.callback(None)
+
+    def stopProducing(self) -> None:
+        """
+            The client went away, nothing more is read from the view's output.
+        """
+        if self._stopped or self._running is None or self._running.called:
+            return
+
+        self._stopped = True
+        if self._task is not None:
+            self._task.stop()
+        else:
+            self._running.cancel()
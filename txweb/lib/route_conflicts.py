@@ -0,0 +1,155 @@
+"""
+    Static analysis of a werkzeug routing Map for rules that can never, or only sometimes, be reached.
+
+    For every rule a sample URL is built from its own pattern and then matched against the whole map.  If some
+    other rule claims the sample for every method the rule accepts, the rule is shadowed (eg a catch all
+    directory rule added ahead of it).  If another rule claims it for only some methods the pair is ambiguous.
+
+    Used by `RoutingResource.freeze` so these show up as warnings at startup instead of as surprise 404's.
+
+"""
+from __future__ import annotations
+
+import re
+import typing as T
+
+from werkzeug import routing as wz_routing
+from werkzeug.exceptions import HTTPException
+
+from .route_engines import RadixEngine
+from ..log import getLogger
+
+log = getLogger(__name__)
+
+# Tried in order until one satisfies a converter's regex and to_python
+SAMPLE_VALUES = ("sample", "1", "1.5", "00000000-0000-0000-0000-000000000000", "a")
+
+# Methods checked for rules that accept any method
+ANY_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+SHADOWED = "shadowed"
+AMBIGUOUS = "ambiguous"
+
+
+class _AnalysisEngine(RadixEngine):
+    """
+        Radix matching without the hit counting, the sample traffic isn't real traffic.
+    """
+    REORDER_INTERVAL = 0
+
+
+class RouteConflict(T.NamedTuple):
+    """
+        `rule` is answered by `claimed_by` instead of itself for `methods`.
+    """
+    kind: str
+    rule: wz_routing.Rule
+    claimed_by: T.Tuple[wz_routing.Rule, ...]
+    methods: T.Tuple[str, ...]
+
+    def __str__(self):
+        others = ", ".join(repr(other.rule) for other in self.claimed_by)
+        return f"{self.rule.rule!r} is {self.kind} by {others} for {', '.join(self.methods)}"
+
+
+def sample_value(converter: wz_routing.BaseConverter) -> T.Optional[str]:
+    """
+        Find a url segment value the converter accepts, None if nothing in SAMPLE_VALUES fits.
+    """
+    candidates = list(SAMPLE_VALUES)
+    if isinstance(converter, wz_routing.AnyConverter):
+        # regex is "(?:one|two|...)", the first alternative is as good as any
+        first = converter.regex[3:-1].split("|", 1)[0]
+        candidates.insert(0, re.sub(r"\\(.)", r"\1", first))
+
+    for candidate in candidates:
+        if re.fullmatch(converter.regex, candidate) is None:
+            continue
+        try:
+            converter.to_python(candidate)
+        except wz_routing.ValidationError:
+            continue
+        return candidate
+
+    return None
+
+
+def sample_path(rule: wz_routing.Rule) -> T.Optional[str]:
+    """
+        Build a path that `rule` itself would match, None if one of its converters can't be satisfied.
+    """
+    parts = []
+    for converter, _, variable in wz_routing.parse_rule(rule.rule):
+        if converter is None:
+            parts.append(variable)
+        else:
+            value = sample_value(rule._converters[variable])  # pylint: disable=W0212
+            if value is None:
+                return None
+            parts.append(value)
+
+    return "".join(parts)
+
+
+def find_conflicts(route_map: wz_routing.Map) -> T.List[RouteConflict]:
+    """
+        Check every rule in the map against the others.
+
+        Host matching maps are not analyzed.
+
+    Returns
+    -------
+    A list of RouteConflict's in match order, empty if every rule is reachable.
+    """
+    if route_map.host_matching:
+        return []
+
+    route_map.update()
+    conflicts = []
+
+    # Asking werkzeug about every rule scans every rule, so use the radix tree when the map allows it
+    engine = None
+    if all(RadixEngine.is_supported(rule) for rule in route_map.iter_rules() if not rule.build_only):
+        engine = _AnalysisEngine(route_map)
+        engine.compile()
+
+    adapters = {}  # type: T.Dict[T.Tuple[T.Optional[str], str], wz_routing.MapAdapter]
+
+    for rule in route_map.iter_rules():
+        if rule.build_only or rule.alias:
+            continue
+
+        path = sample_path(rule)
+        if path is None:
+            log.debug("Unable to build a sample url for {rule!r}, skipping conflict check", rule=rule)
+            continue
+
+        bind_key = (rule.subdomain or None, "ws" if rule.websocket else "http")
+        adapter = adapters.get(bind_key)
+        if adapter is None:
+            adapter = adapters[bind_key] = route_map.bind("localhost", subdomain=bind_key[0], url_scheme=bind_key[1])
+
+        methods = sorted(rule.methods - {"HEAD", "OPTIONS"} or rule.methods) if rule.methods else ANY_METHODS
+        claimed_by = []
+        claimed_methods = []
+
+        for method in methods:
+            try:
+                if engine is None:
+                    matched, _ = adapter.match(path, method=method, return_rule=True)
+                else:
+                    matched, _ = engine.match(path, method, lambda: adapter)
+            except (wz_routing.RequestRedirect, HTTPException):
+                continue
+
+            # a rule claimed by another rule for the same endpoint (eg add_directory's pair) still reaches its view
+            if matched is not rule and matched.endpoint != rule.endpoint:
+                claimed_methods.append(method)
+                if all(matched is not other for other in claimed_by):
+                    claimed_by.append(matched)
+
+        if claimed_methods:
+            kind = SHADOWED if len(claimed_methods) == len(methods) else AMBIGUOUS
+            conflicts.append(RouteConflict(kind, rule, tuple(claimed_by), tuple(claimed_methods)))
+
+    return conflicts
@@ -0,0 +1,495 @@
+"""
+    Pluggable URL matching engines for RoutingResource.
+
+    Both engines work off of the same werkzeug routing Map so rules, converters, url building, and the
+    `request.rule` / `request.route_args` contract stay the same regardless of which one is used.
+
+    `WerkzeugEngine` is the default and just asks werkzeug's MapAdapter to match, which tests every rule's
+    regex one at a time.
+
+    `RadixEngine` compiles the map into a prefix tree keyed by path segment.  Static segments are a dict
+    lookup, converter segments are only tried on the branches that survive, so match cost grows with the
+    depth of the URL instead of the number of rules.
+
+    ```python
+        app = Application(__name__, routing_engine="radix")
+    ```
+
+"""
+from __future__ import annotations
+
+import re
+import typing as T
+
+from werkzeug import routing as wz_routing
+from werkzeug.urls import url_quote
+
+from ..log import getLogger
+
+log = getLogger(__name__)
+
+RuleMatch = T.Tuple[wz_routing.Rule, T.Dict[str, T.Any]]
+AdapterGetter = T.Callable[[], wz_routing.MapAdapter]
+
+# A converter whose regex can match across a "/" has to be matched against the remainder of the path
+GREEDY_PROBE = "a/b"
+
+
+def is_greedy(converter: wz_routing.BaseConverter) -> bool:
+    """
+        Does the converter's regex match across path separators (eg path and directory converters)?
+    """
+    return re.fullmatch(converter.regex, GREEDY_PROBE) is not None
+
+
+def split_segments(rule: wz_routing.Rule) -> T.List[T.List[T.Union[str, T.Tuple[str, wz_routing.BaseConverter]]]]:
+    """
+        Break a rule into path segments, each segment is a list of static text and (variable, converter) parts.
+        The leading empty segment before the first "/" is dropped.
+    """
+    segments = [[]]
+    for converter, _, variable in wz_routing.parse_rule(rule.rule):
+        if converter is None:
+            for position, piece in enumerate(variable.split("/")):
+                if position > 0:
+                    segments.append([])
+                if piece:
+                    segments[-1].append(piece)
+        else:
+            segments[-1].append((variable, rule._converters[variable]))  # pylint: disable=W0212
+
+    return segments[1:]
+
+
+def compile_parts(parts, start: int) -> T.Tuple[str, T.Tuple[str, ...], T.List]:
+    """
+        Build a regex from a run of static text and converter parts, groups are named positionally as
+        converter regexes may contain their own unnamed groups.
+    """
+    pattern = []
+    names = []
+    variables = []
+    for part in parts:
+        if isinstance(part, str):
+            pattern.append(re.escape(part))
+        else:
+            group_name = f"g{start + len(names)}"
+            pattern.append(f"(?P<{group_name}>{part[1].regex})")
+            names.append(group_name)
+            variables.append(part)
+
+    return "".join(pattern), tuple(names), variables
+
+
+def is_plain(rule: wz_routing.Rule) -> bool:
+    """
+        A rule whose match outcome depends only on its path pattern and methods.
+    """
+    return not rule.alias \
+        and not rule.websocket \
+        and not rule.subdomain \
+        and rule.host is None \
+        and rule.redirect_to is None \
+        and not rule.defaults \
+        and rule.strict_slashes
+
+
+def _segments_overlap(left, right) -> bool:
+    """
+        Could a single path segment satisfy both?  Only two different static segments are known to be disjoint.
+    """
+    left_static = all(isinstance(part, str) for part in left)
+    right_static = all(isinstance(part, str) for part in right)
+
+    if left_static and right_static:
+        return "".join(left) == "".join(right)
+    elif left_static:
+        return re.fullmatch(compile_parts(right, 0)[0], "".join(left)) is not None
+    elif right_static:
+        return re.fullmatch(compile_parts(left, 0)[0], "".join(right)) is not None
+
+    return True
+
+
+def rules_overlap(left: wz_routing.Rule, right: wz_routing.Rule) -> bool:
+    """
+        Conservatively decide if the order of two rules could change what a request matches.
+
+        False only when no request can be matched, redirected, or 405'd by both, so the two can swap places in
+        the map without changing any routing outcome.   When in doubt this returns True.
+    """
+    if is_plain(left) is False or is_plain(right) is False:
+        return True
+
+    # a rule ending in "/" also matches (and redirects) the same path without the slash regardless of method
+    if left.is_leaf and right.is_leaf and left.methods and right.methods \
+            and left.methods.isdisjoint(right.methods):
+        return False
+
+    left_segments = split_segments(left)
+    right_segments = split_segments(right)
+
+    def has_greedy(segment) -> bool:
+        return any(isinstance(part, tuple) and is_greedy(part[1]) for part in segment)
+
+    if any(map(has_greedy, left_segments + right_segments)):
+        # only a differing static prefix ahead of the greedy part keeps the two apart
+        for left_segment, right_segment in zip(left_segments, right_segments):
+            if has_greedy(left_segment) or has_greedy(right_segment):
+                return True
+            if _segments_overlap(left_segment, right_segment) is False:
+                return False
+        return True
+
+    lengths = {len(left_segments), len(right_segments)}
+    if len(lengths) > 1:
+        # "/foo/" (segments ["foo", ""]) still answers "/foo" with a redirect
+        if max(lengths) - min(lengths) > 1:
+            return False
+        longer = left if len(left_segments) > len(right_segments) else right
+        if longer.is_leaf:
+            return False
+
+    return all(_segments_overlap(left_segment, right_segment)
+               for left_segment, right_segment in zip(left_segments, right_segments))
+
+
+class WerkzeugEngine:
+    """
+        Default engine, defers entirely to werkzeug's MapAdapter.match
+    """
+
+    name: T.ClassVar[str] = "werkzeug"
+
+    # Successful matches between hit frequency reorders of the map, 0 disables reordering
+    REORDER_INTERVAL: T.ClassVar[int] = 1000
+    # How many of the hottest rules are moved forward per reorder
+    REORDER_TOP: T.ClassVar[int] = 8
+
+    def __init__(self, route_map: wz_routing.Map):
+        self.route_map = route_map
+        # id(rule) -> hits since the last reorder, halved after each reorder so old traffic fades out
+        self._hits = {}  # type: T.Dict[int, int]
+        self._matches = 0
+        # (id(rule), id(rule)) -> rules_overlap result, rules are immutable once added
+        self._overlaps = {}  # type: T.Dict[T.Tuple[int, int], bool]
+
+    def compile(self) -> None:
+        """
+            Prepare the engine for matching, for werkzeug this just sorts the rules into match order.
+        """
+        self.route_map.update()
+
+    def invalidate(self) -> None:
+        """
+            Called whenever a rule is added to the map.
+
+            werkzeug re-sorts the whole map on the next update so any learned order is lost anyway.
+        """
+        self._hits = {}
+        self._matches = 0
+        self._overlaps = {}
+
+    def _overlap(self, left: wz_routing.Rule, right: wz_routing.Rule) -> bool:
+        key = (id(left), id(right))
+        result = self._overlaps.get(key)
+        if result is None:
+            result = self._overlaps[key] = rules_overlap(left, right)
+        return result
+
+    def reorder(self) -> None:
+        """
+            Move the most frequently matched rules toward the front of werkzeug's match order.
+
+            A hot rule only hops over colder rules that cannot match the same request (see rules_overlap) so
+            every request still resolves to the same rule, redirect, or error as werkzeug's own order.
+        """
+        self.route_map.update()
+        rules = self.route_map._rules  # pylint: disable=W0212
+        hits = self._hits
+
+        hottest = sorted(hits.items(), key=lambda item: item[1], reverse=True)[:self.REORDER_TOP]
+        positions = {id(rule): index for index, rule in enumerate(rules)}
+
+        for rule_id, count in hottest:
+            index = positions.get(rule_id)
+            if index is None:
+                continue
+
+            rule = rules[index]
+            target = index
+            while target > 0 \
+                    and hits.get(id(rules[target - 1]), 0) < count \
+                    and self._overlap(rules[target - 1], rule) is False:
+                target -= 1
+
+            if target != index:
+                del rules[index]
+                rules.insert(target, rule)
+                positions = {id(other): position for position, other in enumerate(rules)}
+
+        self._hits = {rule_id: count // 2 for rule_id, count in hits.items() if count > 1}
+        self._matches = 0
+
+    def match(self, path_info: str, method: str, get_adapter: AdapterGetter) -> RuleMatch:
+        """
+        Parameters
+        ----------
+        path_info: str
+            The request path, not url decoded
+        method: str
+            Uppercase HTTP method
+        get_adapter: callable
+            Returns a MapAdapter bound to the current request's host
+
+        Raises
+        ------
+            werkzeug's RequestRedirect, NotFound, or MethodNotAllowed
+
+        """
+        rule, kwargs = get_adapter().match(path_info=path_info, method=method, return_rule=True)
+
+        if self.REORDER_INTERVAL:
+            self._hits[id(rule)] = self._hits.get(id(rule), 0) + 1
+            self._matches += 1
+            if self._matches >= self.REORDER_INTERVAL:
+                self.reorder()
+
+        return rule, kwargs
+
+
+class _Node:
+    """
+        A single path segment position in the radix tree.
+    """
+    __slots__ = ("static", "dynamic", "tails", "rules")
+
+    def __init__(self):
+        # segment text -> child
+        self.static = {}  # type: T.Dict[str, _Node]
+        # (compiled segment pattern, group names, child)
+        self.dynamic = []  # type: T.List[T.Tuple[T.Pattern, T.Tuple[str, ...], _Node]]
+        # (compiled pattern for the rest of the path, group names, order, rule entry)
+        self.tails = []  # type: T.List[T.Tuple[T.Pattern, T.Tuple[str, ...], int, _RuleEntry]]
+        # rules that end at this node
+        self.rules = []  # type: T.List[T.Tuple[int, _RuleEntry]]
+
+
+class _RuleEntry(T.NamedTuple):
+    rule: wz_routing.Rule
+    # variable name and converter in the order their values are captured
+    variables: T.Tuple[T.Tuple[str, wz_routing.BaseConverter], ...]
+
+
+class RadixEngine(WerkzeugEngine):
+    """
+        Segment based prefix tree compiled from the werkzeug map.
+
+        Every branch consistent with the requested path is explored and the matching rule that comes first in
+        werkzeug's own sort order wins, so the result is the same rule werkzeug would have picked.  Paths
+        with empty segments (eg `/foo//bar`) are handed to werkzeug so its merge_slashes redirect still
+        applies.
+
+        If the map has a rule the tree cannot represent (host or subdomain matching, redirect_to, aliases,
+        websocket rules, or strict_slashes=False) the engine logs a warning and defers to werkzeug for
+        everything.
+    """
+
+    name: T.ClassVar[str] = "radix"
+
+    def __init__(self, route_map: wz_routing.Map):
+        super().__init__(route_map)
+        self._root = None  # type: T.Optional[_Node]
+        self._delegate = False
+        # id()'s of rules another rule provides defaults for, these need werkzeug's redirect_defaults check
+        # werkzeug's Rule defines __eq__ without __hash__ so the rules themselves cannot go in a set
+        self._defaulted_rules = set()  # type: T.Set[int]
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        self._root = None
+
+    @staticmethod
+    def is_supported(rule: wz_routing.Rule) -> bool:
+        """
+            Can `rule` be represented in the tree with identical semantics?
+        """
+        return not rule.alias \
+            and not rule.websocket \
+            and not rule.subdomain \
+            and rule.host is None \
+            and rule.redirect_to is None \
+            and rule.strict_slashes
+
+    def compile(self) -> None:
+        super().compile()
+
+        root = _Node()
+        self._defaulted_rules = set()
+        self._delegate = False
+
+        for order, rule in enumerate(self.route_map.iter_rules()):
+            if rule.build_only:
+                continue
+
+            if self.is_supported(rule) is False:
+                log.warn("RadixEngine cannot represent {rule!r}, deferring all matching to werkzeug", rule=rule)
+                self._delegate = True
+                break
+
+            self._insert(root, order, rule)
+
+            for other in self.route_map._rules_by_endpoint.get(rule.endpoint, []):
+                if other.provides_defaults_for(rule):
+                    self._defaulted_rules.add(id(rule))
+
+        self._root = root
+
+    def _insert(self, root: _Node, order: int, rule: wz_routing.Rule) -> None:
+        node = root
+        variables = []
+        segments = split_segments(rule)
+
+        for index, segment in enumerate(segments):
+            if any(isinstance(part, tuple) and is_greedy(part[1]) for part in segment):
+                # Everything from here on is matched as one regex against the rest of the path
+                tail_parts = []
+                for position, remaining in enumerate(segments[index:]):
+                    if position > 0:
+                        tail_parts.append("/")
+                    tail_parts.extend(remaining)
+
+                pattern, names, tail_variables = compile_parts(tail_parts, len(variables))
+                variables.extend(tail_variables)
+                entry = _RuleEntry(rule, tuple(variables))
+                node.tails.append((re.compile(pattern), names, order, entry))
+                return
+
+            if all(isinstance(part, str) for part in segment):
+                node = node.static.setdefault("".join(segment), _Node())
+                continue
+
+            pattern, names, segment_variables = compile_parts(segment, len(variables))
+            variables.extend(segment_variables)
+
+            for existing, _, child in node.dynamic:
+                if existing.pattern == pattern:
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.dynamic.append((re.compile(pattern), names, child))
+                node = child
+
+        node.rules.append((order, _RuleEntry(rule, tuple(variables))))
+
+    def _collect(self, node: _Node, segments: T.List[str], index: int, captured: T.Tuple[str, ...],
+                 found: T.List[T.Tuple[int, _RuleEntry, T.Tuple[str, ...]]]) -> None:
+        """
+            Depth first walk of every branch consistent with the path, appending (order, entry, raw values)
+        """
+        if index == len(segments):
+            for order, entry in node.rules:
+                found.append((order, entry, captured))
+        else:
+            segment = segments[index]
+            child = node.static.get(segment)
+            if child is not None:
+                self._collect(child, segments, index + 1, captured, found)
+
+            for pattern, names, child in node.dynamic:
+                matched = pattern.fullmatch(segment)
+                if matched is not None:
+                    self._collect(child, segments, index + 1, captured + tuple(map(matched.group, names)), found)
+
+        # a tail starts after a "/" so there has to be at least one more segment, even if it is empty
+        if node.tails and index < len(segments):
+            remainder = "/".join(segments[index:])
+            for pattern, names, order, entry in node.tails:
+                matched = pattern.fullmatch(remainder)
+                if matched is not None:
+                    found.append((order, entry, captured + tuple(map(matched.group, names))))
+
+    def _candidates(self, path: str) -> T.List[T.Tuple[int, _RuleEntry, T.Tuple[str, ...], bool]]:
+        """
+            Every rule that could match `path` in werkzeug's match order.
+
+            Like werkzeug, a strict slashes rule ending in "/" also matches the same path without the
+            trailing slash, those candidates are flagged as needing a redirect.
+        """
+        found = []
+        self._collect(self._root, path[1:].split("/"), 0, (), found)
+        candidates = [(order, entry, raw_values, False) for order, entry, raw_values in found]
+
+        if path.endswith("/") is False:
+            slashed = []
+            self._collect(self._root, (path + "/")[1:].split("/"), 0, (), slashed)
+            candidates.extend((order, entry, raw_values, True)
+                              for order, entry, raw_values in slashed
+                              if entry.rule.is_leaf is False)
+
+        candidates.sort(key=lambda item: item[0])
+        return candidates
+
+    def match(self, path_info: str, method: str, get_adapter: AdapterGetter) -> RuleMatch:
+        if self._root is None:
+            self.compile()
+
+        path = "/" + path_info.lstrip("/")
+
+        if self._delegate or "//" in path:
+            return super().match(path_info, method, get_adapter)
+
+        allowed = set()
+
+        for _, entry, raw_values, needs_slash in self._candidates(path):
+            rule = entry.rule
+            values = {}
+            try:
+                for (variable, converter), raw in zip(entry.variables, raw_values):
+                    values[variable] = converter.to_python(raw)
+            except wz_routing.ValidationError:
+                continue
+
+            if rule.methods is not None and method not in rule.methods:
+                allowed.update(rule.methods)
+                continue
+
+            if needs_slash:
+                raise wz_routing.RequestRedirect(
+                    get_adapter().make_redirect_url(url_quote(path + "/", self.route_map.charset, safe="/:|+"))
+                )
+
+            if rule.defaults:
+                values.update(rule.defaults)
+
+            if id(rule) in self._defaulted_rules and self.route_map.redirect_defaults:
+                redirect_url = get_adapter().get_default_redirect(rule, method, values, {})
+                if redirect_url is not None:
+                    raise wz_routing.RequestRedirect(redirect_url)
+
+            return rule, values
+
+        if allowed:
+            raise wz_routing.MethodNotAllowed(valid_methods=list(allowed))
+
+        raise wz_routing.NotFound()
+
+
+ROUTE_ENGINES = {
+    WerkzeugEngine.name: WerkzeugEngine,
+    RadixEngine.name: RadixEngine,
+}  # type: T.Dict[str, T.Type[WerkzeugEngine]]
+
+
+def get_engine(engine: T.Union[str, T.Type[WerkzeugEngine]]) -> T.Type[WerkzeugEngine]:
+    """
+        Resolve an engine name ("werkzeug", "radix") or engine class.
+    """
+    if isinstance(engine, str):
+        try:
+            return ROUTE_ENGINES[engine]
+        except KeyError as exc:
+            raise ValueError(f"Unknown routing engine {engine!r}, expected one of {sorted(ROUTE_ENGINES)}") from exc
+
+    return engine
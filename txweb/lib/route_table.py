@@ -0,0 +1,319 @@
+"""
+    A single compiled routing table: the werkzeug Map plus everything derived from it to make matching cheap.
+
+    RoutingResource keeps one table for rules added without a host and one more per virtual host, see
+    `RoutingResource.add(..., host="api.example.com")`.
+
+"""
+from __future__ import annotations
+
+import typing as T
+
+from twisted.python import compat
+from werkzeug import routing as wz_routing
+
+from txweb import http_codes as HTTP_Errors
+from txweb.util.lru import LRUCache, CacheInfo
+from txweb.util.url_converter import DirectoryPath
+
+from .route_conflicts import find_conflicts, RouteConflict
+from .route_engines import get_engine, WerkzeugEngine
+from ..log import getLogger
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .str_request import StrRequest
+
+log = getLogger(__name__)
+
+BindKey = T.Tuple[bytes, str, str]
+
+
+class RouteHit(T.NamedTuple):
+    """
+        A successful match: the werkzeug Rule and the converted url arguments.
+    """
+    rule: wz_routing.Rule
+    kwargs: T.Dict[str, T.Any]
+
+
+# Every plain 404 is written from this, see RouteMiss.response_exception
+NOT_FOUND = HTTP_Errors.HTTP404()
+
+
+class RouteMiss(T.NamedTuple):
+    """
+        Everything needed to answer an unmatched request without asking werkzeug again.
+    """
+    code: int
+    valid_methods: T.Tuple[str, ...] = ()
+    redirect: T.Optional[str] = None
+    name: str = ""
+
+    @property
+    def exception_class(self) -> T.Type[HTTP_Errors.HTTPCode]:
+        """
+            The HTTPCode class this miss used to be raised as, for looking up its error handler.
+        """
+        if self.redirect is not None:
+            return HTTP_Errors.HTTP3xx
+        elif self.code == HTTP_Errors.HTTP405.CODE:
+            return HTTP_Errors.HTTP405
+
+        return HTTP_Errors.HTTP404
+
+    def to_exception(self) -> HTTP_Errors.HTTPCode:
+        """
+            The HTTPCode this miss used to be raised as, built fresh and unraised.
+        """
+        if self.redirect is not None:
+            return HTTP_Errors.HTTP3xx(self.code, self.redirect, self.name)
+        elif self.code == HTTP_Errors.HTTP405.CODE:
+            return HTTP_Errors.HTTP405(valid_methods=self.valid_methods)
+
+        return HTTP_Errors.HTTP404()
+
+    def response_exception(self) -> HTTP_Errors.HTTPCode:
+        """
+            to_exception for writing the response only, a plain 404 shares one prebuilt exception that is never
+            raised.
+        """
+        if self.redirect is None and self.code == HTTP_Errors.HTTP404.CODE:
+            return NOT_FOUND
+
+        return self.to_exception()
+
+
+class RouteTable:
+    """
+        One werkzeug Map with its matching engine, bound adapters, static index, and match cache.
+    """
+
+    # Upper bound on cached werkzeug MapAdapter's, the Host header is client controlled so this must stay bounded.
+    MAX_ADAPTERS: T.ClassVar[int] = 64
+    # Upper bound on cached (host, method, path) -> RouteHit | RouteMiss results, misses included.
+    MAX_MATCH_CACHE: T.ClassVar[int] = 4096
+
+    def __init__(self,
+                 host: T.Optional[str] = None,
+                 script_name: T.Optional[bytes] = None,
+                 engine: T.Union[str, T.Type[WerkzeugEngine]] = "werkzeug"):
+        """
+        Parameters
+        ----------
+        host: str
+            The virtual host this table answers for, None for the default table
+        script_name: bytes
+            See RoutingResource
+        engine: str
+            Which URL matching engine to use, see txweb.lib.route_engines
+        """
+        self.host = host
+        self.route_map = wz_routing.Map()  # type: wz_routing.Map
+        self.route_map.converters['directory'] = DirectoryPath
+        self.engine = get_engine(engine)(self.route_map)  # type: WerkzeugEngine
+
+        self._script_name = script_name
+        self._bind_script_name = None  # type: T.Optional[str]
+        self._adapters = LRUCache(self.MAX_ADAPTERS)
+        self._match_cache = LRUCache(self.MAX_MATCH_CACHE)
+        # (HTTP method or None for any method, path) -> converter free Rule, rebuilt lazily after invalidate
+        self._static_index = None  # type: T.Optional[T.Dict[T.Tuple[T.Optional[str], str], wz_routing.Rule]]
+        # Set by freeze(), the conflict report for the table as it was frozen
+        self._frozen = None  # type: T.Optional[T.List[RouteConflict]]
+
+    def __repr__(self):
+        return f"<RouteTable host={self.host!r} rules={len(self.route_map._rules)}>"  # pylint: disable=W0212
+
+    def iter_rules(self) -> T.Iterator[wz_routing.Rule]:
+        return self.route_map.iter_rules()
+
+    def add_rule(self, rule: wz_routing.RuleFactory) -> None:
+        """
+            Every mutation of the werkzeug routing map must go through here so that anything
+            derived from the map (eg bound adapters) is thrown away.
+
+        """
+        if self._frozen is not None:
+            raise RuntimeError(f"Cannot add {rule!r}, the routing table is frozen")
+
+        self.route_map.add(rule)
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+            Drop all cached routing state derived from the werkzeug map.
+        """
+        self._adapters.clear()
+        self._match_cache.clear()
+        self._static_index = None
+        self.engine.invalidate()
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen is not None
+
+    def freeze(self) -> T.List[RouteConflict]:
+        """
+            Compile the engine and static index now and refuse any further rules.
+
+        Returns
+        -------
+        The shadowed/ambiguous rule report from txweb.lib.route_conflicts
+        """
+        if self._frozen is None:
+            self.engine.compile()
+            self._static_index = self.build_static_index()
+            self._frozen = find_conflicts(self.route_map)
+
+        return self._frozen
+
+    @staticmethod
+    def normalize_script_name(script_name: T.Optional[bytes]) -> str:
+        """
+            Convert the optional CGI style SCRIPT_NAME prefix into the str form werkzeug expects.
+        """
+        if script_name is None:
+            script_name = b"/"
+
+        if script_name.startswith(b"/") is False:
+            script_name = b"/" + script_name
+
+        return script_name.decode("utf-8")
+
+    def bind_key(self, request: StrRequest) -> BindKey:
+        """
+            The parts of a request that decide how the routing map is bound: (server_name, url_scheme, script_name)
+        """
+        server_port = getattr(request.getHost(), "port", 0)
+
+        if server_port not in [443, 80, 0]:
+            server_name = request.getRequestHostname() + b":" + compat.intToBytes(server_port)
+        else:
+            server_name = request.getRequestHostname()
+
+        if self._bind_script_name is None:
+            self._bind_script_name = self.normalize_script_name(self._script_name)
+
+        url_scheme = "https" if request.isSecure() else "http"
+        return server_name, url_scheme, self._bind_script_name
+
+    def build_map(self, request: StrRequest, bind_key: BindKey = None) -> wz_routing.MapAdapter:
+        """
+            Takes all of the information provided by the request object and adapts them to match the wsgi environment
+            dictionary so that werkzeug can provide a routing map.
+
+            Binding is per host rather than per request, the resulting MapAdapter is cached by
+            (server_name, url_scheme, script_name) and reused until a rule is added to the map.
+
+        :param request:
+        :param bind_key: optional, the already computed result of bind_key(request)
+        :return: A werkzeug MapAdapter bound to the request's host
+        """
+        key = bind_key or self.bind_key(request)
+
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            server_name, url_scheme, script_name = key
+            adapter = self._adapters.set(key, self.route_map.bind(server_name.decode("utf-8"),
+                                                                  script_name=script_name,
+                                                                  url_scheme=url_scheme))
+
+        return adapter
+
+    @staticmethod
+    def is_static_rule(rule: wz_routing.Rule) -> bool:
+        """
+            Can `rule` only ever match its own literal path, without redirects or converters?
+        """
+        return not rule.arguments \
+            and not rule.build_only \
+            and not rule.alias \
+            and not rule.websocket \
+            and not rule.subdomain \
+            and rule.host is None \
+            and rule.redirect_to is None
+
+    def build_static_index(self) -> T.Dict[T.Tuple[T.Optional[str], str], wz_routing.Rule]:
+        """
+            Index every converter free rule by (method, path) in werkzeug's own match order so
+            that the first rule werkzeug would pick is the one stored.
+
+            Rules without a methods restriction are stored under (None, path).  Once such a rule is indexed,
+            later rules for the same path can never be reached by werkzeug so they are skipped.
+
+        """
+        index = {}
+
+        if self.route_map.host_matching:
+            return index
+
+        # Sorts the rules into match order
+        self.route_map.update()
+
+        for rule in self.route_map.iter_rules():
+            if self.is_static_rule(rule) is False or (None, rule.rule) in index:
+                continue
+
+            if rule.methods is None:
+                index[(None, rule.rule)] = rule
+            else:
+                for method in rule.methods:
+                    index.setdefault((method, rule.rule), rule)
+
+        return index
+
+    def engine_match(self, request: StrRequest, bind_key: BindKey, path_info: str,
+                     method: str) -> T.Union[RouteHit, RouteMiss]:
+        """
+            Ask the matching engine and fold werkzeug's routing exceptions into a RouteMiss so
+            they can be cached.
+        """
+        try:
+            rule, kwargs = self.engine.match(path_info, method, lambda: self.build_map(request, bind_key))
+        except wz_routing.RequestRedirect as redirect:
+            return RouteMiss(redirect.code, redirect=redirect.new_url, name=redirect.name)
+        except wz_routing.NotFound:
+            return RouteMiss(HTTP_Errors.HTTP404.CODE)
+        except wz_routing.MethodNotAllowed as exc:
+            return RouteMiss(HTTP_Errors.HTTP405.CODE, valid_methods=tuple(exc.valid_methods or ()))
+
+        return RouteHit(rule, kwargs)
+
+    def match(self, request: StrRequest) -> T.Union[RouteHit, RouteMiss]:
+        """
+            Find the rule for the current request.
+
+            Lookup order is the static index, then the per host match cache, and finally the matching engine.
+            Both matches and misses are cached so repeated bad URL's don't pay for a full engine scan.
+
+        """
+        path_info = request.path.decode("utf-8")
+        method = request.method.decode("utf-8").upper()
+
+        if self._static_index is None:
+            self._static_index = self.build_static_index()
+
+        # mirror how werkzeug's MapAdapter.match normalizes path_info
+        path = "/" + path_info.lstrip("/")
+        rule = self._static_index.get((method, path)) or self._static_index.get((None, path))
+        if rule is not None:
+            return RouteHit(rule, {})
+
+        bind_key = self.bind_key(request)
+        cache_key = (bind_key, method, path_info)
+
+        result = self._match_cache.get(cache_key)
+        if result is None:
+            result = self._match_cache.set(cache_key, self.engine_match(request, bind_key, path_info, method))
+
+        if isinstance(result, RouteHit):
+            # views are free to mutate route_args, don't let that leak into the cache
+            result = RouteHit(result.rule, dict(result.kwargs))
+
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        """
+            Hit/miss statistics for the match cache.  Static index hits never reach the cache and are not counted.
+        """
+        return self._match_cache.info()
@@ -15,6 +15,8 @@ EndpointFunc = T.Callable[[MessageHandler], None]
 class RoutedWSFactory(WebSocketServerFactory):  # pragma: no cover
 
     routes: T.Dict[str, T.Callable]
+    # Open connections, maintained by WSProtocol.onOpen/onClose
+    connections: T.Set[WSProtocol]
 
     def __init__(self, url, routes, protocol_cls=WSProtocol, application=None):
         WebSocketServerFactory.__init__(self, url)
@@ -22,6 +24,7 @@ class RoutedWSFactory(WebSocketServerFactory):  # pragma: no cover
 
         self.routes = routes
         self._application = application
+        self.connections = set()
 
     def get_endpoint(self, name: str) -> EndpointFunc:
         """
@@ -16,11 +16,13 @@
 from __future__ import annotations
 
 # import cgi
-import json
-from urllib.parse import parse_qs
+import io
+from urllib.parse import parse_qsl
 import typing as T
 
 
+from twisted.internet import defer
+from twisted.python import failure
 from twisted.web.server import Request, NOT_DONE_YET
 # from twisted.web.server import supportedMethods
 from twisted.web.http import FOUND
@@ -30,12 +32,25 @@ from twisted.python.compat import intToBytes
 from werkzeug.formparser import FormDataParser
 from werkzeug.datastructures import MultiDict
 from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
 
 from ..log import getLogger
-from ..http_codes import HTTP500
+from ..http_codes import HTTPCode, HTTP400, HTTP413, HTTP500
+from .multipart import BodyLimits, MultipartParser
+from .body_stream import BodyStream
+from .response_stream import ResponseStream
+from .json_codec import JSONCodec, DEFAULT_CODEC
+from ..util.basic import sanitize_render_output, is_json_output, is_stream_output
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .route_table import RouteMiss
 
 log = getLogger(__name__)
 
+# request.json has not been decoded yet, None is a valid result
+_UNPARSED = object()
+
 class StrRequest(Request):
     """
         Request is actually a merger of three different topics.
@@ -51,16 +66,32 @@ class StrRequest(Request):
     NOT_DONE_YET: T.Union[int, bool] = NOT_DONE_YET
 
     def __init__(self, *args, **kwargs):
+        # args, form, and files are parsed on first use, see their properties
+        self._query = b""
+        self._args = None  # type: T.Optional[MultiDict]
+        self._form = None  # type: T.Optional[MultiDict]
+        self._files = None  # type: T.Optional[MultiDict]
+        self._json = _UNPARSED  # type: T.Any
 
         Request.__init__(self, *args, **kwargs)
 
-        # self.args = {} is already defined in Request's init
-        self.form = {}   # type: T.Dict[str, str]
-        self.files = {}  # type: T.Dict[str, FileStorage]
-
         self._call_before_render = None
         self._call_after_render = None
 
+        # Set from the route's limits by gotLength, see txweb.lib.multipart.BodyLimits
+        self.body_limits = BodyLimits()
+        self._body_parser = None  # type: T.Optional[MultipartParser]
+        # HTTPCode raised by render() instead of the view, eg a body over its limits
+        self._body_error = None  # type: T.Optional[HTTPCode]
+        self._body_received = 0
+        # The response to a body that went over its limits was already sent, see _abortBody
+        self._body_aborted = False
+        # Only for routes added with stream_body=True, see txweb.lib.body_stream
+        self.body = None  # type: T.Optional[BodyStream]
+        self._finish_pending = False
+        # Set by RoutingResource when no route matched, see txweb.lib.route_table.RouteMiss
+        self.route_miss = None  # type: T.Optional[RouteMiss]
+
     def getCookie(self, cookie_name: T.Union[str, bytes]) -> T.Union[str, bytes]:
         """
         Wrapper around Request's getCookie to convert to and from byte strings
@@ -106,6 +137,10 @@ class StrRequest(Request):
         """
             Wrapper to prevent unicode/str's from going to Request's write method
         """
+        if self._body_aborted:
+            # A bare error response was already sent and the connection is closing, see _abortBody
+            return None
+
         if isinstance(data, str):
             data = data.encode("utf-8")
         elif isinstance(data, bytes) is False:
@@ -131,6 +166,9 @@ class StrRequest(Request):
 
         """
 
+        if isinstance(response_body, str):
+            response_body = response_body.encode("utf-8")
+
         content_length = intToBytes(len(response_body))
         self.setHeader("Content-Length", content_length)
 
@@ -144,7 +182,7 @@ class StrRequest(Request):
         """
             Utility to take a dictionary and convert it to a JSON string
         """
-        payload = json.dumps(data)
+        payload = self.json_codec.dumps(data)
         content_length = intToBytes(len(payload))
         self.setHeader("Content-Type", "application/json")
         self.setHeader("Content-Length", content_length)
@@ -195,57 +233,292 @@ class StrRequest(Request):
             Ensure's the connection has been flushed and closed without throwing an error.
 
         """
-        if self.finished not in [1, True]:
+        if self.finished not in [1, True] and self._finish_pending is False:
             self.finish()
 
+    def gotLength(self, length: T.Optional[int]) -> None:
+        """
+            Called by the HTTP channel once all of the headers are in and before any of the body is read.
+
+            This is the first point the route's body limits are known.   A Content-Length over max_content_length is
+            refused right here, see _refuseBody, and from here on a multipart body is handed to a streaming parser as
+            it arrives instead of being buffered into self.content.
+
+        :param length: the Content-Length, None for a chunked body
+        """
+        command, path = getattr(self.channel, "_command", None), getattr(self.channel, "_path", None)
+        if command is None or path is None:
+            Request.gotLength(self, length)
+            return
+
+        # requestReceived sets these again, routing needs them now to find the route's limits
+        self.method, self.uri = command, path
+        self.path = path.split(b"?", 1)[0]
+
+        site_limits = getattr(getattr(self, "site", None), "body_limits", None)
+        if site_limits is not None:
+            try:
+                self.body_limits = site_limits(self)
+            except ValueError:
+                # eg an undecodable path, left for routing to report once the request is processed
+                pass
+
+        limit = self.body_limits.max_content_length
+        if limit is not None and length is not None and length > limit:
+            Request.gotLength(self, 0)
+            self._refuseBody(HTTP413())
+            return
+
+        streams_body = getattr(getattr(self, "site", None), "streams_body", None)
+        if streams_body is not None and streams_body(self):
+            Request.gotLength(self, 0)
+            self._streamBody(self.channel._version)  # pylint: disable=W0212
+            return
+
+        Request.gotLength(self, length)
+
+        content_type = self.requestHeaders.getRawHeaders(b"content-type")
+        if self.method == b"POST" and content_type:
+            mimetype, options = parse_options_header(content_type[0].decode("latin-1"))
+            if mimetype == "multipart/form-data" and options.get("boundary"):
+                self._body_parser = MultipartParser(options["boundary"].encode("latin-1"), self.body_limits)
+
+    def _streamBody(self, version: bytes) -> None:
+        """
+            Process the request now, with the body going to self.body as it arrives instead of to self.content.
+
+            twisted answers `Expect: 100-continue` after gotLength returns, by then the view could have started the
+            response so it is answered here first.
+        """
+        self.body = BodyStream(self.channel.transport)
+
+        expect = self.requestHeaders.getRawHeaders(b"expect")
+        if expect and expect[0].lower() == b"100-continue" and version == b"HTTP/1.1":
+            self.requestHeaders.removeHeader(b"expect")
+            self.channel.transport.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        self._setRequestLine(self.method, self.uri, version)
+        self.process()
+
+    def _refuseBody(self, error: HTTPCode) -> None:
+        """
+            Answer the request with error without reading any of its body.
+
+            The request goes on as if it had no body at all, render raises error to the application's error handlers.
+            `Expect: 100-continue` is dropped so the client is never told to send the body, and the connection is
+            closed after the response because a client that did not wait could still be sending it.
+        """
+        self._body_error = error
+        self.requestHeaders.removeHeader(b"expect")
+        self.channel.length = 0
+        self.channel.persistent = False
+        self.setHeader(b"connection", b"close")
+
+    def handleContentChunk(self, data: bytes) -> None:
+        """
+            Body data as it is read off the connection, counted against max_content_length and either fed to
+            the multipart parser or written to self.content.
+
+            A chunked body can only be found to be too large while it is being read, see _abortBody.
+        """
+        self._body_received += len(data)
+        if self._body_error is not None:
+            return
+
+        limit = self.body_limits.max_content_length
+        if limit is not None and self._body_received > limit:
+            self._abortBody(HTTP413())
+        elif self.body is not None:
+            self.body.write(data)
+        elif self._body_parser is not None:
+            try:
+                self._body_parser.feed(data)
+            except HTTPCode as exc:
+                self._abortBody(exc)
+        else:
+            Request.handleContentChunk(self, data)
+
+    def _abortBody(self, error: HTTPCode) -> None:
+        """
+            The body went over its limits while it was being read, respond with error and drop the connection
+            instead of reading the rest of it.
+
+            Like twisted's own response to a malformed request this is written straight to the transport, the
+            request never reaches the application.
+        """
+        self._discardBody(error)
+        self._body_aborted = True
+        log.info("uri={uri!r} body refused after {received} bytes with {code}", uri=self.uri,
+                 received=self._body_received, code=error.code)
+        if not self.startedWriting:
+            self.channel.transport.write(b"HTTP/1.1 %d %s\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+                                         % (error.code, error.encoded_message))
+        self.channel.loseConnection()
+
+        if self.body is not None:
+            # A streaming view finds out from its body, anything it writes from now on is dropped
+            self.body.fail(error)
+
+    def _discardBody(self, error: HTTPCode) -> None:
+        self._body_error = error
+        if self._body_parser is not None:
+            self._body_parser.abort()
+            self._body_parser = None
+
+        self.content.close()
+        self.content = io.BytesIO()
+
     def requestReceived(self, command, path, version):
         """
             Looks for POST'd arguments in form format (eg multipart).
             Allows for file uploads and adds them to .args
 
         """
+        if self._body_aborted:
+            # The rest of the body arrived in the same read as the part that went over the limit
+            return
+
+        if self.body is not None:
+            # Already processed when the headers came in, see _streamBody
+            self.body.finish()
+            return
+
         self.content.seek(0, 0)
+        self._form = self._files = None
+        self._setRequestLine(command, path, version)
+
+        if self._body_parser is not None:
+            # A multipart body that was parsed as it arrived
+            try:
+                self.form, self.files = self._body_parser.close()
+            except HTTPCode as exc:
+                self._discardBody(exc)
+            self._body_parser = None
 
-        self.args = {}
-        self.form = {}
+        self.process()
 
+    def _setRequestLine(self, command: bytes, path: bytes, version: bytes) -> None:
+        """
+            method, uri, clientproto, and path from the request line, the query string is only parsed if
+            args is used.
+        """
         self.method, self.uri = command, path
         self.clientproto = version
+        self.path, _, self._query = path.partition(b"?")
+        self._args = None
+
+    @property
+    def args(self) -> MultiDict:
+        """
+            The query string arguments as str's, parsed on first use.
+        """
+        if self._args is None:
+            # Most requests have no query string at all
+            self._args = MultiDict(parse_qsl(self._query.decode("utf-8"))) if self._query else MultiDict()
+
+        return self._args
+
+    @args.setter
+    def args(self, value: T.Union[MultiDict, T.Dict]) -> None:
+        self._args = value
+
+    @property
+    def form(self) -> MultiDict:
+        """
+            The fields of a POST'd form, parsed from the body on first use unless the body was multipart.
+
+            Raises HTTP413 if the form is over the route's max_form_memory_size.
+        """
+        if self._form is None:
+            self._parseForm()
+
+        return self._form
+
+    @form.setter
+    def form(self, value: T.Union[MultiDict, T.Dict]) -> None:
+        self._form = value
+
+    @property
+    def files(self) -> MultiDict:
+        """
+            The files of a POST'd multipart form, see form.
+        """
+        if self._files is None:
+            self._parseForm()
+
+        return self._files
+
+    @files.setter
+    def files(self, value: T.Union[MultiDict, T.Dict]) -> None:
+        self._files = value
 
-        x = self.uri.split(b"?", 1)
+    def _hasFormBody(self) -> bool:
+        """
+            Is there a POST'd body in self.content that form and files have not been parsed from yet?
+        """
+        return self._form is None and self.method == b"POST" and self._body_error is None and self.body is None \
+            and self.requestHeaders.hasHeader(b"content-type") and self.requestHeaders.hasHeader(b"content-length")
 
-        if len(x) == 1:
-            self.path = self.uri
+    def _parseForm(self) -> None:
+        if self._hasFormBody():
+            self._processFormData(self.requestHeaders.getRawHeaders(b"content-type")[0],
+                                  self.requestHeaders.getRawHeaders(b"content-length")[0])
         else:
-            self.path, arg_string = x
-            self.args = parse_qs(arg_string.decode())
+            self._form, self._files = MultiDict(), MultiDict()
+
+    def _cleanup(self) -> None:
+        """
+            twisted closes self.content once the response is done.   A form body that has not been parsed yet is kept
+            for form and files if it is in memory, a spooled one is parsed first so it does not hold a file open.
+            Any other body is closed unread.
+        """
+        content = self.content
+        if not self._hasFormBody() or content is None:
+            Request._cleanup(self)
+            return
 
-        ctype = self.requestHeaders.getRawHeaders(b'content-type')
-        clength = self.requestHeaders.getRawHeaders(b'content-length')
-        if ctype is not None:
-            ctype = ctype[0]
+        content_type = self.requestHeaders.getRawHeaders(b"content-type")[0]
+        mimetype = parse_options_header(content_type.decode("latin-1"))[0]
+        if mimetype not in ("application/x-www-form-urlencoded", "multipart/form-data"):
+            Request._cleanup(self)
+            return
 
-        if clength is not None:
-            clength = clength[0]
+        if isinstance(content, io.BytesIO):
+            self.content = None
+            Request._cleanup(self)
+            self.content = content
+            return
 
-        if self.method == b"POST" and ctype and clength:
-            self._processFormData(ctype,  clength)
+        try:
+            self._parseForm()
+        except HTTPCode:
+            self._form, self._files = MultiDict(), MultiDict()
+        Request._cleanup(self)
 
-            self.content.seek(0, 0)
+    def finish(self):
+        """
+            The response is complete.   twisted's channel can't go on to the next request before this one's body
+            has been read, a streaming view that answers early is only finished once its body has arrived.
+        """
+        if self._body_aborted:
+            return None
 
-        # Args are going to userland, switch bytes back to str
-        query_args = self.args.copy()
+        if self.body is not None and self.body.complete is False:
+            if self._finish_pending is False:
+                self._finish_pending = True
+                self.body.whenComplete().addCallback(self._finishAfterBody)
+            return None
 
-        def query_iter(arguments):
-            for key, values in arguments.items():
-                key = key.decode("utf-8") if isinstance(key, bytes) else key
-                for val in values:
-                    val = val.decode("utf-8") if isinstance(val, bytes) else val
-                    yield key, val
+        return Request.finish(self)
 
-        self.args = MultiDict(list(query_iter(query_args)))
+    def _finishAfterBody(self, error: T.Optional[failure.Failure]) -> None:
+        if error is None and not self._disconnected:
+            Request.finish(self)
 
-        self.process()
+    def connectionLost(self, reason: failure.Failure) -> None:
+        Request.connectionLost(self, reason)
+        if self.body is not None:
+            self.body.fail(reason)
 
     @property
     def methodIsPost(self) -> bool:
@@ -283,6 +556,14 @@ class StrRequest(Request):
         -------
         None, output is written directly to the underlying HTTP channel.
         """
+        if self._body_error is not None:
+            raise self._body_error
+
+        if getattr(resrc, "isRouteMiss", False) is True:
+            # Unmatched routes never reached a view, so the before/after render hooks do not apply
+            resrc.render(self)
+            return
+
         body = None
         if self._call_before_render is not None:
             body = self._call_before_render(self)
@@ -290,6 +571,52 @@ class StrRequest(Request):
         if body is None:
             body = resrc.render(self)
 
+        if isinstance(body, defer.Deferred):
+            self._renderDeferred(resrc, body)
+            return
+
+        self._writeBody(resrc, body)
+
+    def _renderDeferred(self, resrc: resource.Resource, deferred: defer.Deferred) -> None:
+        """
+            Wait on an `async def` view (or one that returned a Deferred) and then send its result the same way a
+            synchronous view's body is sent.   Failures go up the processingFailed chain and the view is cancelled if
+            the client goes away first.
+        """
+        self.notifyFinish().addErrback(lambda _: deferred.cancel())
+        deferred.addCallback(self._finishDeferred, resrc)
+        deferred.addErrback(self._failDeferred)
+
+    def _finishDeferred(self, result: T.Any, resrc: resource.Resource) -> None:
+        if self.finished or self._disconnected:
+            # The view already answered the request itself or there is no one left to answer
+            return
+
+        if result is None and self.startedWriting:
+            # The view wrote its own response but left finishing it to us
+            self.finish()
+            return
+
+        self._writeBody(resrc, sanitize_render_output(result))
+
+    def _failDeferred(self, reason: failure.Failure) -> None:
+        if self._disconnected:
+            if reason.check(defer.CancelledError) is None:
+                log.error(f"uri={self.uri} failed after the client disconnected: {reason.getErrorMessage()}")
+            return
+
+        self.processingFailed(reason)
+
+    def _writeBody(self, resrc: resource.Resource, body: T.Union[bytes, int, T.Dict, T.List, T.Any]) -> None:
+        """
+            Everything after the resource has produced its body: JSON encoding, after render hooks, Content-Length,
+            and finish.   Generators and other iterables of chunks are streamed instead, see _writeStream.
+        """
+        if is_json_output(body):
+            # Straight to bytes, the Content-Length below is the encoded length
+            body = self.json_codec.dumps(body)
+            self.setHeader(b"content-type", b"application/json")
+
         if self._call_after_render is not None:
             self._call_after_render(self, body)
 
@@ -298,6 +625,10 @@ class StrRequest(Request):
         if body is NOT_DONE_YET:
             return
 
+        if is_stream_output(body):
+            self._writeStream(body)
+            return
+
         if not isinstance(body, bytes):
             log.error(
                 f"<{type(resrc)}{resrc!r}>" 
@@ -322,14 +653,47 @@ class StrRequest(Request):
             self.write(body)
         self.finish()
 
+    def _writeStream(self, chunks: T.Union[T.Iterable, T.AsyncIterable]) -> None:
+        """
+            Write a view's chunks as they are produced with the request's channel pausing and resuming them, see
+            txweb.lib.response_stream.   Without a Content-Length the response is chunked for HTTP/1.1 clients.
+        """
+        if self.method == b"HEAD":
+            # Only the headers are sent, the view's output is never read
+            self.write(b"")
+            self.finish()
+            return
+
+        stream = ResponseStream(self, chunks)
+        self.notifyFinish().addErrback(lambda _: stream.stopProducing())
+        stream.start().addCallbacks(self._finishStream, self._failStream, errbackArgs=(stream,))
+
+    def _finishStream(self, _: T.Any) -> None:
+        if not self.finished and not self._disconnected:
+            self.finish()
+
+    def _failStream(self, reason: failure.Failure, stream: ResponseStream) -> None:
+        if self._disconnected:
+            return
+
+        if not self.startedWriting:
+            # Nothing was sent yet, it can still be an error page
+            self.processingFailed(reason)
+            return
+
+        # The headers and part of the body are out, all that is left is to not end the response so the client knows
+        # it is incomplete
+        log.error(f"uri={self.uri} streamed response failed after {stream.written} bytes: {reason.getErrorMessage()}")
+        self.channel.loseConnection()
+
     def _processFormData(self, content_type, content_length):
         """
         Processes POST requests and puts POST'd arguments into args.
 
         Thank you Cristina - http://www.cristinagreen.com/uploading-files-using-twisted-web.html
 
-        TODO this can be problematic if a large binary file is being uploaded
-        TODO verify Twisted HTTP channel/transport blows up if file upload size is "too big"
+        Multipart bodies received through an HTTP channel are parsed while they arrive, see gotLength, this is
+        for everything else already sitting in self.content and only runs the first time form or files is used.
         """
         options = {}
 
@@ -347,10 +711,16 @@ class StrRequest(Request):
 
         content_length = int(content_length)
 
+        parser = FormDataParser(max_form_memory_size=self.body_limits.max_form_memory_size,
+                                max_content_length=self.body_limits.max_content_length)
+        position = self.content.tell()
         self.content.seek(0, 0)
-        parser = FormDataParser()
-        _, self.form, self.files = parser.parse(self.content, content_type, content_length, options=options)
-        self.content.seek(0, 0)
+        try:
+            _, self.form, self.files = parser.parse(self.content, content_type, content_length, options=options)
+        except RequestEntityTooLarge as exc:
+            raise HTTP413() from exc
+        finally:
+            self.content.seek(position, 0)
 
     def processingFailed(self, reason):
         """
@@ -358,22 +728,56 @@ class StrRequest(Request):
         :param reason:
         :return:
         """
+        if self._body_aborted:
+            return None
+
         self.site.processingFailed(self, reason)
 
+    def processingMiss(self, miss: RouteMiss):
+        """
+            Start of the no-exception chain for unmatched routes (404, 405, and slash redirects) that
+            leads up to Application.processingMiss
+
+        :param miss: txweb.lib.route_table.RouteMiss
+        """
+        self.site.processingMiss(self, miss)
+
+    @property
+    def json_codec(self) -> JSONCodec:
+        """
+            The application's JSON codec, see txweb.lib.json_codec
+        """
+        return getattr(getattr(self, "site", None), "json_codec", DEFAULT_CODEC)
+
     @property
     def json(self) -> T.Any:
         """
         Is this a JSON posted request?
 
+        The body is decoded the first time and the same object is returned after that.   Raises HTTP400 if the body
+        is not valid JSON.
+
         Returns
         -------
         Ideally returns a dict object as I cannot think of what else a sane client would send in JSON format.
+        None if the request's Content-Type is not JSON.
+
+        """
+        if self._json is _UNPARSED:
+            content_type = self.getHeader("Content-Type")
+            if content_type and content_type.split(";", 1)[0].strip().lower() in ("application/json", "text/json"):
+                position = self.content.tell()
+                self.content.seek(0, 0)
+                try:
+                    self._json = self.json_codec.loads(self.content.read())
+                except ValueError as exc:
+                    raise HTTP400() from exc
+                finally:
+                    self.content.seek(position, 0)
+            else:
+                self._json = None
 
-        """
-        if self.getHeader("Content-Type") in ["application/json", "text/json"]:
-            return json.loads(self.content.read())
-        else:
-            return None
+        return self._json
 
     def get_json(self) -> T.Any:
         """
@@ -0,0 +1,231 @@
+"""
+    Named thread pools for views and websocket endpoints that have to call blocking code.
+
+    ```python
+        app.thread_pool("reports", max_threads=4)
+
+        @app.route("/report/<int:report_id>", threaded="reports")
+        def report(request, report_id):
+            return legacy_reporting.render(report_id)  # blocks, but only a "reports" worker
+
+        @app.route("/lookup", threaded=True)  # the "default" pool
+        def lookup(request):
+            ...
+    ```
+
+    The view runs in one of the pool's threads and its return value is handed back to the reactor thread where the
+    response is written, see StrRequest.render.   A threaded view MUST NOT write to or finish the request itself,
+    twisted's request and transport are not thread safe.
+
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+import typing as T
+
+from twisted.internet import defer, threads
+from twisted.internet import reactor as default_reactor
+from twisted.python.threadpool import ThreadPool
+
+DEFAULT_POOL = "default"
+# Set on the callables returned by ViewThreadPool.wrap to the pool's name
+THREAD_POOL_ID = "__thread_pool__"
+
+
+def is_threaded(func: T.Callable[..., T.Any]) -> bool:
+    """
+        Was func wrapped to run in a thread pool?
+    """
+    return getattr(func, THREAD_POOL_ID, None) is not None
+
+
+class PoolStats(T.NamedTuple):
+    """
+        A snapshot of one pool's load, wait times are in seconds.
+    """
+    name: str
+    min_threads: int
+    max_threads: int
+    queued: int
+    active: int
+    completed: int
+    failed: int
+    mean_wait: float
+    max_wait: float
+
+
+class ViewThreadPool:
+    """
+        A twisted ThreadPool plus the bookkeeping needed to report queue depth, busy workers, and how long calls
+        waited for a free worker.
+    """
+
+    DEFAULT_MIN_THREADS: T.ClassVar[int] = 0
+    DEFAULT_MAX_THREADS: T.ClassVar[int] = 10
+
+    def __init__(self, name: str, twisted_reactor, min_threads: int = None, max_threads: int = None):
+        """
+        Parameters
+        ----------
+        name: str
+            Used for the pool's thread names and in stats
+        twisted_reactor:
+            The reactor results are delivered to
+        min_threads, max_threads: int
+            Pool size, see twisted.python.threadpool.ThreadPool
+        """
+        self.name = name
+        self.reactor = twisted_reactor
+        self.pool = ThreadPool(self.DEFAULT_MIN_THREADS if min_threads is None else min_threads,
+                               self.DEFAULT_MAX_THREADS if max_threads is None else max_threads,
+                               name=f"txweb-{name}")
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._waited = 0.0
+        self._max_wait = 0.0
+        self._shutdown_trigger = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name!r} threads={self.pool.min}..{self.pool.max}>"
+
+    @property
+    def started(self) -> bool:
+        return bool(self.pool.started)
+
+    def start(self) -> None:
+        """
+            Start the worker threads and stop them again when the reactor shuts down.   Called by the first `run`.
+        """
+        if self.pool.started:
+            return
+
+        self.pool.start()
+        self._shutdown_trigger = self.reactor.addSystemEventTrigger("during", "shutdown", self.stop)
+
+    def stop(self) -> None:
+        if self.pool.started:
+            self.pool.stop()
+
+        if self._shutdown_trigger is not None:
+            trigger, self._shutdown_trigger = self._shutdown_trigger, None
+            try:
+                self.reactor.removeSystemEventTrigger(trigger)
+            except (ValueError, KeyError):
+                # Already fired, ie stop was called by the trigger itself
+                pass
+
+    def resize(self, min_threads: int = None, max_threads: int = None) -> None:
+        self.pool.adjustPoolsize(self.pool.min if min_threads is None else min_threads,
+                                 self.pool.max if max_threads is None else max_threads)
+
+    def run(self, func: T.Callable[..., T.Any], *args, **kwargs) -> defer.Deferred:
+        """
+            Call func(*args, **kwargs) in a worker thread.
+
+        Returns
+        -------
+        A Deferred that fires on the reactor thread with func's return value or failure
+        """
+        if self.pool.started is False:
+            self.start()
+
+        submitted = time.monotonic()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._waited += waited
+                self._max_wait = max(self._max_wait, waited)
+
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._failed += failed
+
+        return threads.deferToThreadPool(self.reactor, self.pool, call)
+
+    def wrap(self, func: T.Callable[..., T.Any]) -> T.Callable[..., defer.Deferred]:
+        """
+            Decorate func so calling it runs it in this pool, the wrapper keeps func's name for endpoint naming.
+        """
+        @functools.wraps(func)
+        def threaded(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+
+        setattr(threaded, THREAD_POOL_ID, self.name)
+        return threaded
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            started = self._completed + self._active
+            return PoolStats(self.name, self.pool.min, self.pool.max, self._queued, self._active, self._completed,
+                             self._failed, self._waited / started if started else 0.0, self._max_wait)
+
+
+class ThreadPools:
+    """
+        Application wide registry of ViewThreadPool's by name, pools are created on first use.
+    """
+
+    def __init__(self, twisted_reactor=None):
+        self.reactor = twisted_reactor or default_reactor
+        self._pools = {}  # type: T.Dict[str, ViewThreadPool]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._pools
+
+    def get(self, name: str = DEFAULT_POOL, min_threads: int = None, max_threads: int = None) -> ViewThreadPool:
+        """
+            Return the named pool, creating it if needed.   Passing a size resizes an existing pool.
+        """
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = self._pools[name] = ViewThreadPool(name, self.reactor, min_threads, max_threads)
+        elif min_threads is not None or max_threads is not None:
+            pool.resize(min_threads, max_threads)
+
+        return pool
+
+    @staticmethod
+    def pool_name(threaded: T.Union[bool, str, None]) -> T.Optional[str]:
+        """
+            Convert the value of a `threaded=` argument into a pool name, None for not threaded.
+        """
+        if threaded is None or threaded is False:
+            return None
+        elif threaded is True:
+            return DEFAULT_POOL
+        elif isinstance(threaded, str):
+            return threaded
+
+        raise ValueError(f"threaded must be True, False, or a thread pool name, got {threaded!r}")
+
+    def wrap(self, func: T.Callable[..., T.Any], threaded: T.Union[bool, str, None]) -> T.Callable[..., T.Any]:
+        """
+            func wrapped to run in the pool named by `threaded`, or func unchanged if threaded is False/None
+        """
+        name = self.pool_name(threaded)
+        return func if name is None else self.get(name).wrap(func)
+
+    def stats(self) -> T.Dict[str, PoolStats]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def stop(self) -> None:
+        for pool in self._pools.values():
+            pool.stop()
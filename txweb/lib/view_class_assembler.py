@@ -26,6 +26,7 @@ import inspect
 from werkzeug.routing import Rule, Submount
 
 from txweb.util.basic import get_thing_name
+from .thread_pools import ThreadPools
 from ..resources import ViewFunctionResource, ViewClassResource
 
 
@@ -33,6 +34,7 @@ from ..resources import ViewFunctionResource, ViewClassResource
 EXPOSED_STR = "__exposed__"
 EXPOSED_RULE = "__sub_rule__"
 
+THREADED_ID = "__threaded__"
 PREFILTER_ID = "__PREFILTER_ID__"
 POSTFILTER_ID = "__POSTFILTER_ID__"
 
@@ -118,14 +120,18 @@ def expose(route, **route_kwargs):
     Parameters
     ----------
     route: str
-    route_kwargs: arguments intended to be passed on to werkzeug routing logic
+    route_kwargs: arguments intended to be passed on to werkzeug routing logic, except for `threaded` which runs
+        the method in a thread pool, see txweb.lib.thread_pools
 
     Returns
     -------
     T.Callable[[func], func] - a decorating function to set the exposed attribute and append routing arguments
     """
+    threaded = route_kwargs.pop("threaded", None)
+
     def processor(func):
         setattr(func, EXPOSED_STR, True)
+        setattr(func, THREADED_ID, threaded)
         setattr(func, EXPOSED_RULE, ExposeSubRule(func.__name__, route, route_kwargs))
         return func
 
@@ -188,7 +194,9 @@ def find_member(thing, identifier: str) -> T.Union[T.Callable, bool]:
 
 def view_assembler(prefix: str,
                    kls,
-                   route_args: T.Dict[str, T.Union[str, T.List[str]]]) -> T.Union[ViewAssemblerResult, None]:
+                   route_args: T.Dict[str, T.Union[str, T.List[str]]],
+                   thread_pools: T.Optional[ThreadPools] = None,
+                   threaded: T.Union[bool, str, None] = None) -> T.Union[ViewAssemblerResult, None]:
     """
         Given a class definition, this instantiates the class, searches it for exposed
         methods and pre/post filters
@@ -207,6 +215,10 @@ def view_assembler(prefix: str,
         A view class definition
     route_args: dict
         a dictionary of arguments intended for the werkzeug URL routing library
+    thread_pools: ThreadPools
+        Where exposed methods with `threaded` set are run
+    threaded: bool or str
+        Class wide default for exposed methods that did not set `threaded` themselves
 
     Raises
     ------
@@ -244,12 +256,22 @@ def view_assembler(prefix: str,
             bound_endpoint = get_thing_name(bound_method)
             rule = Rule(sub_rule.route, **sub_rule.route_kwargs, endpoint=bound_endpoint)
 
+            method_threaded = getattr(bound_method, THREADED_ID, None)
+            method_threaded = threaded if method_threaded is None else method_threaded
+            if ThreadPools.pool_name(method_threaded) is not None:
+                if thread_pools is None:
+                    raise RuntimeError(f"{kls.__name__}.{name} is threaded but no thread pools were provided")
+                bound_method = thread_pools.wrap(bound_method, method_threaded)
+
             endpoints[bound_endpoint] = ViewFunctionResource(bound_method, prefilter=prefilter, postfilter=postfilter)
             rules.append(rule)
 
         return ViewAssemblerResult(instance, Submount(prefix, rules), endpoints)
 
     elif is_renderable(kls):
+        if ThreadPools.pool_name(threaded) is not None:
+            raise ValueError(f"{kls.__name__!r} has no exposed methods, threaded only applies to exposed methods")
+
         endpoint = get_thing_name(instance)
         rule = Rule(prefix, **route_args, endpoint=endpoint)
         endpoints[endpoint] = ViewClassResource(kls, instance)
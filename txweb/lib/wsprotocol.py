@@ -7,10 +7,6 @@
 
 """
 from __future__ import annotations
-try:
-    import ujson as json
-except ImportError:
-    import json
 
 import typing as T
 from uuid import uuid4
@@ -19,12 +15,16 @@ import warnings
 
 from twisted.web.server import NOT_DONE_YET
 from twisted.internet.defer import Deferred
+from twisted.internet.error import ConnectionDone
+from twisted.python.failure import Failure
 
 from autobahn.twisted.websocket import WebSocketServerProtocol
 
 from txweb.log import getLogger
 
 from .message_handler import MessageHandler
+from .json_codec import JSONCodec, DEFAULT_CODEC
+from .thread_pools import is_threaded
 
 
 
@@ -114,6 +114,16 @@ class WSProtocol(WebSocketServerProtocol):
         self.identity = uuid4().hex
         self.my_log.debug("Client connecting: {request.peer}", request=request)
 
+    def onOpen(self) -> T.NoReturn:
+        """
+            The handshake is done, register with the factory so the application can close this connection when it
+            shuts down.
+
+        """
+        connections = getattr(self.factory, "connections", None)
+        if connections is not None:
+            connections.add(self)
+
     def onClose(self, was_clean: bool, code: int, reason) -> T.NoReturn:
         """
             Connection was lost, currently I don't care why but I likely should.
@@ -126,12 +136,28 @@ class WSProtocol(WebSocketServerProtocol):
         reason: unknown
 
         """
+        connections = getattr(self.factory, "connections", None)
+        if connections is not None:
+            connections.discard(self)
+
+        # The answers are never coming
+        self.failAsks(Failure(ConnectionDone(f"Websocket closed before answering ({code})")))
+
         self.on_disconnect.addErrback(self.my_log.error)
         self.on_disconnect.callback(self.identity)
         # Delete the Deferred to force it to be garbage collected and emit any unhandled errors as soon as possible
         del self.on_disconnect
         self.my_log.debug("WebSocket connection closed: {reason!r}", reason=reason)
 
+    @property
+    def json_codec(self) -> JSONCodec:
+        """
+            The application's JSON codec, see txweb.lib.json_codec
+        """
+        get_application = getattr(getattr(self, "factory", None), "get_application", None)
+        application = get_application() if get_application is not None else None
+        return getattr(application, "json_codec", DEFAULT_CODEC)
+
     def sendDict(self, **values) -> T.NoReturn:
         """
             Utility used by every other method that follows
@@ -147,9 +173,9 @@ class WSProtocol(WebSocketServerProtocol):
             A valid dictionary view of arguments that can be serialized by JSON
 
         """
-        response = json.dumps(values)
+        response = self.json_codec.dumps(values)
         # Always send synchronously for now
-        self.sendMessage(response.encode("utf-8"), isBinary=False, sync=True)
+        self.sendMessage(response, isBinary=False, sync=True)
 
     def respond(self, original_message, result) -> T.NoReturn:
         """
@@ -201,6 +227,24 @@ class WSProtocol(WebSocketServerProtocol):
         return d
 
 
+    def failAsks(self, reason: Failure) -> int:
+        """
+            Errback every ask still waiting for the client to respond.
+
+        Parameters
+        ----------
+        reason: Failure
+
+        Returns
+        -------
+        The number of asks failed
+        """
+        asks, self.deferred_asks = self.deferred_asks, {}
+        for d in asks.values():
+            d.errback(reason)
+
+        return len(asks)
+
     def handleResponse(self, message: MessageHandler) -> T.NoReturn:
         """
             Server side asked client a question, shunt this message through the
@@ -236,14 +280,27 @@ class WSProtocol(WebSocketServerProtocol):
         else:
             result = endpoint_func(message)
 
-            if result in [NOT_DONE_YET, None]:
-                return
-            elif isinstance(result, Deferred):
+            if isinstance(result, Deferred):
+                if is_threaded(endpoint_func):
+                    # The endpoint ran in a thread pool, answer once its result is in
+                    result.addCallback(self.handleResult, endpoint_func, message)
+                    result.addErrback(lambda reason: self.my_log.failure("Endpoint {endpoint!r} failed", reason,
+                                                                         endpoint=message['endpoint']))
+                # Any other Deferred is the endpoint's own business, eg inlineCallbacks that respond themselves
                 return
-            elif message.get("type", default=None) == "ask":
-                self.respond(message, result=result)
-            else:
-                warnings.warn(f"{endpoint_func} returned {result} but I don't know know how to handle it.")
+
+            self.handleResult(result, endpoint_func, message)
+
+    def handleResult(self, result, endpoint_func, message: MessageHandler) -> T.NoReturn:
+        """
+            Respond to an ask with whatever the endpoint returned.
+        """
+        if result in [NOT_DONE_YET, None]:
+            return
+        elif message.get("type", default=None) == "ask":
+            self.respond(message, result=result)
+        else:
+            warnings.warn(f"{endpoint_func} returned {result} but I don't know know how to handle it.")
 
 
 
@@ -261,11 +318,11 @@ class WSProtocol(WebSocketServerProtocol):
             return
 
         try:  # pragma: no cover
-            payload = payload.decode("utf-8")
-            raw_message = json.loads(payload)
+            raw_message = self.json_codec.loads(payload)
         except UnicodeDecodeError:  # pragma: no cover
             warnings.warn(f"Failed to decode {payload}")
-        except json.JSONDecodeError:  # pragma: no cover
+        except ValueError:  # pragma: no cover
+            # Every codec's decode error is a ValueError
             warnings.warn(f"Corrupt/bad payload: {payload}")
         else:
 
@@ -10,23 +10,26 @@ import inspect
 from twisted.web.static import File
 
 from twisted.web import resource
-from twisted.python import compat
 
 # Werkzeug routing import
 from werkzeug import routing as wz_routing
 
 
 from txweb.http_codes import Unrenderable
-from txweb.util.url_converter import DirectoryPath
 from txweb.util.basic import get_thing_name
+from txweb.util.lru import CacheInfo
 from txweb.lib.str_request import StrRequest
 
-from txweb import http_codes as HTTP_Errors
-
 from .view_function import ViewFunctionResource
 from .view_class import ViewClassResource
 # from .directory import Directory
 from ..lib import view_class_assembler as vca
+from ..lib.route_engines import WerkzeugEngine
+from ..lib.route_conflicts import RouteConflict
+from ..lib.route_table import RouteTable, RouteHit, RouteMiss
+from ..lib.multipart import BodyLimits
+from ..lib.thread_pools import ThreadPools
+from ..lib.process_pools import ProcessPools
 from ..log import getLogger
 
 
@@ -41,13 +44,35 @@ EndpointCallable = T.NewType("InstanceCallable",
                              T.Callable[[StrRequest, T.Optional[T.Iterable], T.Optional[T.Dict], ], T.Union[str, int]])
 
 
+class RouteMissResource(resource.Resource):
+    """
+        Stands in for a view when nothing matched.
+
+        Rendering hands the miss to request.processingMiss which writes the 404/405/redirect response directly
+        instead of raising an HTTPCode through twisted's processingFailed chain.   One instance is shared by every
+        miss, the miss itself (the code, a 405's allowed methods, a redirect's target) is `request.route_miss`.
+    """
+    isLeaf = True
+    isRouteMiss = True
+
+    def render(self, request: StrRequest):
+        request.processingMiss(request.route_miss)
+        return StrRequest.NOT_DONE_YET
+
+
 class RoutingResource(resource.Resource):
     """
         The bridge between twisted's object graph routing system and werkzeug's url pattern
         recognition routing system.
+
+        Rules added with `host=` go into a routing table of their own for that host.   Requests are dispatched to
+        a table by a dict lookup on the request's hostname before any path matching happens, hostnames without
+        a table of their own use the default table of rules added without a host.
     """
 
-    def __init__(self, script_name: bytes = None):
+    def __init__(self, script_name: bytes = None, engine: T.Union[str, T.Type[WerkzeugEngine]] = "werkzeug",
+                 thread_pools: T.Optional[ThreadPools] = None,
+                 process_pools: T.Optional[ProcessPools] = None):
         """
         The bridge between twisted's object graph routing system and werkzeug's url pattern
         recognition routing system.
@@ -57,6 +82,13 @@ class RoutingResource(resource.Resource):
         script_name: bytes
             Optional ability to add a prefix to all routed URL's in case this application
                 is nested inside another web app.   See CGI's SCRIPT_NAME variable.
+        engine: str
+            Which URL matching engine to use, "werkzeug" (default) or "radix".  See txweb.lib.route_engines
+        thread_pools: ThreadPools
+            Where views added with `threaded=True` or `threaded="pool name"` are run, see txweb.lib.thread_pools
+        process_pools: ProcessPools
+            Where view functions added with `process_pool=True` or `process_pool="pool name"` are run, see
+            txweb.lib.process_pools
         """
 
         resource.Resource.__init__(self)
@@ -64,9 +96,21 @@ class RoutingResource(resource.Resource):
         self._site = None
         self._endpoints = OrderedDict()  # type: typing.Dict[str, resource.Resource]
         self._instances = OrderedDict()  # type: typing.Dict[str, object]
-        self._route_map = wz_routing.Map()  # type: wz_routing.Map
-        self._route_map.converters['directory'] = DirectoryPath
+        # endpoint -> the BodyLimits fields its route overrides
+        self._body_limits = {}  # type: T.Dict[str, T.Dict[str, T.Optional[int]]]
+        # endpoints whose views read the request body as it arrives, see txweb.lib.body_stream
+        self._streaming = set()  # type: T.Set[str]
+        # Returned for every unmatched request, see RouteMissResource
+        self._miss_resource = RouteMissResource()
         self._script_name = script_name
+        self._engine_name = engine
+        self._default_table = RouteTable(script_name=script_name, engine=engine)
+        # lowercased hostname -> that host's RouteTable
+        self._hosts = {}  # type: T.Dict[bytes, RouteTable]
+        self._route_map = self._default_table.route_map  # type: wz_routing.Map
+        self._frozen = False
+        self.thread_pools = thread_pools if thread_pools is not None else ThreadPools()
+        self.process_pools = process_pools if process_pools is not None else ProcessPools()
 
     @property
     def site(self):   # pragma: no cover
@@ -89,12 +133,100 @@ class RoutingResource(resource.Resource):
         """
         self._site = site
 
-    def iter_rules(self) -> T.Generator:
+    def iter_rules(self, host: T.Optional[str] = None) -> T.Generator:
         """
         Debug method for iterating over all of the currently set URL Rule's for the werkzeug routing map.
 
+        :param host: optional, iterate over that virtual host's rules instead of the default table's
+        """
+        return self.table(host).iter_rules()
+
+    @staticmethod
+    def _host_key(host: T.Union[str, bytes]) -> bytes:
+        if isinstance(host, str):
+            host = host.encode("idna")
+
+        return host.lower().rstrip(b".")
+
+    def table(self, host: T.Optional[str] = None) -> RouteTable:
+        """
+            The routing table for `host`, the default table if host is None.
+
+            Raises KeyError if no rules were ever added for `host`.
+        """
+        if host is None:
+            return self._default_table
+
+        return self._hosts[self._host_key(host)]
+
+    @property
+    def hosts(self) -> T.List[str]:
+        """
+            Every virtual host with its own routing table.
+        """
+        return [table.host for table in self._hosts.values()]
+
+    def _table_for(self, request: StrRequest) -> RouteTable:
+        """
+            Dispatch a request to its host's table.   The cost is the same no matter how many hosts are served.
+        """
+        if self._hosts:
+            return self._hosts.get(request.getRequestHostname().lower().rstrip(b"."), self._default_table)
+
+        return self._default_table
+
+    def _add_rule(self, rule: wz_routing.RuleFactory, host: T.Optional[str] = None) -> None:
+        """
+            Every mutation of a werkzeug routing map must go through here so that anything
+            derived from the map (eg bound adapters) is thrown away.
+
+        """
+        if self._frozen:
+            raise RuntimeError(f"Cannot add {rule!r}, the routing table is frozen")
+
+        if host is None:
+            table = self._default_table
+        else:
+            table = self._hosts.get(self._host_key(host))
+            if table is None:
+                table = RouteTable(host=host, script_name=self._script_name, engine=self._engine_name)
+                self._hosts[self._host_key(host)] = table
+
+        table.add_rule(rule)
+
+    @property
+    def frozen(self) -> bool:
+        """
+            Has freeze() been called?
+        """
+        return self._frozen
+
+    def freeze(self) -> T.List[RouteConflict]:
+        """
+            Compile every routing table once, ahead of the first request, and refuse any further rules.
+
+            The matching engines are compiled and the static indices are built here so the first requests don't pay
+            for it.   Every rule is also checked for being shadowed or made ambiguous by another rule in the same
+            table and each conflict is logged as a warning.
+
+            Calling freeze more than once is harmless.
+
+        Returns
+        -------
+        A list of RouteConflict, empty if every rule is reachable.
         """
-        return self._route_map.iter_rules()
+        already_frozen = self._frozen
+        self._frozen = True
+
+        conflicts = []
+        for table in [self._default_table, *self._hosts.values()]:
+            conflicts.extend(table.freeze())
+
+        if already_frozen is False:
+            for conflict in conflicts:
+                log.warn("Route conflict: {conflict!s}", conflict=conflict)
+
+        return conflicts
 
     def add(self, route_str: str, **kwargs: T.Dict[str, T.Any]):
         """
@@ -110,13 +242,34 @@ class RoutingResource(resource.Resource):
         if isinstance(route_str, str) is False:
             raise ValueError(f"position 1 argument, route_str must be a str, got {route_str!r} instead")
 
+        # Not werkzeug's host matching, the rule goes into that virtual host's own routing table
+        host = kwargs.pop("host", None)
+        # Run the view in a thread pool, only for view functions and classes with exposed methods
+        threaded = kwargs.pop("threaded", None)
+        # Run the view in a worker process, only for view functions
+        process_pool = kwargs.pop("process_pool", None)
+        if ThreadPools.pool_name(threaded) is not None and ProcessPools.pool_name(process_pool) is not None:
+            raise ValueError("A route can be threaded or use a process_pool but not both")
+        # max_content_length, max_form_memory_size, and spool_size for this route's request bodies
+        body_limits = {name: kwargs.pop(name) for name in BodyLimits._fields if name in kwargs}
+        # Call the view as soon as the headers are in, the body is request.body
+        stream_body = kwargs.pop("stream_body", False)
 
         def processor(original_thing: T.Union[EndpointCallable, object]) -> T.Union[EndpointCallable, object]:
 
             endpoint_name = get_thing_name(original_thing)
+            existing_endpoints = set(self._endpoints)
+
+            common_kwargs = {"endpoint": endpoint_name, "thing": original_thing, "route_kwargs": kwargs, "host": host}
 
-            common_kwargs = {"endpoint": endpoint_name, "thing": original_thing, "route_kwargs": kwargs}
 
+            is_resource = isinstance(original_thing, resource.Resource) \
+                or (inspect.isclass(original_thing) and issubclass(original_thing, resource.Resource))
+            if is_resource and ThreadPools.pool_name(threaded) is not None:
+                raise ValueError(f"threaded cannot be used with twisted Resources, got {original_thing!r}")
+
+            if inspect.isclass(original_thing) and ProcessPools.pool_name(process_pool) is not None:
+                raise ValueError(f"process_pool is only for module level view functions, got {original_thing!r}")
 
             # Is the thing to be added to the router a twisted Resource class?
             if inspect.isclass(original_thing) and issubclass(original_thing, resource.Resource):
@@ -128,18 +281,25 @@ class RoutingResource(resource.Resource):
                 self.add_resource(route_str, **common_kwargs)
 
             elif inspect.isclass(original_thing):
-                self._add_class(route_str, **common_kwargs)
+                self._add_class(route_str, threaded=threaded, **common_kwargs)
 
             elif inspect.isfunction(original_thing) is True or inspect.ismethod(original_thing) is True:
-                self._add_callable(route_str, **common_kwargs)
+                self._add_callable(route_str, threaded=threaded, process_pool=process_pool, **common_kwargs)
 
             elif callable(original_thing):
-                self._add_callable(route_str, **common_kwargs)
+                self._add_callable(route_str, threaded=threaded, process_pool=process_pool, **common_kwargs)
 
             else:
                 raise ValueError(
                     f"Received {original_thing} but expected callable|Object|twisted.web.resource.Resource")
 
+            # A view class's exposed methods each get an endpoint of their own
+            for endpoint in (set(self._endpoints) - existing_endpoints) or {endpoint_name}:
+                if body_limits:
+                    self._body_limits[endpoint] = body_limits
+                if stream_body:
+                    self._streaming.add(endpoint)
+
             # return whatever was decorated unchanged
             # the Resource.getChildForRequest is completely short circuited so
             # that a viewable class could be inherited in userland
@@ -150,44 +310,58 @@ class RoutingResource(resource.Resource):
     def _add_callable(self, route_str: str,
                       endpoint: str = None,
                       thing: T.Union[EndpointCallable, object] = None,
-                      route_kwargs: T.Dict[str, T.Any] = None):
+                      route_kwargs: T.Dict[str, T.Any] = None,
+                      host: T.Optional[str] = None,
+                      threaded: T.Union[bool, str, None] = None,
+                      process_pool: T.Union[bool, str, None] = None):
         """
 
         :param route_str: a valid path for werkzeug routing
         :param endpoint: a unique str identifier for thing
         :param thing: either a function or a bound method
         :param route_kwargs: optional dictionary intended for werkzeug.routing.Rule
+        :param host: optional virtual host the rule belongs to
+        :param threaded: optional, True or a pool name to call thing in a thread pool
+        :param process_pool: optional, True or a pool name to call thing in a worker process
         :return:
         """
         route_kwargs = route_kwargs if route_kwargs is not None else {}
         new_rule = wz_routing.Rule(route_str, endpoint=endpoint, **route_kwargs)
-        view_resource = ViewFunctionResource(thing)
+        view = self.process_pools.wrap(self.thread_pools.wrap(thing, threaded), process_pool)
+        view_resource = ViewFunctionResource(view)
         self._endpoints[endpoint] = view_resource
 
-        self._route_map.add(new_rule)
+        self._add_rule(new_rule, host)
 
     def _add_class(self, route_str: T.AnyStr,
                    endpoint: T.AnyStr = None,
                    thing: T.Union[object, T.Callable] = None,
-                   route_kwargs: T.Dict[str, T.Any] = None):
+                   route_kwargs: T.Dict[str, T.Any] = None,
+                   host: T.Optional[str] = None,
+                   threaded: T.Union[bool, str, None] = None):
         """
             A view class has been provided, decorate and process it into the router.
+
+            `threaded` is the default for the class's exposed methods, render only classes can't be threaded.
         """
 
         if vca.is_renderable(thing) is False:
             raise Unrenderable(f"{thing.__name__!r} is missing exposed methods or a render method")
 
         if vca.has_exposed(thing):
-            result = vca.view_assembler(route_str, thing, route_kwargs)
+            result = vca.view_assembler(route_str, thing, route_kwargs, self.thread_pools, threaded)
             self._instances[endpoint] = result.instance
             self._endpoints.update(result.endpoints)
-            self._route_map.add(result.rule)
+            self._add_rule(result.rule, host)
         else:
+            if ThreadPools.pool_name(threaded) is not None:
+                raise ValueError(f"{thing.__name__!r} has no exposed methods, threaded only applies to exposed methods")
+
             instance = self._instances[endpoint] = thing(**route_kwargs.get("inits_kwargs", {}))
-            self._route_map.add(wz_routing.Rule(route_str, endpoint=endpoint))
+            self._add_rule(wz_routing.Rule(route_str, endpoint=endpoint), host)
             self._endpoints[endpoint] = ViewClassResource(thing, instance)
 
-    def _add_resource_cls(self, route_str, endpoint=None, thing=None, route_kwargs=None):
+    def _add_resource_cls(self, route_str, endpoint=None, thing=None, route_kwargs=None, host=None):
         """
             Give the class definition of a resource, instantiate it, add it to the instances list, and then
             add the instance to the routing map.
@@ -197,14 +371,16 @@ class RoutingResource(resource.Resource):
         :param endpoint:
         :param thing:
         :param route_kwargs:
+        :param host:
         :return:
         """
         route_kwargs = route_kwargs if route_kwargs is not None else {}
         if endpoint not in self._instances:
             self._instances[endpoint] = thing()
-        self.add_resource(route_str, endpoint=endpoint, thing=self._instances[endpoint], route_kwargs=route_kwargs)
+        self.add_resource(route_str, endpoint=endpoint, thing=self._instances[endpoint], route_kwargs=route_kwargs,
+                          host=host)
 
-    def add_resource(self, route_str, endpoint=None, thing=None, route_kwargs=None):
+    def add_resource(self, route_str, endpoint=None, thing=None, route_kwargs=None, host=None):
         """
 
         :param self:
@@ -212,6 +388,7 @@ class RoutingResource(resource.Resource):
         :param endpoint:
         :param thing:
         :param route_kwargs:
+        :param host: optional virtual host the rule belongs to
         :return:
         """
         route_kwargs = route_kwargs if route_kwargs is not None else {}
@@ -220,14 +397,15 @@ class RoutingResource(resource.Resource):
         new_rule = wz_routing.Rule(route_str, endpoint=endpoint, **route_kwargs)
         self._endpoints[endpoint] = thing
 
-        self._route_map.add(new_rule)
+        self._add_rule(new_rule, host)
 
-    def add_directory(self, route_str: str, directory_resource: File) -> File:
+    def add_directory(self, route_str: str, directory_resource: File, host: T.Optional[str] = None) -> File:
         """
             TODO refactor.   Since I've dropped my own custom file and directory resources
              this method isn't as relevant.
         :param route_str:
         :param directory_resource:
+        :param host: optional virtual host the rules belong to
         :return:
         """
 
@@ -244,71 +422,74 @@ class RoutingResource(resource.Resource):
                                             endpoint=endpoint,
                                             methods=["GET", "HEAD"])
 
-        self._route_map.add(fixed_rule)
-        self._route_map.add(instrumented_rule)
+        self._add_rule(fixed_rule, host)
+        self._add_rule(instrumented_rule, host)
 
         return directory_resource
 
-    def _build_map(self, request):
+    @property
+    def engine(self) -> WerkzeugEngine:
+        """
+            The URL matching engine of the default table.
         """
-            Takes all of the information provided by the request object and adapts them to match the wsgi environment
-            dictionary so that werkzeug can provide a routing map.
+        return self._default_table.engine
 
-            It feels unfortunate/excessive that I have to build this map on each request instead of just reporting
-            the changes in URL.
-        :param path_element:
-        :param request:
-        :return:
+    def _match(self, request: StrRequest) -> T.Union[RouteHit, RouteMiss]:
+        """
+            Find the rule for the current request in its host's routing table.
         """
+        return self._table_for(request).match(request)
 
-        map_bind_kwargs = {}
+    def route_cache_info(self, host: T.Optional[str] = None) -> CacheInfo:
+        """
+            Hit/miss statistics for a table's route match cache, in the same shape as functools.lru_cache's
+            cache_info.  Static index hits never reach the cache and are not counted.
 
-        server_port = getattr(request.getHost(), "port", 0)
+        :param host: optional, the virtual host's table instead of the default table
+        """
+        return self.table(host).cache_info()
 
-        if server_port not in [443, 80, 0]:
-            map_bind_kwargs["server_name"] = request.getRequestHostname() + b":" + compat.intToBytes(server_port)
-        else:
-            map_bind_kwargs["server_name"] = request.getRequestHostname()
+    def body_limits(self, request: StrRequest, defaults: BodyLimits) -> BodyLimits:
+        """
+            defaults with the overrides of the route request matches, see WebSite.body_limits.
 
-        if self._script_name is None:
-            map_bind_kwargs["script_name"] = b"/"
-        else:
-            map_bind_kwargs["script_name"] = self._script_name
+            This runs before the body arrives, the match is cached so routing the request afterwards is not slowed down.
+        """
+        if not self._body_limits:
+            return defaults
 
-        if map_bind_kwargs["script_name"].startswith(b"/") is False:
-            map_bind_kwargs["script_name"] = b"/" + map_bind_kwargs["script_name"]
+        result = self._match(request)
+        if isinstance(result, RouteHit) and result.rule.endpoint in self._body_limits:
+            return defaults._replace(**self._body_limits[result.rule.endpoint])
 
-        map_bind_kwargs["path_info"] = request.path
-        map_bind_kwargs['url_scheme'] = "https" if request.isSecure() else "http"
-        map_bind_kwargs['default_method'] = request.method
+        return defaults
 
-        map_bind_kwargs = {k: v.decode("utf-8") for k, v in map_bind_kwargs.items() if isinstance(v, bytes)}
+    def streams_body(self, request: StrRequest) -> bool:
+        """
+            Was the route request matches added with stream_body=True?   Called at header time like body_limits.
+        """
+        if not self._streaming:
+            return False
 
-        return self._route_map.bind(**map_bind_kwargs)
+        result = self._match(request)
+        return isinstance(result, RouteHit) and result.rule.endpoint in self._streaming
 
     def getChildWithDefault(self, _, request: StrRequest):
         """
             Routing resource is mostly ignorant of the larger ecosystem so it either
-            returns a resource OR it throws up an errors.HTTPCode
-        """
-
-        routing = self._build_map(request)
-
-        try:
-            # TODO refactor to handle HEAD requests when the only valid match support GET
-            # - one bad idea is to hack on werkzeug to append the URI matching rule to MethodNotAllowed
-            (rule, kwargs) = routing.match(return_rule=True)
-        except wz_routing.RequestRedirect as redirect:
-            log.debug("Werkzeug threw a redirect")
-            raise HTTP_Errors.HTTP3xx(redirect.code, redirect.new_url, redirect.name) from redirect
-        except wz_routing.NotFound as exc:
-            log.debug(f"Failed to find match for: {request.path!r}")
-            raise HTTP_Errors.HTTP404(exc) from exc
-
-        except wz_routing.MethodNotAllowed as exc:
-            # TODO finish error handling
-            log.debug(f"Unable to find a valid match for {request.path!r} with {request.method!r}")
-            raise HTTP_Errors.HTTP405(exc) from exc
+            returns the matched resource OR a RouteMissResource that writes the 404/405/redirect response
+        """
+
+        # TODO refactor to handle HEAD requests when the only valid match support GET
+        # - one bad idea is to hack on werkzeug to append the URI matching rule to MethodNotAllowed
+        result = self._match(request)
+
+        if isinstance(result, RouteMiss):
+            # No logging here, even a filtered out twisted log event costs more than the rest of the miss path
+            request.route_miss = result
+            return self._miss_resource
+
+        rule, kwargs = result
 
         request.rule = rule
         request.route_args = kwargs
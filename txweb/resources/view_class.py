@@ -16,7 +16,7 @@ import typing as T
 from twisted.web import resource
 # from twisted.web.server import NOT_DONE_YET
 
-from txweb.util.basic import sanitize_render_output
+from txweb.util.basic import resolve_render_output, then
 
 if T.TYPE_CHECKING:  # pragma: no cover
     from txweb.lib.str_request import StrRequest
@@ -34,6 +34,68 @@ class ViewClassResource(resource.Resource):
         self.instance = instance
         super().__init__()
 
+        # HTTP method (bytes, as twisted provides it) -> callable(request, **kwargs) with the filters baked in
+        self._dispatch = {}  # type: T.Dict[bytes, T.Callable[..., T.Any]]
+        # Used for every method not in _dispatch, either the instance's render or a case insensitive lookup
+        self._fallback = self._compile_dispatch()  # type: T.Callable[..., T.Any]
+
+    def _compile_dispatch(self) -> T.Callable[..., T.Any]:
+        """
+            Resolve prefilter, render|render_{METHOD}, and post_filter on the instance once instead of per request.
+
+        Returns
+        -------
+        The fallback for methods without an entry in the dispatch table
+        """
+        if hasattr(self.instance, "render"):
+            return self._bind_filters(getattr(self.instance, "render"))
+
+        for name in dir(self.instance):
+            if name.startswith("render_") and callable(getattr(self.instance, name)):
+                self._dispatch[name[len("render_"):].encode("utf-8")] = self._bind_filters(getattr(self.instance, name))
+
+        return self._render_by_upper_method
+
+    def _bind_filters(self, render_target: T.Callable[..., T.Any]) -> T.Callable[..., T.Any]:
+        """
+            Wrap render_target with the instance's prefilter and post_filter, if it has either.
+        """
+        prefilter = getattr(self.instance, "prefilter", None)
+        post_filter = getattr(self.instance, "post_filter", None)
+
+        if prefilter is None and post_filter is None:
+            return render_target
+
+        def filtered(request: StrRequest, **request_kwargs):
+            if prefilter is not None:
+                prefilter(request, self)
+
+            result = render_target(request, **request_kwargs)
+
+            if post_filter is not None:
+                result = then(result, lambda body: self._post_filter(post_filter, request, body))
+
+            return result
+
+        return filtered
+
+    def _post_filter(self, post_filter: T.Callable[..., T.Any], request: StrRequest, body: T.Any) -> T.Any:
+        result = post_filter(request, body)
+        assert result is not None, f"post_filter for {self.kls_view} must not return None"
+        return result
+
+    def _render_by_upper_method(self, request: StrRequest, **request_kwargs):
+        """
+            Slow path for methods that aren't an exact key in the dispatch table, eg lower case "get"
+        """
+        request_method = request.method.decode("utf-8").upper()
+        render_target = self._dispatch.get(request_method.encode("utf-8"))
+
+        assert render_target is not None, \
+            f"Unable to find render|render_{request_method} method for {self.kls_view} - {self.instance}"
+
+        return render_target(request, **request_kwargs)
+
     def render(self, request: StrRequest) -> T.Union[bytes, NotDoneYet]:
         """
             Relays the request to the wrapped class instance with some caveats.
@@ -46,41 +108,21 @@ class ViewClassResource(resource.Resource):
             Finally it looks for a postfilter method and passes both the output of the render method and the request
                 so that changes can be made if necessary.
 
+            All of the above is looked up once when the resource is created, see `_compile_dispatch`.
+
+            Render methods may be `async def` or return a Deferred, the post filter then runs on the eventual
+                result and StrRequest.render finishes the request.
+
         Args:
             request: The Request object (requesting headers, args, client ip, etc)
 
         Returns:
-            T.Union[bytes, NOT_DONE_YET]: Content to be sent to the client or if NOT_DONE_YET, hang the connection until
-                the resource closes it.  (or it times out)
+            T.Union[bytes, NOT_DONE_YET, Deferred]: Content to be sent to the client or if NOT_DONE_YET, hang the
+                connection until the resource closes it.  (or it times out)
         """
-        request_kwargs = getattr(request, "_view_args", {})
-        request_method = getattr(request, "method").decode("utf-8").upper()
-
-        if hasattr(self.instance, "prefilter"):
-            prefilter = getattr(self.instance, "prefilter")
-            prefilter_result = prefilter(request, self)
-        else:
-            prefilter_result = None
-
-        # noinspection PyUnusedLocal
-        render_target = None
-
-        if hasattr(self.instance, "render"):
-            render_target = getattr(self.instance, "render", None)
-        else:
-            render_target = getattr(self.instance, f"render_{request_method}", None)
-
-        assert render_target is not None, \
-            f"Unable to find render|render_{request_method} method for {self.kls_view} - {self.instance}"
-
-        result = render_target(request, **request_kwargs)
-
-        if hasattr(self.instance, "post_filter"):
-            post_result = getattr(self.instance, "post_filter")(request, result)
-            result = post_result
-            assert post_result is not None, f"post_filter for {self.kls_view} must not return None"
+        render_target = self._dispatch.get(request.method, self._fallback)
 
-        return sanitize_render_output(result)
+        return resolve_render_output(render_target(request, **getattr(request, "_view_args", {})))
 
     def __repr__(self):  # pragma: no cover
         instance_repr = f"<{self.instance.__class__.__name__} {self.instance!r}/>"
@@ -6,7 +6,7 @@ import typing as T
 
 from twisted.web import resource
 
-from txweb.util.basic import sanitize_render_output
+from txweb.util.basic import resolve_render_output, then
 
 
 
@@ -29,10 +29,55 @@ class ViewFunctionResource(resource.Resource):
                  prefilter: T.Union[PrefilterFunc, None] = None,
                  postfilter: T.Union[PostFilterFunc, None] = None):
         self.func = func
-        self.prefilter = prefilter
-        self.postfilter = postfilter
+        self.func_name = getattr(func, "__qualname__", getattr(func, "__name__", repr(func)))
+        self._prefilter = prefilter
+        self._postfilter = postfilter
+        # callable(request, **route_args) with the filters baked in, rebuilt if a filter is swapped out
+        self._handler = self._compile_handler()
         super().__init__()
 
+    @property
+    def prefilter(self) -> T.Union[PrefilterFunc, None]:
+        return self._prefilter
+
+    @prefilter.setter
+    def prefilter(self, func: T.Union[PrefilterFunc, None]):
+        self._prefilter = func
+        self._handler = self._compile_handler()
+
+    @property
+    def postfilter(self) -> T.Union[PostFilterFunc, None]:
+        return self._postfilter
+
+    @postfilter.setter
+    def postfilter(self, func: T.Union[PostFilterFunc, None]):
+        self._postfilter = func
+        self._handler = self._compile_handler()
+
+    def _compile_handler(self) -> T.Callable[..., T.Any]:
+        """
+            Without filters the wrapped callable is called directly, otherwise it is wrapped once here instead of
+            checking for filters on every request.
+        """
+        func, func_name = self.func, self.func_name
+        prefilter, postfilter = self._prefilter, self._postfilter
+
+        if not prefilter and not postfilter:
+            return func
+
+        def filtered(request, **request_view_kwargs):
+            if prefilter:
+                prefilter(request, func_name)
+
+            result_body = func(request, **request_view_kwargs)
+
+            if postfilter:
+                result_body = then(result_body, lambda body: postfilter(request, func_name, body))
+
+            return result_body
+
+        return filtered
+
     @classmethod
     def Wrap(cls, func):
         """
@@ -47,24 +92,13 @@ class ViewFunctionResource(resource.Resource):
         Called internally by twisted.web this executes the wrapped callable, first calling
          assigned pre and then post filters.
 
+        `async def` views and views returning a Deferred are returned as a Deferred, StrRequest.render
+         finishes the request once it fires.
+
         :param request:
         :return:
         """
-
-        request_view_kwargs = getattr(request, "route_args", {})
-
-        func_name = getattr(self.func, "__qualname__", getattr(self.func, "__name__", repr(self.func)))
-
-        if self.prefilter:
-            self.prefilter(request, func_name)
-
-        func = self.func
-        result_body = func(request, **request_view_kwargs)
-
-        if self.postfilter:
-            result_body = self.postfilter(request, func_name, result_body)
-
-        return sanitize_render_output(result_body)
+        return resolve_render_output(self._handler(request, **getattr(request, "route_args", {})))
 
     def __repr__(self):
         return f"<{self.__class__.__name__} at {id(self)!r} func={self.func!r}/>"
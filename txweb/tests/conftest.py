@@ -2,7 +2,7 @@
 from pathlib import Path
 
 import pytest
-from .helper import RequestRetval, requesthelper
+from .helper import RequestRetval, requesthelper, QueueReactor
 from .helper import StrRequest
 
 from io import BytesIO
@@ -18,4 +18,9 @@ def dummy_request() -> RequestRetval:
     request.channel = channel
     request.content = BytesIO()
 
-    return RequestRetval(request, channel)
\ No newline at end of file
+    return RequestRetval(request, channel)
+
+
+@pytest.fixture(scope="function")
+def queue_reactor() -> QueueReactor:
+    return QueueReactor()
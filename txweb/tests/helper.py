@@ -1,5 +1,6 @@
 
 
+import queue
 import unittest
 import typing as T
 from unittest.mock import MagicMock
@@ -12,6 +13,7 @@ import pytest
 from txweb.lib.str_request import StrRequest
 from txweb import Application
 
+from twisted.internet.testing import StringTransport
 from twisted.web.test.test_web import DummyRequest
 from twisted.web.test import requesthelper
 
@@ -55,6 +57,20 @@ class RequestRetval(object):
 
 
 
+def http_exchange(app: Application, *chunks: bytes) -> StringTransport:
+    """
+        Feed raw bytes to a real HTTP channel of app's site, one dataReceived per chunk.
+    """
+    channel = app.site.buildProtocol(None)
+    transport = StringTransport()
+    # so later chunks can be fed to transport.protocol.dataReceived
+    transport.protocol = channel
+    channel.makeConnection(transport)
+    for chunk in chunks:
+        channel.dataReceived(chunk)
+    return transport
+
+
 ensureBytes = lambda x: x if isinstance(x, bytes) else x.encode()
 
 
@@ -88,3 +104,23 @@ class MockRequest(DummyRequest):# prama: no cover
             name = name.encode("utf-8")
 
         return super().getHeader(name)
+
+
+class QueueReactor:
+    """
+        Just enough of a reactor for deferToThreadPool, results are only delivered when the test pumps them.
+    """
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def callFromThread(self, func, *args, **kwargs):
+        self.calls.put((func, args, kwargs))
+
+    def addSystemEventTrigger(self, *args, **kwargs):
+        return None
+
+    def pump(self, count=1):
+        for _ in range(count):
+            func, args, kwargs = self.calls.get(timeout=5)
+            func(*args, **kwargs)
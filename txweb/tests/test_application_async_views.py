@@ -0,0 +1,124 @@
+import dataclasses
+
+import pytest
+from twisted.internet import defer
+
+from txweb import Application
+
+from txweb.lib.json_codec import CODECS
+
+from .helper import RequestRetval, http_exchange
+
+
+def test_async_def_views_are_finished_for_the_view(dummy_request: RequestRetval):
+    app = Application(namespace=__name__)
+    dummy_request.setup(app)
+
+    pending = defer.Deferred()
+    after_render = []
+
+    @app.route("/async/<int:item_id>")
+    async def async_view(request, item_id):
+        name = await pending
+        return f"{name} {item_id} ünïcode"
+
+    @app.after_render
+    def record_body(request, body):
+        after_render.append(body)
+        return body
+
+    dummy_request.request.add_after_render(app._call_after_render)
+    dummy_request.request.requestReceived(b"GET", b"/async/7", b"HTTP/1.1")
+    assert dummy_request.request.finished in [False, 0]
+
+    pending.callback("item")
+
+    expected = "item 7 ünïcode".encode("utf-8")
+    assert dummy_request.request.finished in [True, 1]
+    assert dummy_request.request.code == 200
+    assert dummy_request.request.responseHeaders.getRawHeaders(b"content-length") == [str(len(expected)).encode()]
+    assert dummy_request.read().endswith(expected)
+    assert after_render == [expected]
+
+
+def test_deferred_returning_class_views_run_post_filters_on_the_result(dummy_request: RequestRetval):
+    app = Application(namespace=__name__)
+    dummy_request.setup(app)
+
+    @app.route("/widgets")
+    class Widgets:
+
+        def render(self, request):
+            return defer.succeed("widgets")
+
+        def post_filter(self, request, body):
+            return body.upper()
+
+    dummy_request.request.requestReceived(b"GET", b"/widgets", b"HTTP/1.1")
+
+    assert dummy_request.request.finished in [True, 1]
+    assert dummy_request.read().endswith(b"WIDGETS")
+
+
+def test_failing_async_views_reach_the_application_error_handlers(dummy_request: RequestRetval):
+    app = Application(namespace=__name__)
+    dummy_request.setup(app)
+
+    caught = []
+
+    @app.route("/broken")
+    async def broken(request):
+        await defer.succeed(None)
+        raise ValueError("async failure")
+
+    @app.handle_error(ValueError)
+    def on_value_error(request, reason):
+        caught.append(reason.value)
+        request.setResponseCode(418)
+        request.finish()
+        return True
+
+    dummy_request.request.requestReceived(b"GET", b"/broken", b"HTTP/1.1")
+
+    assert [str(exc) for exc in caught] == ["async failure"]
+    assert dummy_request.request.code == 418
+    assert dummy_request.request.finished in [True, 1]
+
+
+@dataclasses.dataclass
+class Item:
+    name: str
+    tags: list
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_views_returning_dicts_lists_and_dataclasses_send_json(name):
+    app = Application(namespace=__name__, json_codec=name)
+    pending = defer.Deferred()
+
+    @app.route("/dict")
+    def dict_view(request):
+        return {"word": "café"}
+
+    @app.route("/list")
+    async def list_view(request):
+        return await pending
+
+    @app.route("/item")
+    def item_view(request):
+        return Item("ünïcode", ["a"])
+
+    for path, data in [(b"/dict", {"word": "café"}),
+                       (b"/item", {"name": "ünïcode", "tags": ["a"]})]:
+        transport = http_exchange(app, b"GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n" % path)
+        head, _, body = transport.value().partition(b"\r\n\r\n")
+
+        assert CODECS["json"].loads(body) == data
+        assert b"\r\nContent-Type: application/json\r\n" in head + b"\r\n"
+        assert b"\r\nContent-Length: %d\r\n" % len(body) in head + b"\r\n"
+
+    transport = http_exchange(app, b"GET /list HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    pending.callback([1, "ß"])
+    head, _, body = transport.value().partition(b"\r\n\r\n")
+    assert body == CODECS[name].dumps([1, "ß"])
+    assert b"\r\nContent-Length: %d\r\n" % len(body) in head + b"\r\n"
@@ -0,0 +1,115 @@
+from twisted.internet import defer, task
+from twisted.internet.error import ConnectionDone
+from twisted.internet.testing import MemoryReactorClock
+
+from txweb import Application
+from txweb.lib.wsprotocol import WSProtocol
+
+from .helper import RequestRetval
+
+
+class FakePort:
+    def __init__(self):
+        self.listening = True
+
+    def stopListening(self):
+        self.listening = False
+
+
+class FakeWebSocket:
+    CLOSE_STATUS_CODE_GOING_AWAY = 1001
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.closed_with = None
+        connections.add(self)
+
+    def sendClose(self, code=None, reason=None):
+        self.closed_with = code
+
+    def onClose(self):
+        self.connections.discard(self)
+
+
+def test_drain_waits_for_in_flight_requests_and_websockets(dummy_request: RequestRetval):
+    clock = task.Clock()
+    app = Application(namespace=__name__, twisted_reactor=clock)
+    app.enable_websockets("ws://127.0.0.1:8080/", "/ws")
+    dummy_request.setup(app)
+    app.site.track_request(dummy_request.request)
+    pending = defer.Deferred()
+
+    @app.route("/slow")
+    def slow(request):
+        return pending
+
+    dummy_request.request.requestReceived(b"GET", b"/slow", b"HTTP/1.1")
+    port = FakePort()
+    app._listening_ports = [port]
+    websocket = FakeWebSocket(app.ws_factory.connections)
+
+    results = []
+    app.drain(timeout=5).addCallback(results.append)
+
+    assert port.listening is False
+    assert websocket.closed_with == 1001
+
+    clock.advance(1)
+    assert results == []
+
+    pending.callback("done")
+    websocket.onClose()
+    clock.advance(app.DRAIN_POLL_INTERVAL)
+
+    assert results == [([], [], [])]
+    assert dummy_request.read().endswith(b"done")
+
+
+def test_drain_reports_what_is_left_at_the_deadline(dummy_request: RequestRetval):
+    clock = task.Clock()
+    app = Application(namespace=__name__, twisted_reactor=clock)
+    dummy_request.setup(app)
+    app.site.track_request(dummy_request.request)
+
+    @app.route("/stuck")
+    def stuck(request):
+        return defer.Deferred()
+
+    dummy_request.request.requestReceived(b"GET", b"/stuck", b"HTTP/1.1")
+
+    results = []
+    app.drain(timeout=2).addCallback(results.append)
+    clock.pump([app.DRAIN_POLL_INTERVAL] * 25)
+
+    assert len(results) == 1
+    assert results[0].requests == [dummy_request.request]
+    assert results[0].websockets == []
+
+
+def test_shutdown_fails_pending_asks_and_runs_when_the_reactor_stops():
+    reactor = MemoryReactorClock()
+    app = Application(namespace=__name__, twisted_reactor=reactor)
+    app.enable_websockets("ws://127.0.0.1:8080/", "/ws")
+
+    stopped = []
+    for number in (8080, 8081):
+        port = app.listenTCP(number, shutdown_timeout=5 if number == 8080 else None)
+        port.stopListening = lambda number=number: stopped.append(number)
+    assert reactor.triggers["before"]["shutdown"] == [(app.shutdown, (5,), {})]
+
+    websocket = FakeWebSocket(app.ws_factory.connections)
+    websocket.failAsks = lambda reason: WSProtocol.failAsks(websocket, reason)
+    websocket.deferred_asks = {"token": defer.Deferred()}
+    failed = []
+    websocket.deferred_asks["token"].addErrback(failed.append)
+
+    results = []
+    app.shutdown(timeout=1).addCallback(results.append)
+
+    assert websocket.deferred_asks == {}
+    assert failed[0].check(ConnectionDone)
+    assert stopped == [8080, 8081]
+    assert websocket.closed_with == 1001
+
+    reactor.pump([app.DRAIN_POLL_INTERVAL] * 15)
+    assert results == [([], [], [websocket])]
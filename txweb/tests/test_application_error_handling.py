@@ -115,4 +115,39 @@ def test_correctly_processes_redirects(dummy_request:RequestRetval):
     response = dummy_request.read()
     assert dummy_request.response_contains(b"302 FOUND")
     assert dummy_request.response_contains(b"Location: /foo")
-    assert dummy_request.response_contains(b"<title>Redirecting to /foo</title>")
\ No newline at end of file
+    assert dummy_request.response_contains(b"<title>Redirecting to /foo</title>")
+
+def test_unmatched_routes_skip_the_failure_chain(dummy_request:RequestRetval):
+
+    app = Application(__name__)
+
+    @app.add("/foo", methods=["POST"])
+    def handle_foo(request):
+        return b"foo"
+
+    dummy_request.setup(app)
+    app.processingFailed = MagicMock()
+
+    dummy_request.request.requestReceived(b"GET", b"/foo", b"HTTP/1.1")
+
+    app.processingFailed.assert_not_called()
+    assert dummy_request.request.code == 405
+    assert dummy_request.request.responseHeaders.getRawHeaders(b"allow") == [b"POST"]
+    assert dummy_request.request.responseHeaders.getRawHeaders(b"content-length") == [b"18"]
+    assert dummy_request.read().endswith(b"Method not allowed")
+
+
+def test_unmatched_routes_still_reach_custom_handlers(dummy_request:RequestRetval):
+
+    app = Application(__name__)
+    dummy_request.setup(app)
+
+    @app.handle_error(http_codes.HTTP404)
+    def handle404(request:StrRequest, reason:Failure):
+        assert reason.frames == []
+        request.writeTotal("Nöpe", code=404, message="Not here")
+
+    dummy_request.request.requestReceived(b"GET", b"/missing", b"HTTP/1.1")
+
+    assert dummy_request.request.code_message == b"Not here"
+    assert dummy_request.request.responseHeaders.getRawHeaders(b"content-length") == [b"5"]
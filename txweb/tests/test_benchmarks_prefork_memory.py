@@ -0,0 +1,36 @@
+import gc
+from pathlib import Path
+
+import pytest
+
+from txweb import Application
+from txweb.benchmarks.prefork_memory import run
+
+
+@pytest.mark.skipif(not Path("/proc/self/smaps").exists(), reason="Linux only")
+def test_prefork_memory_benchmark_reports_every_mode():
+    results = run(workers=[2], route_count=40, reference_rows=2000, request_count=100)
+
+    assert set(results) == {"no_preload:2", "preload_no_gc_freeze:2", "preload:2"}
+    for metrics in results.values():
+        assert set(metrics) == {"uss_kb", "pss_kb"}
+        assert metrics["uss_kb"] > 0
+    assert gc.get_freeze_count() == 0
+
+
+def test_warm_up_runs_preload_hooks_then_freezes_routes_and_gc():
+    app = Application(__name__)
+    loaded = []
+
+    @app.preload
+    def load(application):
+        loaded.append(application)
+
+    try:
+        app.warm_up(["txweb.benchmarks.routing"])
+
+        assert loaded == [app]
+        assert app.router.frozen
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,46 @@
+import json
+
+from txweb.benchmarks import compare
+from txweb.benchmarks.routing import build_app, make_traffic, make_cold_traffic, engine_call, main, ROUTE_MIX
+
+
+def test_synthetic_traffic_matches_the_synthetic_routes():
+    app, routes = build_app(len(ROUTE_MIX) * 2)
+    hits, misses = make_traffic(routes, 300, miss_ratio=0.2)
+
+    assert len(hits) == 240 and len(misses) == 60
+    assert all(app.router._match(request).rule is not None for request in hits)
+    assert all(hasattr(app.router._match(request), "code") for request in misses)
+    assert all(engine_call(app.router, request)().rule is not None for request in hits)
+
+
+def test_cold_traffic_is_never_answered_by_the_match_cache():
+    app, routes = build_app(len(ROUTE_MIX) * 2)
+    app.freeze()
+    hits, misses = make_traffic(routes, 300)
+    for request in hits + misses:
+        app.router._match(request)
+
+    before = app.router.route_cache_info()
+    cold = make_cold_traffic(routes, 100, batch=0) + make_cold_traffic(routes, 100, batch=1)
+    assert all(app.router._match(request).rule is not None for request in cold)
+
+    after = app.router.route_cache_info()
+    assert after.hits == before.hits and after.misses == before.misses + 200
+
+
+def test_results_can_be_compared_against_a_baseline(tmp_path):
+    output = tmp_path / "routing.json"
+
+    assert main(["--routes", "40", "--engines", "radix", "--requests", "200", "--repeat", "1",
+                 "--output", str(output)]) == 0
+
+    document = json.loads(output.read_text())
+    assert document["meta"]["benchmark"] == "routing"
+    assert set(document["results"]["radix:40"]) >= {"hit_ns", "miss_ns", "mixed_ns", "engine_ns", "cold_ns",
+                                                          "peak_bytes_per_match"}
+
+    baseline = {"radix:40": {"hit_ns": 100.0, "miss_ns": 100.0}}
+    current = {"radix:40": {"hit_ns": 150.0, "miss_ns": 50.0, "new_metric": 1.0}}
+    changes = {comparison.metric: comparison.change for comparison in compare(baseline, current)}
+    assert changes == {"hit_ns": 0.5, "miss_ns": -0.5}
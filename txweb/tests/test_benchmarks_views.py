@@ -0,0 +1,10 @@
+from txweb.benchmarks.views import run
+
+
+def test_view_benchmark_reports_every_case():
+    results = run(request_count=50, repeat=1)
+
+    assert set(results) == {"function:plain", "function:filtered", "class:render", "class:render_method",
+                            "class:filtered"}
+    for metrics in results.values():
+        assert set(metrics) == {"render_ns", "overhead_ns", "reference_render_ns", "reference_overhead_ns"}
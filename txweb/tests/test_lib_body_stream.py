@@ -0,0 +1,86 @@
+from twisted.internet.protocol import Protocol
+from twisted.web.client import ResponseDone
+
+from txweb import Application
+from txweb.lib.body_stream import BodyStream
+
+from .helper import http_exchange
+
+HEAD = b"POST /ingest HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n"
+
+
+def test_async_view_reads_the_body_while_it_arrives():
+    app = Application(namespace=__name__)
+    seen = []
+
+    @app.route("/ingest", methods=["POST"], stream_body=True)
+    async def ingest(request):
+        async for chunk in request.body:
+            seen.append(chunk)
+        return f"{sum(map(len, seen))} bytes"
+
+    transport = http_exchange(app, HEAD % 10 + b"01234")
+    assert seen == [b"01234"]
+    assert transport.value() == b""
+
+    transport.protocol.dataReceived(b"56789")
+    assert seen == [b"01234", b"56789"]
+    assert transport.value().endswith(b"10 bytes")
+
+
+def test_deliver_body_with_backpressure(monkeypatch):
+    monkeypatch.setattr(BodyStream, "HIGH_WATER", 8)
+    app = Application(namespace=__name__)
+    bodies = {}
+
+    class Collect(Protocol):
+        def __init__(self):
+            self.data, self.reason = b"", None
+
+        def dataReceived(self, data):
+            self.data += data
+
+        def connectionLost(self, reason):
+            self.reason = reason
+
+    @app.route("/ingest", methods=["POST"], stream_body=True)
+    def ingest(request):
+        bodies["stream"] = request.body
+        return "accepted"
+
+    transport = http_exchange(app, HEAD % 20 + b"0123456789")
+    # Nothing is reading the body, the connection is paused once more than HIGH_WATER is buffered
+    assert transport.producerState == "paused"
+    # The view answered right away, the request is finished once its body is in
+    assert transport.value().endswith(b"accepted")
+
+    protocol = Collect()
+    bodies["stream"].deliverBody(protocol)
+    assert transport.producerState == "producing"
+    assert protocol.data == b"0123456789"
+
+    transport.protocol.dataReceived(b"abcdefghij")
+    assert protocol.data == b"0123456789abcdefghij"
+    assert protocol.reason.check(ResponseDone)
+
+
+def test_streaming_route_answers_expect_continue_and_keeps_the_connection():
+    app = Application(namespace=__name__)
+
+    @app.route("/ingest", methods=["POST"], stream_body=True)
+    def ingest(request):
+        return "early"
+
+    @app.route("/next")
+    def next_request(request):
+        return "next"
+
+    transport = http_exchange(app, b"POST /ingest HTTP/1.1\r\nHost: localhost\r\nExpect: 100-continue\r\n"
+                                   b"Content-Length: 5\r\n\r\n",
+                              b"hello" + b"GET /next HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = transport.value()
+
+    assert response.startswith(b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 200 OK")
+    assert response.count(b"100 Continue") == 1
+    assert b"early" in response and response.endswith(b"next")
+    assert not transport.disconnecting
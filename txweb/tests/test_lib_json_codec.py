@@ -0,0 +1,69 @@
+import io
+
+import pytest
+from twisted.web.test import requesthelper
+
+from txweb import Application
+from txweb.http_codes import HTTP400
+from txweb.lib.json_codec import CODECS, JSONCodec, get_codec
+from txweb.lib.str_request import StrRequest
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_codecs_agree(name):
+    codec = get_codec(name)
+    data = {"word": "café", "number": 123, "list": [1.5, None, True], 7: "int key"}
+
+    encoded = codec.dumps(data)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == {**{k: v for k, v in data.items() if k != 7}, "7": "int key"}
+    assert CODECS["json"].loads(encoded) == codec.loads(encoded)
+
+    with pytest.raises(ValueError):
+        codec.loads(b"{not json")
+
+
+def test_get_codec():
+    assert get_codec(None).name in CODECS
+    custom = JSONCodec("custom", lambda obj: b"{}", lambda data: {})
+    assert get_codec(custom) is custom
+
+    with pytest.raises(ValueError):
+        get_codec("simplejson")
+
+
+def test_request_json_is_decoded_once_with_the_application_codec(dummy_request):
+    loads = []
+    app = Application(namespace=__name__)
+    app.json_codec = JSONCodec("counting", CODECS["json"].dumps, lambda data: loads.append(data) or {"a": 1})
+    dummy_request.setup(app)
+
+    request = dummy_request.request
+    request.requestHeaders.setRawHeaders(b"Content-Type", [b"application/json; charset=utf-8"])
+    request.content = io.BytesIO(b'{"a": 1}')
+
+    assert request.json == {"a": 1}
+    assert request.json is request.get_json()
+    assert loads == [b'{"a": 1}']
+    assert request.content.tell() == 0
+
+
+def test_request_json_rejects_bad_json():
+    request = StrRequest(requesthelper.DummyChannel())
+    request.requestHeaders.setRawHeaders(b"Content-Type", [b"application/json"])
+    request.content = io.BytesIO(b"{bad")
+
+    with pytest.raises(HTTP400):
+        request.json
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_write_json_sends_the_byte_length(dummy_request, name):
+    app = Application(namespace=__name__, json_codec=name)
+    dummy_request.setup(app)
+
+    dummy_request.request.writeJSON({"word": "café"})
+
+    body = CODECS[name].dumps({"word": "café"})
+    assert dummy_request.read().endswith(body)
+    assert dummy_request.request.responseHeaders.getRawHeaders(b"content-length") == [str(len(body)).encode()]
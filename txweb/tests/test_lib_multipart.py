@@ -0,0 +1,153 @@
+import errno
+import io
+import os
+import tempfile
+
+import pytest
+
+from txweb import Application
+from txweb.http_codes import HTTP400, HTTP413
+from txweb.lib import multipart
+from txweb.lib.multipart import BodyLimits, MultipartParser, copy_file
+
+from .helper import http_exchange
+
+BOUNDARY = b"---------------------------8693289853609"
+
+
+def multipart_body(fields=(), files=()):
+    body = b""
+    for name, value in fields:
+        body += b"--%s\r\nContent-Disposition: form-data; name=\"%s\"\r\n\r\n%s\r\n" % (BOUNDARY, name, value)
+    for name, filename, content in files:
+        body += (b"--%s\r\nContent-Disposition: form-data; name=\"%s\"; filename=\"%s\"\r\n"
+                 b"Content-Type: application/octet-stream\r\n\r\n%s\r\n") % (BOUNDARY, name, filename, content)
+    return body + b"--%s--\r\n" % BOUNDARY
+
+
+def feed_in_chunks(parser, body, size=7):
+    for offset in range(0, len(body), size):
+        parser.feed(body[offset:offset + size])
+    return parser.close()
+
+
+def post(app, path, body, content_type=b"multipart/form-data; boundary=" + BOUNDARY):
+    head = b"POST %s HTTP/1.1\r\nHost: localhost\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n" \
+        % (path, content_type, len(body))
+    return http_exchange(app, head, *[body[offset:offset + 1000] for offset in range(0, len(body), 1000)]).value()
+
+
+def test_parses_fields_and_spools_large_files_to_disk():
+    payload = bytes(range(256)) * 40
+    body = multipart_body(fields=[(b"word", b"caf\xc3\xa9")],
+                          files=[(b"small", b"small.bin", b"tiny"), (b"big", b"big.bin", payload)])
+
+    form, files = feed_in_chunks(MultipartParser(BOUNDARY, BodyLimits(spool_size=1024)), body)
+
+    assert form["word"] == "café"
+    assert files["small"].read() == b"tiny"
+    assert files["small"].stream._rolled is False
+    assert files["big"].filename == "big.bin"
+    assert files["big"].stream._rolled is True
+    assert files["big"].read() == payload
+
+
+def test_form_fields_over_the_memory_limit_are_rejected():
+    parser = MultipartParser(BOUNDARY, BodyLimits(max_form_memory_size=10))
+
+    with pytest.raises(HTTP413):
+        feed_in_chunks(parser, multipart_body(fields=[(b"word", b"x" * 11)]))
+
+    # Files are not form fields
+    parser = MultipartParser(BOUNDARY, BodyLimits(max_form_memory_size=10))
+    _, files = feed_in_chunks(parser, multipart_body(files=[(b"upload", b"a.txt", b"x" * 100)]))
+    assert files["upload"].read() == b"x" * 100
+
+
+def test_truncated_body_is_a_bad_request():
+    parser = MultipartParser(BOUNDARY)
+    parser.feed(multipart_body(fields=[(b"word", b"test")])[:-10])
+
+    with pytest.raises(HTTP400):
+        parser.close()
+
+
+@pytest.mark.parametrize("spool_size", [0, 1024 * 1024])
+def test_saved_uploads_match_what_was_sent(tmp_path, spool_size):
+    payload = b"0123456789" * 5000
+    _, files = feed_in_chunks(MultipartParser(BOUNDARY, BodyLimits(spool_size=spool_size)),
+                              multipart_body(files=[(b"upload", b"data.bin", payload)]), size=4096)
+
+    files["upload"].save(tmp_path / "data.bin")
+    assert (tmp_path / "data.bin").read_bytes() == payload
+
+    target = io.BytesIO()
+    files["upload"].stream.seek(0)
+    files["upload"].save(target)
+    assert target.getvalue() == payload
+
+
+def copy_skipping_a_header():
+    with tempfile.TemporaryFile() as source, tempfile.TemporaryFile() as target:
+        source.write(b"skip:payload")
+        source.seek(5)
+        target.write(b"header|")
+
+        copy_file(source, target)
+
+        assert source.tell() == 12
+        assert target.tell() == 14
+        target.seek(0)
+        assert target.read() == b"header|payload"
+
+
+def test_copy_file_copies_from_the_current_position():
+    copy_skipping_a_header()
+
+
+@pytest.mark.parametrize("platform", ["linux_sendfile", "bsd_sendfile", "windows"])
+def test_copy_file_without_copy_file_range(monkeypatch, platform):
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    sent = []
+
+    def sendfile(out_fd, in_fd, offset, count):
+        if platform == "bsd_sendfile":
+            raise OSError(errno.ENOTSOCK, "Socket operation on non-socket")
+        sent.append(count)
+        os.lseek(in_fd, offset, os.SEEK_SET)
+        return os.write(out_fd, os.read(in_fd, count))
+
+    if platform == "windows":
+        monkeypatch.delattr(os, "sendfile", raising=False)
+        monkeypatch.setattr(multipart, "SENDFILE_TO_FILES", False)
+    else:
+        monkeypatch.setattr(os, "sendfile", sendfile, raising=False)
+        monkeypatch.setattr(multipart, "SENDFILE_TO_FILES", True)
+
+    copy_skipping_a_header()
+    assert sent == ([7] if platform == "linux_sendfile" else [])
+
+
+def test_route_and_application_body_limits():
+    app = Application(namespace=__name__)
+    app.set_body_limits(max_content_length=2000)
+
+    @app.route("/upload", methods=["POST"], max_content_length=100000, max_form_memory_size=10)
+    def upload(request):
+        return f"{request.form.get('word')}:{len(request.files['upload'].read())}"
+
+    @app.route("/other", methods=["POST"])
+    def other(request):
+        return "other"
+
+    payload = b"x" * 50000
+    response = post(app, b"/upload", multipart_body(fields=[(b"word", b"test")],
+                                                    files=[(b"upload", b"data.bin", payload)]))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.endswith(b"test:50000")
+
+    response = post(app, b"/upload", multipart_body(fields=[(b"word", b"x" * 11)]))
+    assert response.startswith(b"HTTP/1.1 413")
+
+    response = post(app, b"/other", b"word=" + b"x" * 2000, content_type=b"application/x-www-form-urlencoded")
+    assert response.startswith(b"HTTP/1.1 413")
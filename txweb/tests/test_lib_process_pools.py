@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+from txweb import Application
+from txweb.lib.process_pools import ProcessPools, ProcessRequest
+
+from .helper import RequestRetval
+
+
+def worker_pid(request, **route_args):
+    return f"{os.getpid()} {request.method.decode()} {request.getHeader('x-name').decode()} {route_args}"
+
+
+def current_pid(_request):
+    return os.getpid()
+
+
+def slow_pid(_request):
+    time.sleep(0.5)
+    return os.getpid()
+
+
+def test_process_pool_views_run_in_worker_processes(dummy_request: RequestRetval, queue_reactor):
+    app = Application(namespace=__name__, twisted_reactor=queue_reactor)
+    app.process_pool(workers=1)
+    dummy_request.setup(app)
+
+    app.route("/cpu/<int:frames>", process_pool=True)(worker_pid)
+
+    dummy_request.request.requestHeaders.setRawHeaders(b"X-Name", [b"gif"])
+    try:
+        dummy_request.request.requestReceived(b"GET", b"/cpu/12", b"HTTP/1.1")
+        queue_reactor.pump()
+    finally:
+        app.process_pools.stop()
+
+    pid, rest = dummy_request.read().rsplit(b"\r\n\r\n", 1)[1].split(b" ", 1)
+    assert int(pid) != os.getpid()
+    assert rest == b"GET gif {'frames': 12}"
+    assert dummy_request.request.finished in [True, 1]
+    assert app.process_pool_stats()["default"].completed == 1
+
+
+def test_full_process_pools_shed_load_with_503(dummy_request: RequestRetval, queue_reactor):
+    app = Application(namespace=__name__, twisted_reactor=queue_reactor)
+    app.process_pool("busy", workers=1, max_queue=1)
+    dummy_request.setup(app)
+
+    app.route("/slow", process_pool="busy")(slow_pid)
+
+    snapshot = ProcessRequest(b"GET", b"/slow", b"/slow", {}, {}, b"")
+    try:
+        first = app.process_pools.get("busy").run(slow_pid, snapshot)
+        dummy_request.request.requestReceived(b"GET", b"/slow", b"HTTP/1.1")
+
+        assert dummy_request.request.code == 503
+        assert dummy_request.request.responseHeaders.getRawHeaders(b"retry-after") == [b"1"]
+
+        queue_reactor.pump()
+        assert first.called
+    finally:
+        app.process_pools.stop()
+
+    stats = app.process_pool_stats()["busy"]
+    assert (stats.pending, stats.completed, stats.shed) == (0, 1, 1)
+
+
+def test_workers_are_recycled_after_max_tasks(queue_reactor):
+    pools = ProcessPools(queue_reactor)
+    pool = pools.get("recycled", workers=1, max_tasks_per_child=1)
+    snapshot = ProcessRequest(b"GET", b"/", b"/", {}, {}, b"")
+
+    pids = []
+    try:
+        for _ in range(2):
+            pool.run(current_pid, snapshot).addCallback(pids.append)
+            queue_reactor.pump()
+    finally:
+        pools.stop()
+
+    assert len(set(pids)) == 2
+
+    with pytest.raises(RuntimeError):
+        pool.start()
+        pool.configure(workers=2)
+    pool.stop()
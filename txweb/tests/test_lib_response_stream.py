@@ -0,0 +1,146 @@
+import pytest
+from twisted.internet import defer, task
+from twisted.internet.error import ConnectionDone
+from twisted.python import failure
+
+from txweb import Application
+from txweb.lib.response_stream import ResponseStream
+
+from .helper import http_exchange
+
+GET = b"GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+class Steps:
+    """
+        A cooperator scheduler run by hand, one chunk per step()
+    """
+    def __init__(self):
+        self.pending = []
+
+    def schedule(self, work):
+        self.pending.append(work)
+        return self
+
+    def cancel(self):
+        self.pending.clear()
+
+    def step(self, count=1):
+        for _ in range(count):
+            pending, self.pending = self.pending, []
+            for work in pending:
+                work()
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    steps = Steps()
+    cooperator = task.Cooperator(terminationPredicateFactory=lambda: lambda: True, scheduler=steps.schedule)
+    monkeypatch.setattr(ResponseStream, "COOPERATOR", cooperator)
+    return steps
+
+
+def body_of(transport):
+    return transport.value().partition(b"\r\n\r\n")[2]
+
+
+def test_sync_generator_is_chunked_and_paused_by_the_transport(steps):
+    app = Application(namespace=__name__)
+    closed = []
+
+    @app.route("/export.csv")
+    def export(request):
+        request.setHeader("content-type", "text/csv")
+        try:
+            for row in range(4):
+                yield f"row,{row}\r\n"
+        finally:
+            closed.append(True)
+
+    transport = http_exchange(app, GET % b"/export.csv")
+    assert b"Transfer-Encoding: chunked" not in transport.value()
+
+    steps.step()
+    assert b"Transfer-Encoding: chunked" in transport.value()
+    assert b"Content-Length" not in transport.value()
+    assert body_of(transport) == b"7\r\nrow,0\r\n\r\n"
+
+    # The connection's write buffer is full
+    transport.producer.pauseProducing()
+    steps.step(2)
+    assert body_of(transport) == b"7\r\nrow,0\r\n\r\n"
+
+    transport.producer.resumeProducing()
+    steps.step(5)
+
+    assert body_of(transport) == b"".join(b"7\r\nrow,%d\r\n\r\n" % row for row in range(4)) + b"0\r\n\r\n"
+    assert closed == [True]
+
+
+def test_async_generator_waits_for_the_transport_to_drain():
+    app = Application(namespace=__name__)
+    events = [defer.Deferred() for _ in range(3)]
+
+    @app.route("/events")
+    async def event_stream(request):
+        for event in events:
+            yield await event
+
+    transport = http_exchange(app, GET % b"/events")
+    events[0].callback(b"one\n")
+    assert body_of(transport) == b"4\r\none\n\r\n"
+
+    transport.producer.pauseProducing()
+    events[1].callback("two\n")
+    # Read before the pause, written but the next event is not awaited until the transport drains
+    assert body_of(transport).endswith(b"4\r\ntwo\n\r\n")
+    events[2].callback(b"three\n")
+    assert b"three" not in transport.value()
+
+    transport.producer.resumeProducing()
+    assert body_of(transport).endswith(b"6\r\nthree\n\r\n0\r\n\r\n")
+
+
+def test_failures_before_and_after_the_first_chunk(steps):
+    app = Application(namespace=__name__)
+
+    @app.route("/early")
+    def early(request):
+        raise ValueError("no rows")
+        yield b"never"  # pylint: disable=unreachable
+
+    @app.route("/late")
+    def late(request):
+        yield b"partial"
+        raise ValueError("cursor died")
+
+    transport = http_exchange(app, GET % b"/early")
+    steps.step()
+    assert transport.value().startswith(b"HTTP/1.1 500")
+
+    transport = http_exchange(app, GET % b"/late")
+    steps.step(2)
+    assert body_of(transport) == b"7\r\npartial\r\n"
+    assert transport.disconnecting
+
+
+def test_client_disconnect_stops_the_generator(steps):
+    app = Application(namespace=__name__)
+    produced, closed = [], []
+
+    @app.route("/forever")
+    def forever(request):
+        try:
+            while True:
+                produced.append(True)
+                yield b"x"
+        finally:
+            closed.append(True)
+
+    transport = http_exchange(app, GET % b"/forever")
+    steps.step()
+    transport.protocol.connectionLost(failure.Failure(ConnectionDone()))
+    steps.step()
+
+    assert closed == [True]
+    assert len(produced) == 1
@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock
+
+from werkzeug.routing import Map, Rule
+
+import pytest
+
+from txweb import App
+from txweb.lib.route_conflicts import find_conflicts, sample_path, SHADOWED, AMBIGUOUS
+
+
+def test_sample_paths_satisfy_their_own_rule():
+    route_map = Map([
+        Rule("/user/<int:user_id>/<any(edit, view):action>", endpoint="user"),
+        Rule("/item/<uuid:item>/<float:price>", endpoint="item"),
+        Rule("/files/<path:name>", endpoint="files"),
+    ])
+    adapter = route_map.bind("localhost")
+
+    for rule in route_map.iter_rules():
+        assert adapter.match(sample_path(rule), return_rule=True)[0] is rule
+
+
+def test_finds_shadowed_and_ambiguous_rules():
+    route_map = Map([
+        Rule("/page/<name>", endpoint="any_page"),
+        Rule("/page/<slug>", endpoint="slug_page"),
+        Rule("/form", endpoint="post_form", methods=["POST"]),
+        Rule("/form", endpoint="any_form"),
+        Rule("/fine", endpoint="fine"),
+    ])
+
+    conflicts = {conflict.rule.endpoint: conflict for conflict in find_conflicts(route_map)}
+
+    assert sorted(conflicts) == ["any_form", "slug_page"]
+    assert conflicts["slug_page"].kind == SHADOWED
+    assert conflicts["slug_page"].claimed_by[0].endpoint == "any_page"
+    assert conflicts["any_form"].kind == AMBIGUOUS
+    assert conflicts["any_form"].methods == ("POST",)
+
+
+def test_freeze_refuses_new_routes_and_runs_on_listen():
+
+    app = App(__name__)
+    app.reactor = MagicMock()
+
+    @app.route("/foo")
+    def handle_foo(request):
+        return b"foo"
+
+    app.listenTCP(8080)
+
+    assert app.router.frozen is True
+    assert app.freeze() == []
+    app.reactor.listenTCP.assert_called_once()
+
+    with pytest.raises(RuntimeError):
+        @app.route("/bar")
+        def handle_bar(request):
+            return b"bar"
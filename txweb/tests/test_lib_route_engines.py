@@ -0,0 +1,142 @@
+import itertools
+
+import pytest
+from werkzeug import routing as wz_routing
+
+from txweb import Application
+from txweb.lib.route_engines import WerkzeugEngine, RadixEngine, get_engine, rules_overlap
+from txweb.util.url_converter import DirectoryPath
+
+from .helper import RequestRetval
+
+
+def build_map():
+    route_map = wz_routing.Map()
+    route_map.converters['directory'] = DirectoryPath
+
+    for rule in [
+        wz_routing.Rule("/", endpoint="root"),
+        wz_routing.Rule("/health", endpoint="health"),
+        wz_routing.Rule("/api/status", endpoint="post_status", methods=["POST"]),
+        wz_routing.Rule("/api/<name>", endpoint="api_name", methods=["GET"]),
+        wz_routing.Rule("/api/<int:num>", endpoint="api_num"),
+        wz_routing.Rule("/user/<int:uid>/posts/<slug>", endpoint="posts"),
+        wz_routing.Rule("/user/<int:uid>/posts/", endpoint="posts_index"),
+        wz_routing.Rule("/files/<path:filename>", endpoint="files"),
+        wz_routing.Rule("/files/<path:filename>/edit", endpoint="files_edit"),
+        wz_routing.Rule("/a/<int:x>.json", endpoint="json"),
+        wz_routing.Rule("/a/<x>", endpoint="a_str"),
+        wz_routing.Rule("/static/", endpoint="dir", methods=["GET", "HEAD"], defaults={"postpath": ""}),
+        wz_routing.Rule("/static/<directory:postpath>", endpoint="dir", methods=["GET", "HEAD"]),
+        wz_routing.Submount("/sub", [wz_routing.Rule("/<name>/x", endpoint="sub_x"),
+                                     wz_routing.Rule("/y/<name>", endpoint="sub_y")]),
+        wz_routing.Rule("/js/", endpoint="js"),
+    ]:
+        route_map.add(rule)
+
+    return route_map
+
+
+PATHS = ["/", "/health", "/health/", "/api/status", "/api/12", "/api/abc", "/api/", "/user/5/posts/hi",
+         "/user/5/posts/", "/user/5/posts", "/user/x/posts/hi", "/files/a/b/c", "/files/a/b/edit", "/files/",
+         "/files", "/a/5.json", "/a/5", "/a/x.json", "/static/", "/static/a/b.css", "/static", "/sub/y/x",
+         "/sub/q/x", "/js", "/js/", "/nope", "//health"]
+
+
+def outcomes(engine_cls, warm_up=()):
+    route_map = build_map()
+    engine = engine_cls(route_map)
+    engine.compile()
+    adapter = route_map.bind("example.com", "/")
+
+    for path in warm_up:
+        engine.match(path, "GET", lambda: adapter)
+
+    for path, method in itertools.product(PATHS, ["GET", "POST", "HEAD"]):
+        try:
+            rule, values = engine.match(path, method, lambda: adapter)
+            yield path, method, rule.endpoint, values
+        except wz_routing.RequestRedirect as redirect:
+            yield path, method, "redirect", redirect.new_url
+        except wz_routing.MethodNotAllowed as exc:
+            yield path, method, 405, sorted(exc.valid_methods)
+        except wz_routing.NotFound:
+            yield path, method, 404
+
+
+def test_radix_engine_agrees_with_werkzeug():
+    assert list(outcomes(RadixEngine)) == list(outcomes(WerkzeugEngine))
+
+
+def test_rules_overlap():
+    def rule(pattern, **kwargs):
+        return wz_routing.Map([wz_routing.Rule(pattern, endpoint=pattern, **kwargs)]).iter_rules().__next__()
+
+    assert rules_overlap(rule("/api/<name>"), rule("/user/<name>")) is False
+    assert rules_overlap(rule("/api/<name>"), rule("/api/<int:num>")) is True
+    assert rules_overlap(rule("/a/<int:x>"), rule("/a/b")) is False
+    assert rules_overlap(rule("/x", methods=["POST"]), rule("/x", methods=["GET"])) is False
+    assert rules_overlap(rule("/x/", methods=["POST"]), rule("/x", methods=["GET"])) is True
+    assert rules_overlap(rule("/x/y/z"), rule("/x/y")) is False
+    assert rules_overlap(rule("/files/<path:name>"), rule("/files/a/b")) is True
+    assert rules_overlap(rule("/files/<path:name>"), rule("/other/a")) is False
+
+
+def test_hit_frequency_reordering_keeps_werkzeug_semantics():
+
+    class EagerEngine(WerkzeugEngine):
+        REORDER_INTERVAL = 10
+
+    hot = ["/sub/y/x", "/a/5", "/user/5/posts/hi", "/api/12"] * 30
+    route_map = build_map()
+    engine = EagerEngine(route_map)
+    engine.compile()
+    original = [rule.rule for rule in route_map.iter_rules()]
+    adapter = route_map.bind("example.com", "/")
+
+    for path in hot:
+        engine.match(path, "GET", lambda: adapter)
+
+    reordered = [rule.rule for rule in route_map.iter_rules()]
+    assert reordered != original
+    assert reordered.index("/sub/y/<name>") < original.index("/sub/y/<name>")
+
+    assert list(outcomes(EagerEngine, hot)) == list(outcomes(WerkzeugEngine))
+
+
+def test_radix_engine_defers_unsupported_rules():
+    route_map = build_map()
+    route_map.add(wz_routing.Rule("/loose/", endpoint="loose", strict_slashes=False))
+
+    engine = RadixEngine(route_map)
+    engine.compile()
+    adapter = route_map.bind("example.com", "/")
+
+    assert engine._delegate is True
+    rule, _ = engine.match("/loose", "GET", lambda: adapter)
+    assert rule.endpoint == "loose"
+
+
+def test_get_engine():
+    assert get_engine("radix") is RadixEngine
+    assert get_engine(WerkzeugEngine) is WerkzeugEngine
+
+    with pytest.raises(ValueError):
+        get_engine("nope")
+
+
+def test_application_can_select_radix_engine(dummy_request: RequestRetval):
+
+    app = Application(__name__, routing_engine="radix")
+
+    @app.route("/thing/<int:thing_id>")
+    def handle_thing(request, thing_id):
+        return f"thing {thing_id}"
+
+    assert isinstance(app.router.engine, RadixEngine)
+
+    dummy_request.setup(app)
+    dummy_request.request.requestReceived(b"GET", b"/thing/12", b"HTTP/1.1")
+
+    assert dummy_request.request.route_args == {"thing_id": 12}
+    assert dummy_request.read().endswith(b"thing 12")
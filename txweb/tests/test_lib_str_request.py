@@ -3,12 +3,15 @@ import io
 
 from twisted.web.test import requesthelper
 from twisted.python.compat import intToBytes
+from txweb import Application
 from txweb.lib.str_request import StrRequest
 
 from pathlib import Path
 
 import pytest
 
+from .helper import http_exchange
+
 def test_request_has_json_property():
 
     dummy = requesthelper.DummyChannel()
@@ -125,3 +128,89 @@ def test_writes_str_headers(dummy_request):
     dummy_request.request.setHeader("x-thing", "123")
 
 
+
+
+def test_oversized_bodies_are_refused_before_they_are_read():
+    app = Application(namespace=__name__)
+    app.set_body_limits(max_content_length=100)
+    bodies = []
+
+    @app.route("/upload", methods=["POST"], max_content_length=1000)
+    def upload(request):
+        bodies.append(request.content.read())
+        return "ok"
+
+    @app.route("/small", methods=["POST"])
+    def small(request):
+        return "small"
+
+    # Refused on the headers alone, 100 Continue is never sent and the body is not read
+    transport = http_exchange(app, b"POST /small HTTP/1.1\r\nHost: localhost\r\nExpect: 100-continue\r\n"
+                                   b"Content-Length: 500\r\n\r\n", b"x" * 500)
+    assert transport.value().startswith(b"HTTP/1.1 413 Payload Too Large\r\n")
+    assert b"100 Continue" not in transport.value()
+    assert b"connection: close" in transport.value().lower()
+    assert transport.disconnecting
+
+    transport = http_exchange(app, b"POST /upload HTTP/1.1\r\nHost: localhost\r\nExpect: 100-continue\r\n"
+                                   b"Content-Length: 500\r\n\r\n", b"x" * 500)
+    assert transport.value().startswith(b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 200 OK")
+    assert bodies == [b"x" * 500]
+
+    # Without a Content-Length, refused as soon as the limit is passed
+    transport = http_exchange(app, b"POST /small HTTP/1.1\r\nHost: localhost\r\nTransfer-Encoding: chunked\r\n\r\n",
+                              b"64\r\n" + b"x" * 100 + b"\r\n", b"1\r\nx\r\n")
+    assert transport.value().startswith(b"HTTP/1.1 413 Payload Too Large\r\n")
+    assert transport.disconnecting
+
+
+def test_args_and_form_are_parsed_on_first_use(monkeypatch):
+    parsed = []
+    monkeypatch.setattr(StrRequest, "_processFormData",
+                        lambda self, *args: parsed.append(args) or setattr(self, "form", {"word": "test"}))
+
+    r = StrRequest(requesthelper.DummyChannel())
+    r.content = io.BytesIO(b"word=test")
+    r.requestHeaders.setRawHeaders(b"Content-Type", [b"application/x-www-form-urlencoded"])
+    r.requestHeaders.setRawHeaders(b"Content-Length", [b"9"])
+    r.requestReceived(b"POST", b"/foo?word=abc", b"HTTP/1.1")
+
+    assert r._args is None and parsed == []
+    assert r.args["word"] == "abc"
+    assert r.form["word"] == "test"
+    assert r.form["word"] == "test"
+    assert len(parsed) == 1
+
+    r = StrRequest(requesthelper.DummyChannel())
+    r.content = io.BytesIO(b"")
+    r.requestReceived(b"GET", b"/foo", b"HTTP/1.1")
+    assert r.path == b"/foo"
+    assert r.args == {} and r.form == {} and r.files == {}
+
+
+def test_unread_bodies_are_closed_with_the_request():
+    app = Application(namespace=__name__)
+    requests = []
+
+    @app.route("/ingest", methods=["POST"])
+    def ingest(request):
+        requests.append((request, request.content))
+        return "ok"
+
+    def post(content_type, body):
+        http_exchange(app, b"POST /ingest HTTP/1.1\r\nHost: localhost\r\nContent-Type: %s\r\n"
+                           b"Content-Length: %d\r\n\r\n" % (content_type, len(body)) + body)
+        return requests[-1]
+
+    request, content = post(b"application/json", json.dumps({"data": "x" * 120 * 1024}).encode())
+    assert request.finished and content.closed
+
+    # An unread form body held in a file is parsed before it is closed
+    request, content = post(b"application/x-www-form-urlencoded", b"word=" + b"x" * 120 * 1024)
+    assert content.closed
+    assert len(request.form["word"]) == 120 * 1024
+
+    # A small one is still only parsed if it is read
+    request, content = post(b"application/x-www-form-urlencoded", b"word=test")
+    assert request._form is None and not content.closed
+    assert request.form["word"] == "test"
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from txweb import Application
+from txweb.lib.message_handler import MessageHandler
+from txweb.lib.thread_pools import ThreadPools
+
+from .helper import RequestRetval
+
+
+def test_threaded_views_run_off_the_reactor_thread(dummy_request: RequestRetval, queue_reactor):
+    app = Application(namespace=__name__, twisted_reactor=queue_reactor)
+    dummy_request.setup(app)
+    threads_used = []
+
+    @app.route("/blocking/<int:item_id>", threaded=True)
+    def blocking(request, item_id):
+        threads_used.append(threading.current_thread())
+        return f"item {item_id}"
+
+    try:
+        dummy_request.request.requestReceived(b"GET", b"/blocking/3", b"HTTP/1.1")
+        queue_reactor.pump()
+    finally:
+        app.thread_pools.stop()
+
+    assert threads_used and threads_used[0] is not threading.current_thread()
+    assert dummy_request.request.finished in [True, 1]
+    assert dummy_request.read().endswith(b"item 3")
+
+    stats = app.thread_pool_stats()["default"]
+    assert (stats.queued, stats.active, stats.completed, stats.failed) == (0, 0, 1, 0)
+
+
+def test_pool_stats_report_queue_depth_and_wait_time(queue_reactor):
+    pools = ThreadPools(queue_reactor)
+    pool = pools.get("reports", max_threads=1)
+    release = threading.Event()
+
+    def slow(value):
+        release.wait(5)
+        return value
+
+    results = []
+    try:
+        pool.run(slow, 1).addCallback(results.append)
+        pool.run(slow, 2).addCallback(results.append)
+
+        busy = pool.stats()
+        for _ in range(500):
+            if busy.active == 1:
+                break
+            release.wait(0.01)
+            busy = pool.stats()
+
+        assert (busy.name, busy.max_threads, busy.active, busy.queued) == ("reports", 1, 1, 1)
+
+        release.set()
+        queue_reactor.pump(2)
+    finally:
+        pools.stop()
+
+    done = pools.stats()["reports"]
+    assert results == [1, 2]
+    assert (done.queued, done.active, done.completed) == (0, 0, 2)
+    assert done.max_wait > 0 and done.mean_wait > 0
+
+    with pytest.raises(ValueError):
+        pools.wrap(slow, 5)
+
+
+def test_threaded_websocket_endpoints_return_deferreds(queue_reactor):
+    app = Application(namespace=__name__, twisted_reactor=queue_reactor)
+    app.thread_pool("ws", max_threads=2)
+
+    @app.ws_add("legacy.lookup", assign_args=True, threaded="ws")
+    def lookup(message, key: str = None):
+        return key.upper()
+
+    results = []
+    try:
+        app.ws_endpoints["legacy.lookup"](MessageHandler(dict(args=dict(key="abc")), None)).addCallback(results.append)
+        queue_reactor.pump()
+    finally:
+        app.thread_pools.stop()
+
+    assert results == ["ABC"]
+    assert app.thread_pool_stats()["ws"].completed == 1
@@ -6,6 +6,8 @@ from txweb.resources import RoutingResource
 from txweb import App
 from txweb.http_codes import Unrenderable
 from txweb.resources import ViewClassResource
+from txweb.lib.route_table import RouteMiss, NOT_FOUND
+from txweb.util.basic import get_thing_name
 
 from unittest.mock import sentinel
 import typing as T
@@ -111,3 +113,164 @@ def test_handle_add_slashes(dummy_request:RequestRetval):
 
 
 
+
+
+def test_bound_adapters_are_reused_until_a_rule_is_added(dummy_request:RequestRetval):
+
+    app = App(__name__)
+
+    @app.route("/foo")
+    def handle_foo(request):
+        return b"foo"
+
+    dummy_request.request.path = b"/foo"
+    dummy_request.request.method = b"GET"
+
+    table = app.router.table()
+    first = table.build_map(dummy_request.request)
+    assert table.build_map(dummy_request.request) is first
+    assert len(table._adapters) == 1
+
+    @app.route("/bar")
+    def handle_bar(request):
+        return b"bar"
+
+    assert len(table._adapters) == 0
+    assert table.build_map(dummy_request.request) is not first
+
+
+def test_static_routes_skip_werkzeug_matching(dummy_request:RequestRetval):
+
+    app = App(__name__)
+
+    @app.route("/health")
+    def handle_health(request):
+        return b"ok"
+
+    @app.route("/thing/<int:thing_id>")
+    def handle_thing(request, thing_id):
+        return b"thing"
+
+    app.router.table().build_map = MagicMock(side_effect=AssertionError("werkzeug should not be consulted"))
+
+    dummy_request.request.path = b"/health"
+    dummy_request.request.method = b"GET"
+    rule, kwargs = app.router._match(dummy_request.request)
+
+    assert rule.rule == "/health"
+    assert kwargs == {}
+
+
+def test_static_index_preserves_werkzeug_method_precedence(dummy_request:RequestRetval):
+
+    app = App(__name__)
+
+    @app.route("/api/status", methods=["POST"])
+    def post_status(request):
+        return b"post"
+
+    @app.route("/api/status")
+    def any_status(request):
+        return b"any"
+
+    @app.route("/api/<name>", methods=["GET"])
+    def get_named(request, name):
+        return name
+
+    index = app.router.table().build_static_index()
+
+    assert index[("POST", "/api/status")].endpoint == get_thing_name(post_status)
+    assert index[(None, "/api/status")].endpoint == get_thing_name(any_status)
+
+    dummy_request.request.path = b"/api/other"
+    dummy_request.request.method = b"GET"
+    rule, kwargs = app.router._match(dummy_request.request)
+    assert rule.endpoint == get_thing_name(get_named)
+    assert kwargs == {"name": "other"}
+
+
+def test_route_matches_and_misses_are_cached(dummy_request:RequestRetval):
+    app = App(__name__)
+
+    @app.route("/user/<int:user_id>", methods=["GET"])
+    def handle_user(request, user_id):
+        return b"user"
+
+    request = dummy_request.request
+    request.method = b"GET"
+    request.path = b"/user/5"
+
+    app.router.getChildWithDefault(None, request)
+    request.route_args["user_id"] = "mutated"
+    app.router.getChildWithDefault(None, request)
+    assert request.route_args == {"user_id": 5}
+    assert app.router.route_cache_info().hits == 1
+
+    request.path = b"/nowhere"
+    missed = set()
+    for _ in range(2):
+        missed.add(app.router.getChildWithDefault(None, request))
+        assert request.route_miss.code == 404
+
+    request.method = b"POST"
+    request.path = b"/user/5"
+    for _ in range(2):
+        missed.add(app.router.getChildWithDefault(None, request))
+        assert request.route_miss.code == 405
+        assert set(request.route_miss.valid_methods) == {"GET", "HEAD"}
+
+    # One resource answers every miss
+    assert len(missed) == 1
+
+    info = app.router.route_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (3, 3, 3)
+
+    @app.route("/nowhere")
+    def handle_nowhere(request):
+        return b"somewhere"
+
+    assert app.router.route_cache_info().currsize == 0
+
+
+def test_virtual_hosts_get_their_own_routing_table(dummy_request:RequestRetval):
+
+    app = App(__name__)
+
+    @app.route("/")
+    def handle_default(request):
+        return b"default"
+
+    @app.route("/", host="Tenant.Example.com")
+    def handle_tenant(request):
+        return b"tenant"
+
+    @app.route("/only-tenant/<int:item>", host="tenant.example.com")
+    def handle_tenant_item(request, item):
+        return b"item"
+
+    assert app.router.hosts == ["Tenant.Example.com"]
+    assert len(list(app.router.iter_rules())) == 1
+    assert len(list(app.router.iter_rules("tenant.example.com"))) == 2
+
+    request = dummy_request.request
+    request.method = b"GET"
+    request.path = b"/"
+    request.requestHeaders.setRawHeaders(b"host", [b"TENANT.example.com:8080"])
+    assert app.router._match(request).rule.endpoint == get_thing_name(handle_tenant)
+
+    request.path = b"/only-tenant/3"
+    assert app.router._match(request).kwargs == {"item": 3}
+
+    request.requestHeaders.setRawHeaders(b"host", [b"other.example.com"])
+    assert app.router._match(request).code == 404
+
+    request.path = b"/"
+    assert app.router._match(request).rule.endpoint == get_thing_name(handle_default)
+
+
+def test_plain_404s_share_one_prebuilt_exception():
+    assert RouteMiss(404).response_exception() is NOT_FOUND
+    assert RouteMiss(404).to_exception() is not NOT_FOUND
+    assert RouteMiss(405, valid_methods=("GET",)).response_exception().valid_methods == ("GET",)
+    assert RouteMiss(308, redirect="http://bench.local/files/").response_exception().redirect == \
+        "http://bench.local/files/"
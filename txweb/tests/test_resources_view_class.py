@@ -57,4 +57,25 @@ def test_pre_filter():
 
     resource = ViewClassResource(None, Stub())
     request = MockRequest([], "/")
-    resource.render(request)
\ No newline at end of file
+    resource.render(request)
+
+def test_dispatch_is_resolved_once_and_tolerates_method_case():
+    import pytest
+
+    class Stub():
+
+        def render_GET(self, request):
+            return b"get"
+
+    instance = Stub()
+    resource = ViewClassResource(None, instance)
+    # swapping methods on the instance after registration has no effect, the table was built up front
+    instance.render_GET = lambda request: b"changed"
+
+    request = MockRequest([], "/")
+    request.method = b"get"
+    assert resource.render(request) == b"get"
+
+    request.method = b"DELETE"
+    with pytest.raises(AssertionError):
+        resource.render(request)
@@ -1,4 +1,6 @@
 
+import dataclasses
+
 import pytest
 
 from txweb.util.basic import sanitize_render_output
@@ -19,4 +21,30 @@ def test_full_suite_coverage():
 
     assert sanitize_render_output(d) == NOT_DONE_YET
 
-    assert sanitize_render_output(123) == b"123"
\ No newline at end of file
+    assert sanitize_render_output(123) == b"123"
+
+
+def test_json_output_is_passed_through():
+
+    @dataclasses.dataclass
+    class Point:
+        x: int
+        y: int
+
+    data = {"a": 1}
+    assert sanitize_render_output(data) is data
+    assert sanitize_render_output([1, 2]) == [1, 2]
+    assert sanitize_render_output(Point(1, 2)) == Point(1, 2)
+
+    with pytest.raises(RuntimeError):
+        sanitize_render_output(Point)
+
+
+def test_stream_output_is_passed_through():
+    chunks = (chunk for chunk in [b"a", "b"])
+    assert sanitize_render_output(chunks) is chunks
+    assert sanitize_render_output(iter([b"a"])) is not None
+
+    # `return body, code` is a mistake, not a two chunk response
+    with pytest.raises(RuntimeError):
+        sanitize_render_output(("body", 200))
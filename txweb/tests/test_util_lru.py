@@ -0,0 +1,34 @@
+import pytest
+
+from txweb.util.lru import LRUCache
+
+
+def test_evicts_least_recently_used():
+
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.info() == (1, 0, 2, 2)
+
+
+def test_counts_misses_and_clears():
+
+    cache = LRUCache(4)
+    assert cache.get("nope", default=123) == 123
+    cache.set("a", 1)
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.info().misses == 1
+
+
+def test_rejects_bad_maxsize():
+
+    with pytest.raises(ValueError):
+        LRUCache(0)
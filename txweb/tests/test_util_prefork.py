@@ -0,0 +1,170 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from txweb.util import prefork
+
+pytestmark = pytest.mark.skipif(not Path("/proc/self/task").exists(), reason="reads child pids from /proc")
+
+SERVER = textwrap.dedent("""
+    import os, sys
+    from twisted.internet import reactor, task
+    from txweb import Application
+
+    app = Application(__name__)
+
+    @app.route("/pid")
+    def pid(request):
+        return str(os.getpid())
+
+    @app.route("/slow")
+    def slow(request):
+        return task.deferLater(reactor, 1.5, lambda: str(os.getpid()))
+
+    sys.exit(app.run(port=int(sys.argv[1]), workers=2, reuse_port=sys.argv[2] == "reuse"))
+""")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children_of(pid):
+    children = Path(f"/proc/{pid}/task/{pid}/children")
+    return {int(child) for child in children.read_text().split()} if children.exists() else set()
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.05)
+    raise AssertionError(f"Timed out waiting for {predicate}")
+
+
+def fetch_pid(port, path="/pid"):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+            return int(response.read())
+    except OSError:
+        return None
+
+
+@pytest.mark.parametrize("mode", ["shared", "reuse"])
+def test_run_with_workers_serves_from_supervised_children(tmp_path, mode):
+    if mode == "reuse" and hasattr(socket, "SO_REUSEPORT") is False:
+        pytest.skip("SO_REUSEPORT is not available")
+
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parents[2]))
+    server = subprocess.Popen([sys.executable, str(script), str(port), mode], env=env)
+
+    try:
+        workers = wait_for(lambda: children_of(server.pid) if len(children_of(server.pid)) == 2 else None)
+        assert wait_for(lambda: fetch_pid(port)) in workers
+
+        crashed = sorted(workers)[0]
+        os.kill(crashed, signal.SIGKILL)
+
+        replaced = wait_for(lambda: children_of(server.pid) if len(children_of(server.pid) - {crashed}) == 2 else None)
+        assert crashed not in replaced
+        assert wait_for(lambda: fetch_pid(port)) in replaced
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def test_reload_hands_the_socket_to_a_new_generation(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parents[2]))
+    server = subprocess.Popen([sys.executable, str(script), str(port), "shared"], env=env)
+
+    try:
+        old_workers = wait_for(lambda: children_of(server.pid) if len(children_of(server.pid)) == 2 else None)
+        assert wait_for(lambda: fetch_pid(port)) in old_workers
+
+        slow_result = []
+        slow_request = threading.Thread(target=lambda: slow_result.append(fetch_pid(port, "/slow")))
+        slow_request.start()
+        time.sleep(0.5)
+
+        server.send_signal(signal.SIGHUP)
+
+        # Nothing is refused while the generations change over
+        served_by = set()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and (children_of(server.pid) & old_workers or len(served_by) < 2):
+            served_by.add(fetch_pid(port))
+        assert None not in served_by
+
+        new_workers = children_of(server.pid)
+        assert len(new_workers) == 2 and not new_workers & old_workers
+
+        # The request in flight when the reload started was finished by the old worker
+        slow_request.join(10)
+        assert slow_result and slow_result[0] in old_workers
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def test_supervisor_rejects_zero_workers():
+    with pytest.raises(ValueError):
+        prefork.Supervisor(lambda slot: 0, 0)
+
+
+def test_exit_code_decodes_wait_statuses():
+    pid = os.fork()
+    if pid == 0:
+        os._exit(3)
+    assert prefork.exit_code(os.waitpid(pid, 0)[1]) == 3
+
+    pid = os.fork()
+    if pid == 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    assert prefork.exit_code(os.waitpid(pid, 0)[1]) == -signal.SIGKILL
+
+
+def test_reinit_reactor_keeps_triggers_registered_before_the_fork():
+    from twisted.internet.selectreactor import SelectReactor
+
+    reactor = SelectReactor()
+    calls = []
+    reactor.addSystemEventTrigger("before", "shutdown", calls.append, "before shutdown")
+    reactor.callWhenRunning(calls.append, "running")
+    own = {phase: len(getattr(reactor._eventTriggers["startup"], phase)) for phase in ("before", "during", "after")}
+
+    prefork.reinit_reactor(reactor)
+    try:
+        startup, shutdown = reactor._eventTriggers["startup"], reactor._eventTriggers["shutdown"]
+        assert startup.after == [(calls.append, ("running",), {})]
+        assert shutdown.before == [(calls.append, ("before shutdown",), {})]
+        # The reactor's own triggers are not doubled up
+        assert {phase: len(getattr(startup, phase)) for phase in ("before", "during", "after")} == own
+    finally:
+        reactor.waker.connectionLost(None)
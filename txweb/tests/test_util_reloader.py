@@ -0,0 +1,54 @@
+import sys
+import threading
+
+import pytest
+
+from txweb.util import reloader
+
+
+def watch_in_background(watcher, debounce):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(watcher.wait(debounce)), daemon=True)
+    thread.start()
+    return thread, result
+
+
+@pytest.mark.skipif(sys.platform.startswith("linux") is False, reason="inotify is Linux only")
+def test_inotify_watcher_sees_new_files_and_debounces(tmp_path):
+    (tmp_path / "app.py").write_text("x = 1")
+    (tmp_path / "test_app.py").write_text("")
+
+    watcher = reloader.InotifyWatcher([tmp_path], ignore_prefix="test_")
+    try:
+        assert len(watcher) == 1
+
+        thread, result = watch_in_background(watcher, debounce=0.3)
+        package = tmp_path / "package"
+        package.mkdir()
+        (package / "views.py").write_text("y = 2")
+        (tmp_path / "app.py").write_text("x = 2")
+        (tmp_path / "test_app.py").write_text("ignored")
+        (tmp_path / "notes.txt").write_text("ignored")
+
+        thread.join(5)
+        assert result == [{package / "views.py", tmp_path / "app.py"}]
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher_sees_new_and_deleted_files(tmp_path):
+    (tmp_path / "app.py").write_text("x = 1")
+    watcher = reloader.PollingWatcher([tmp_path], interval=0.05)
+    assert len(watcher) == 1
+
+    (tmp_path / "app.py").unlink()
+    (tmp_path / "new.py").write_text("y = 2")
+    assert watcher.wait(debounce=0.05) == {tmp_path / "app.py", tmp_path / "new.py"}
+
+
+def test_hidden_and_cache_directories_are_not_watched(tmp_path):
+    for directory in (".git", "__pycache__", "pkg"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "mod.py").write_text("")
+
+    assert set(reloader.PollingWatcher([tmp_path]).snapshot) == {tmp_path / "pkg" / "mod.py"}
@@ -135,3 +135,33 @@ def test_deferred_ask():
     assert tell_msg['type'] == "tell"
     assert tell_msg['args']['logic'] == 4
 
+
+
+def test_only_threaded_endpoints_are_answered_with_their_deferreds_result():
+    import json
+    from twisted.internet.defer import Deferred, succeed
+    from txweb.lib.thread_pools import THREAD_POOL_ID
+
+    @inlineCallbacks
+    def responds_itself(message):
+        yield succeed(None)
+        message.respond("answered")
+        return "ignored"
+
+    pending = Deferred()
+
+    def threaded(message):
+        return pending
+
+    setattr(threaded, THREAD_POOL_ID, "default")
+
+    protocol, factory = mock_protocol({"own": responds_itself, "threaded": threaded})
+
+    protocol.onMessage(mock_message(type="ask", endpoint="own", caller_id="1"), False)
+    assert [json.loads(captured.payload)["result"] for captured in protocol.messages] == ["answered"]
+
+    protocol.onMessage(mock_message(type="ask", endpoint="threaded", caller_id="2"), False)
+    assert len(protocol.messages) == 1
+    pending.callback("from a thread")
+    assert json.loads(protocol.messages[-1].payload) == {"caller_id": "2", "type": "response",
+                                                         "result": "from a thread"}
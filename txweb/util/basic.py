@@ -2,8 +2,10 @@
     Basic and common utility functions
 
 """
+import dataclasses
 import inspect
 import typing as T
+from collections import abc
 
 from twisted.internet import defer
 from twisted.web.server import NOT_DONE_YET
@@ -31,12 +33,35 @@ def get_thing_name(thing: T.Any) -> str:
     return return_value
 
 
-def sanitize_render_output(output: T.Any) -> T.Union[int, T.ByteString]:
+def is_json_output(output: T.Any) -> bool:
+    """
+        Is output a dict, list, or dataclass instance that StrRequest sends as a JSON response?
+    """
+    return isinstance(output, (dict, list)) or (dataclasses.is_dataclass(output) and not isinstance(output, type))
+
+
+def is_stream_output(output: T.Any) -> bool:
+    """
+        Is output a generator, async generator, or other iterable of chunks that StrRequest streams?
+
+        Tuples and sets are not, a view returning `body, code` is a mistake rather than a two chunk response.
+    """
+    if isinstance(output, (str, bytes, bytearray, dict, list, tuple, set, frozenset, defer.Deferred)):
+        return False
+
+    return isinstance(output, (abc.Iterable, abc.AsyncIterable))
+
+
+def sanitize_render_output(output: T.Any) -> T.Union[int, T.ByteString, T.Dict, T.List, T.Any]:
     """
         Attempt to sanitize output and return a value safe for twisted.web.server.Site to process
 
+        dicts, lists, and dataclass instances are returned as they are, StrRequest encodes them with the application's
+        JSON codec.   So are generators, async generators, and other iterables of chunks which StrRequest streams.
+
     :param output: the result of calling either a ViewClassResource or ViewFunctionResources render method
-    :return: Returns either a byte string or NOT_DONE_YET (has always been an int)
+    :return: Returns either a byte string, NOT_DONE_YET (has always been an int), a JSON response's data, or a
+        streamed response's chunks
     """
 
     if isinstance(output, defer.Deferred):
@@ -49,11 +74,52 @@ def sanitize_render_output(output: T.Any) -> T.Union[int, T.ByteString]:
         return_value = str(output).encode("utf-8")
     elif isinstance(output, bytes):
         return_value = output
+    elif is_json_output(output) or is_stream_output(output):
+        return output
     else:
-        raise RuntimeError(f"render outputted {type(output)}, expected bytes,str,int, or NOT_DONE_YET")
+        raise RuntimeError(f"render outputted {type(output)}, expected bytes,str,int,dict,list,dataclass, "
+                           "an iterable of chunks, or NOT_DONE_YET")
 
     assert isinstance(return_value, bytes) or \
         return_value == NOT_DONE_YET,\
         f"Bad response data {type(return_value)}-{return_value!r}"
 
     return return_value
+
+
+def is_async_output(output: T.Any) -> bool:
+    """
+        Is output the result of an `async def` view or a view that returned a Deferred?
+    """
+    return isinstance(output, defer.Deferred) or inspect.iscoroutine(output)
+
+
+def resolve_render_output(output: T.Any) -> T.Union[int, T.ByteString, defer.Deferred]:
+    """
+        sanitize_render_output for view resources which may also return a coroutine or Deferred.
+
+        Coroutines are wrapped in a Deferred (`defer.ensureDeferred`, the same as Deferred.fromCoroutine) and any
+        Deferred is handed back as is so StrRequest.render can wait for the real body, sanitize it, and finish the
+        request.
+
+    :param output: the result of calling a view
+    :return: bytes, NOT_DONE_YET, or a Deferred that fires with the view's eventual output
+    """
+    if isinstance(output, bytes):
+        return output
+    elif is_async_output(output):
+        return defer.ensureDeferred(output)
+
+    return sanitize_render_output(output)
+
+
+def then(output: T.Any, func: T.Callable[[T.Any], T.Any]) -> T.Any:
+    """
+        Apply func to a view's output now, or once it is available if the view is async.
+
+        Used by the view resources so post filters always see the real body rather than a coroutine.
+    """
+    if is_async_output(output):
+        return defer.ensureDeferred(output).addCallback(func)
+
+    return func(output)
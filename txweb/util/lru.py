@@ -0,0 +1,79 @@
+"""
+    A small bounded least-recently-used mapping.
+
+    functools.lru_cache only works for pure functions and offers no way to invalidate a single owner's entries
+    which is what the routing caches need.
+
+"""
+import typing as T
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", "hits,misses,maxsize,currsize")
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+        Bounded mapping that evicts the least recently used key once `maxsize` is reached.
+
+        Not thread safe, intended to be used from the reactor thread only.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 1:
+            raise ValueError(f"LRUCache maxsize must be at least 1, got {maxsize!r}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # type: T.Dict[T.Hashable, T.Any]
+
+    def get(self, key: T.Hashable, default: T.Any = None) -> T.Any:
+        """
+        Fetch `key` and mark it as recently used.
+
+        Returns
+        -------
+        The cached value or `default` if the key is not present
+        """
+        value = self._data.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: T.Hashable, value: T.Any) -> T.Any:
+        """
+        Store `value` under `key`, evicting the oldest entry if the cache is full.
+
+        Returns
+        -------
+        The value that was stored
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """
+            Drop every entry, the hit and miss counters are left alone.
+        """
+        self._data.clear()
+
+    def info(self) -> CacheInfo:
+        """
+            Mimics functools.lru_cache's cache_info
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __contains__(self, key: T.Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
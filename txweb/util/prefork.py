@@ -0,0 +1,457 @@
+"""
+    Pre-forking process supervisor used by `Application.run(workers=N)`
+
+    The parent process binds the listening socket, forks N children that each run their own reactor and accept on that
+    same socket (or, with `reuse_port`, on their own SO_REUSEPORT socket bound to the same address), and then stays
+    behind as a supervisor:
+
+    * a child that dies without being asked to is replaced
+    * SIGTERM and SIGINT stop every child and then the parent, children still running after `stop_timeout` are killed
+    * SIGHUP reloads, see below
+    * SIGUSR1 and SIGUSR2 are forwarded to every child
+
+    The supervisor never runs a reactor.   Everything loaded before `Supervisor.run` (views, the frozen route table,
+    templates) is shared copy-on-write by all of the children.
+
+    Reloading
+    ---------
+    On SIGHUP the supervisor re-executes its own command line, keeping its pid, its children, and the listening socket,
+    which is handed to the new program through the TXWEB_LISTEN_FD environment variable.   The new program (with
+    whatever code is now on disk) forks a new generation of children on that same socket and, once they are all
+    accepting, sends SIGTERM to the previous generation, listed in TXWEB_RETIRING_PIDS.   Those stop accepting, finish
+    what they are serving (see `Application.drain`), and exit, so no connection is refused or dropped in between.
+
+    Children sharing the parent's socket hand over without losing anything, with `reuse_port` connections still
+    waiting in a retiring child's own accept queue when it closes its socket are reset by the kernel.
+
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import typing as T
+
+from ..log import getLogger
+
+log = getLogger(__name__)
+
+# Signals passed on to every child as is
+FORWARDED_SIGNALS = (signal.SIGUSR1, signal.SIGUSR2)
+# Signals that stop the children and then the supervisor
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+# Starts a new generation of children on the same socket and retires the current one
+RELOAD_SIGNAL = signal.SIGHUP
+# Passed from a reloading supervisor to its re-executed self
+LISTEN_FD_ENV = "TXWEB_LISTEN_FD"
+RETIRING_PIDS_ENV = "TXWEB_RETIRING_PIDS"
+# prctl(2) option, have the kernel signal a child when its parent dies
+PR_SET_PDEATHSIG = 1
+
+
+def exit_code(status: int) -> int:
+    """
+        A waitpid status as an exit code, minus the signal number for a child killed by a signal.
+
+        The same as os.waitstatus_to_exitcode, which is not available before Python 3.9.
+    """
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+
+    return status
+
+
+def bind_socket(port: int, interface: str = "127.0.0.1", backlog: int = 50, reuse_port: bool = False,
+                listen: bool = True) -> socket.socket:
+    """
+        Create and bind a TCP socket the way twisted's listenTCP would.
+
+    Parameters
+    ----------
+    port: int
+    interface: str
+        IPv4 or IPv6 address to bind to
+    backlog: int
+    reuse_port: bool
+        Set SO_REUSEPORT so several processes can bind the same address and the kernel spreads connections between them
+    listen: bool
+        Start listening right away, a socket that only reserves the address for SO_REUSEPORT siblings must not
+    """
+    family = socket.AF_INET6 if ":" in interface else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            if hasattr(socket, "SO_REUSEPORT") is False:
+                raise EnvironmentError("SO_REUSEPORT is not supported on this platform")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        sock.bind((interface, port))
+        if listen:
+            sock.listen(backlog)
+        sock.setblocking(False)
+    except Exception:
+        sock.close()
+        raise
+
+    return sock
+
+
+def inherited_socket() -> T.Optional[socket.socket]:
+    """
+        The listening socket handed over by a reloading supervisor, None if this process was started normally.
+    """
+    fileno = os.environ.pop(LISTEN_FD_ENV, None)
+    if not fileno:
+        return None
+
+    # Type and family are read from the descriptor itself
+    sock = socket.socket(fileno=int(fileno))
+    sock.set_inheritable(False)
+    sock.setblocking(False)
+    return sock
+
+
+def retiring_pids() -> T.List[int]:
+    """
+        Children of the previous generation left for this process to retire after a reload.
+    """
+    pids = os.environ.pop(RETIRING_PIDS_ENV, "")
+    return [int(pid) for pid in pids.split(",") if pid]
+
+
+def reinit_reactor(twisted_reactor) -> None:
+    """
+        Give a freshly forked child a reactor of its own.
+
+        The reactor object is created when twisted.internet.reactor is first imported, so a child inherits its
+        poller (eg the epoll instance) and waker pipe from the parent, and those are shared with every other child
+        until replaced here.   Must be called before the reactor is run.
+
+        Re-initializing the reactor also resets its system event triggers, the ones registered before the fork
+        (addSystemEventTrigger and callWhenRunning from warm up hooks, imported modules, and the like) are added back
+        to the new reactor in their original order.   Only the reactor's own triggers are left for it to re-add.
+    """
+    if twisted_reactor.running:
+        raise RuntimeError("Cannot reinitialize a running reactor")
+
+    # Only this process's copies of the descriptors are closed, the poller itself must not be touched as it is
+    # still shared with the parent and every other child
+    waker = getattr(twisted_reactor, "waker", None)
+    if waker is not None:
+        waker.connectionLost(None)
+
+    poller = getattr(twisted_reactor, "_poller", None)
+    if poller is not None and hasattr(poller, "close"):
+        poller.close()
+
+    carried = []
+    for event_type, event in getattr(twisted_reactor, "_eventTriggers", {}).items():
+        for phase in ("before", "during", "after"):
+            for trigger, args, kwargs in getattr(event, phase):
+                if getattr(trigger, "__self__", None) is not twisted_reactor:
+                    carried.append((phase, event_type, trigger, args, kwargs))
+
+    twisted_reactor.__init__()
+
+    for phase, event_type, trigger, args, kwargs in carried:
+        twisted_reactor.addSystemEventTrigger(phase, event_type, trigger, *args, **kwargs)
+
+
+def set_parent_death_signal(signum: int = signal.SIGTERM) -> bool:
+    """
+        Ask the kernel to send `signum` to this process if the supervisor dies, Linux only.
+
+    Returns
+    -------
+    True if the request was accepted
+    """
+    if sys.platform.startswith("linux") is False:
+        return False
+
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return False
+
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    return libc.prctl(PR_SET_PDEATHSIG, signum, 0, 0, 0) == 0
+
+
+class Supervisor:
+    """
+        Forks `workers` children running `worker_main(slot)` and keeps that many alive until told to stop.
+    """
+
+    # Seconds between checks on the children
+    POLL_INTERVAL: T.ClassVar[float] = 0.1
+    # A child that dies sooner than this after starting is restarted no faster than once per MIN_RESTART_DELAY
+    MIN_UPTIME: T.ClassVar[float] = 1.0
+    MIN_RESTART_DELAY: T.ClassVar[float] = 1.0
+    # After a reload the previous generation is retired once every new child called notify_ready, or after this long
+    READY_TIMEOUT: T.ClassVar[float] = 10.0
+
+    def __init__(self, worker_main: T.Callable[[int], T.Optional[int]], workers: int, stop_timeout: float = 30.0,
+                 listen_fd: int = None):
+        """
+        Parameters
+        ----------
+        worker_main: callable
+            Runs in each child with the child's slot number (0..workers-1), its return value is the exit code
+        workers: int
+        stop_timeout: float
+            Seconds children get to exit after a stop signal before they are killed
+        listen_fd: int
+            The listening socket's descriptor, kept open for the new program when reloading
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers!r}")
+
+        self.worker_main = worker_main
+        self.workers = workers
+        self.stop_timeout = stop_timeout
+        self.listen_fd = listen_fd
+
+        # pid -> (slot, started)
+        self.children = {}  # type: T.Dict[int, T.Tuple[int, float]]
+        # The previous generation's children, still running until the current generation is ready
+        self.retiring = set(retiring_pids())  # type: T.Set[int]
+        self.restarts = 0
+        self.ready = 0
+        self._stopping = None  # type: T.Optional[float]
+        self._retiring_since = None  # type: T.Optional[float]
+        self._retiring_killed = False
+        self._reload_requested = False
+        self._ready_pipe = None  # type: T.Optional[T.Tuple[int, int]]
+        self._previous_handlers = {}  # type: T.Dict[int, T.Any]
+        # slot of a dead child -> earliest time it may be restarted
+        self._not_before = {}  # type: T.Dict[int, float]
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping is not None
+
+    def spawn(self, slot: int) -> int:
+        """
+            Fork a child for `slot`, only returns in the parent.
+        """
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - the child never returns from here
+            exit_code = 1
+            try:
+                if self._ready_pipe is not None:
+                    os.close(self._ready_pipe[0])
+                self._restore_signals()
+                set_parent_death_signal()
+                exit_code = self.worker_main(slot) or 0
+            except SystemExit as exc:
+                exit_code = exc.code if isinstance(exc.code, int) else 1
+            except BaseException:  # pylint: disable=W0703
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)  # pylint: disable=W0212
+
+        self.children[pid] = (slot, time.monotonic())
+        return pid
+
+    def notify_ready(self) -> None:
+        """
+            Called in a child once it is accepting connections.
+        """
+        if self._ready_pipe is not None:
+            os.write(self._ready_pipe[1], b".")
+
+    def stop(self, signum: int = signal.SIGTERM) -> None:
+        """
+            Stop every child with `signum` and exit once they are gone.
+        """
+        if self._stopping is None:
+            self._stopping = time.monotonic()
+            self.signal_children(signum)
+
+    def signal_children(self, signum: int) -> None:
+        for pid in list(self.children) + list(self.retiring):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reload(self) -> None:
+        """
+            Replace this program with a fresh copy of itself that takes over the socket and the children.
+
+            Only returns if the exec failed, this process then carries on with the current generation.
+        """
+        if self.listen_fd is not None:
+            os.set_inheritable(self.listen_fd, True)
+            os.environ[LISTEN_FD_ENV] = str(self.listen_fd)
+        os.environ[RETIRING_PIDS_ENV] = ",".join(str(pid) for pid in list(self.children) + list(self.retiring))
+
+        # sys.orig_argv keeps interpreter options and `-m module` intact
+        argv = [sys.executable] + (getattr(sys, "orig_argv", None) or [sys.executable] + sys.argv)[1:]
+        log.info("Reloading with {argv}", argv=argv)
+
+        self._restore_signals()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            os.execv(sys.executable, argv)
+        except OSError as exc:
+            log.error("Reload failed, keeping the current workers: {exc}", exc=exc)
+            os.environ.pop(LISTEN_FD_ENV, None)
+            os.environ.pop(RETIRING_PIDS_ENV, None)
+            if self.listen_fd is not None:
+                os.set_inheritable(self.listen_fd, False)
+            self._install_signals()
+
+    def _handle_signal(self, signum: int, _frame) -> None:
+        if signum in STOP_SIGNALS:
+            self.stop(signal.SIGTERM)
+        elif signum == RELOAD_SIGNAL:
+            # exec'ing from inside a signal handler would skip the main loop's bookkeeping
+            self._reload_requested = True
+        else:
+            self.signal_children(signum)
+
+    def _install_signals(self) -> None:
+        for signum in STOP_SIGNALS + FORWARDED_SIGNALS + (RELOAD_SIGNAL,):
+            self._previous_handlers[signum] = signal.signal(signum, self._handle_signal)
+
+    def _restore_signals(self) -> None:
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler if handler is not None else signal.SIG_DFL)
+        self._previous_handlers.clear()
+
+    def reap(self) -> T.List[T.Tuple[int, int, float, int]]:
+        """
+            Collect every child that exited since the last call, retired children are only logged.
+
+        Returns
+        -------
+        [(pid, slot, started, exit code or -signal number)]
+        """
+        exited = []
+        while self.children or self.retiring:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                # Nothing left to wait for, eg retiring pids that were not this process's children after all
+                self.retiring.clear()
+                break
+
+            if pid == 0:
+                break
+
+            if pid in self.children:
+                slot, started = self.children.pop(pid)
+                exited.append((pid, slot, started, exit_code(status)))
+            elif pid in self.retiring:
+                self.retiring.discard(pid)
+                log.info("Retired worker {pid} exited with {exit_code}", pid=pid,
+                         exit_code=exit_code(status))
+
+        return exited
+
+    def run(self) -> int:
+        """
+            Fork the children and supervise them until stopped.
+
+        Returns
+        -------
+        0 for a clean stop, 1 if children had to be killed
+        """
+        self._install_signals()
+        self._ready_pipe = os.pipe()
+        os.set_blocking(self._ready_pipe[0], False)
+        killed = False
+        started = time.monotonic()
+        try:
+            for slot in range(self.workers):
+                self.spawn(slot)
+
+            while self.children or self.retiring:
+                if self._reload_requested and self.stopping is False:
+                    self._reload_requested = False
+                    self.reload()
+
+                for pid, slot, child_started, exit_code in self.reap():
+                    self._child_exited(pid, slot, child_started, exit_code)
+
+                self._read_ready()
+                self._retire(started)
+
+                if self.stopping and killed is False and time.monotonic() - self._stopping > self.stop_timeout:
+                    log.warn("Killing {count} children that did not stop in time",
+                             count=len(self.children) + len(self.retiring))
+                    self.signal_children(signal.SIGKILL)
+                    killed = True
+
+                self._restart_pending()
+                time.sleep(self.POLL_INTERVAL)
+        finally:
+            self._restore_signals()
+            for fd in self._ready_pipe:
+                os.close(fd)
+            self._ready_pipe = None
+
+        return 1 if killed else 0
+
+    def _read_ready(self) -> None:
+        try:
+            self.ready += len(os.read(self._ready_pipe[0], 1024))
+        except BlockingIOError:
+            pass
+
+    def _retire(self, started: float) -> None:
+        if not self.retiring or self.stopping:
+            return
+
+        now = time.monotonic()
+        if self._retiring_since is None:
+            if self.ready >= self.workers or now - started > self.READY_TIMEOUT:
+                log.info("Retiring the previous generation {pids}", pids=sorted(self.retiring))
+                self._retiring_since = now
+                for pid in list(self.retiring):
+                    try:
+                        os.kill(pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+        elif self._retiring_killed is False and now - self._retiring_since > self.stop_timeout:
+            log.warn("Killing {count} retired children that did not stop in time", count=len(self.retiring))
+            for pid in list(self.retiring):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            self._retiring_killed = True
+
+    def _child_exited(self, pid: int, slot: int, started: float, exit_code: int) -> None:
+        if self.stopping:
+            return
+
+        log.error("Worker {pid} (slot {slot}) exited with {exit_code}, restarting it", pid=pid, slot=slot,
+                  exit_code=exit_code)
+
+        # A child that crashes on startup would otherwise be restarted in a tight loop
+        now = time.monotonic()
+        self._not_before[slot] = now + (self.MIN_RESTART_DELAY if now - started < self.MIN_UPTIME else 0)
+
+    def _restart_pending(self) -> None:
+        if self.stopping:
+            return
+
+        now = time.monotonic()
+        for slot, not_before in list(self._not_before.items()):
+            if now >= not_before:
+                del self._not_before[slot]
+                self.restarts += 1
+                pid = self.spawn(slot)
+                log.info("Worker {pid} started for slot {slot}", pid=pid, slot=slot)
@@ -31,10 +31,22 @@
 
     recopied from https://gist.github.com/devdave/05de2ed2fa2aa0a09ba931db36314e3e
 
+    On Linux changes are picked up through inotify, which also sees files created after the reloader started, elsewhere
+    (or when inotify is unavailable) the tree is rescanned every second.   Either way a burst of changes, like a
+    checkout or a save-all, is folded into a single reload.
+
+    This is for development only, every reload drops whatever was in flight.   In production run the application
+    with `Application.run(workers=N)` and send the supervisor SIGHUP to deploy, see txweb.util.prefork.
+
 """
 import typing as T
+import ctypes
+import ctypes.util
+import errno
 import pathlib
 import os
+import select
+import struct
 import sys
 import time
 
@@ -83,6 +95,28 @@ except ImportError:
 WATCH_LIST = {}
 _win = (sys.platform == "win32")
 
+# Seconds without further changes before a reload, so a burst of changes only reloads once
+DEBOUNCE = 0.2
+# Seconds between scans for the polling watcher
+POLL_INTERVAL = 1.0
+# Directories never watched
+SKIP_DIRS = ("__pycache__",)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event without its variable length name
+INOTIFY_EVENT = struct.Struct("iIII")
+
 
 def build_list(
         root_dir: T.Union[pathlib.Path, str],
@@ -167,12 +201,264 @@ def file_changed() -> bool:
     return change_detected
 
 
-def watch_thread(os_exit: bool = SENTINEL_OS_EXIT, watch_self: bool = False, ignore_prefix=None):
+def is_watched(pathobj: pathlib.Path, ignore_prefix: T.Union[str, T.List[str], None] = None) -> bool:
+    """
+        Should changes to this file trigger a reload, ie is it a .py file not matching ignore_prefix
+
+    :param pathobj: the file
+    :param ignore_prefix: a prefix or list of prefixes of file names to ignore
+    :return: bool
+    """
+    if pathobj.suffix != ".py":
+        return False
+    elif isinstance(ignore_prefix, list):
+        return not any(pathobj.name.startswith(prefix) for prefix in ignore_prefix)
+    elif ignore_prefix is not None:
+        return not pathobj.name.startswith(ignore_prefix)
+
+    return True
+
+
+def walk_dirs(root_dir: pathlib.Path) -> T.Iterator[T.Tuple[pathlib.Path, T.List[str]]]:
+    """
+        Yields every directory from root_dir down along with its file names, skipping hidden directories
+        (.git, .venv, .tox...) and __pycache__
+
+    :param root_dir: pathlib.Path
+    :return: iterator of (directory, [file name])
+    """
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".") and name not in SKIP_DIRS]
+        yield pathlib.Path(dirpath), filenames
+
+
+class PollingWatcher:
+    """
+        Portable fallback, rescans the watched directories every POLL_INTERVAL seconds.
+
+        Every scan walks the directories again so files created after the watcher started are picked up.
+
+    """
+
+    def __init__(self, roots: T.Iterable[pathlib.Path], ignore_prefix=None, interval: float = POLL_INTERVAL):
+        self.roots = [pathlib.Path(root) for root in roots]
+        self.ignore_prefix = ignore_prefix
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def scan(self) -> T.Dict[pathlib.Path, T.Tuple[float, ...]]:
+        """
+            Size, created & modified timestamps of every watched file.   Windows changes the ctime instead of the
+            mtime so that is all that is compared there.
+
+        :return: {path: (st_size, st_ctime, st_mtime)}
+        """
+        found = {}
+        for root in self.roots:
+            for directory, filenames in walk_dirs(root):
+                for name in filenames:
+                    pathobj = directory / name
+                    if is_watched(pathobj, self.ignore_prefix) is False:
+                        continue
+
+                    try:
+                        stat = pathobj.stat()
+                    except FileNotFoundError:
+                        continue
+
+                    found[pathobj] = (stat.st_size, stat.st_ctime) if _win else \
+                        (stat.st_size, stat.st_ctime, stat.st_mtime)
+        return found
+
+    def changes(self) -> T.Set[pathlib.Path]:
+        """
+            Files created, changed, or deleted since the last call
+
+        :return: set of paths
+        """
+        current = self.scan()
+        changed = {pathobj for pathobj in set(current) | set(self.snapshot)
+                   if current.get(pathobj) != self.snapshot.get(pathobj)}
+        self.snapshot = current
+        return changed
+
+    def wait(self, debounce: float = DEBOUNCE) -> T.Set[pathlib.Path]:
+        """
+            Block until something changes and then until it has been quiet for `debounce` seconds
+
+        :return: every file that changed
+        """
+        changed = set()
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.changes()
+
+        while True:
+            time.sleep(debounce)
+            more = self.changes()
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+        Linux only, the kernel reports changes through inotify(7) instead of every file being stat'ed over and over.
+
+        One watch is added per directory, new directories get their own watch as they are created.
+
+    """
+
+    def __init__(self, roots: T.Iterable[pathlib.Path], ignore_prefix=None):
+        """
+        :param roots: directories to watch, recursively
+        :param ignore_prefix: see is_watched
+        :raises EnvironmentError: when inotify is not available
+        """
+        if sys.platform.startswith("linux") is False:
+            raise EnvironmentError("inotify is only available on Linux")
+
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise EnvironmentError("Unable to find libc for inotify")
+
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.ignore_prefix = ignore_prefix
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise EnvironmentError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.roots = [pathlib.Path(root) for root in roots]
+        # watch descriptor -> directory
+        self.watches = {}  # type: T.Dict[int, pathlib.Path]
+        self.files = 0
+        try:
+            for root in self.roots:
+                self.files += len(self.add_tree(root))
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.files
+
+    def add_tree(self, root_dir: pathlib.Path) -> T.List[pathlib.Path]:
+        """
+            Watch root_dir and every directory below it
+
+        :return: the watched files found, for a new directory these were created before its watch was
+        """
+        found = []
+        for directory, filenames in walk_dirs(root_dir):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise EnvironmentError(error, "Out of inotify watches, raise fs.inotify.max_user_watches")
+                # Removed again before it could be watched
+                continue
+
+            self.watches[wd] = directory
+            found.extend(directory / name for name in filenames if is_watched(directory / name, self.ignore_prefix))
+
+        return found
+
+    def read_events(self, timeout: T.Optional[float]) -> T.Set[pathlib.Path]:
+        """
+            Wait up to `timeout` seconds (forever if None) for events
+
+        :return: the watched files they were about, empty if there were none or none were relevant
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0"))
+            offset += INOTIFY_EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, nothing better to do than assume something relevant changed
+                changed.update(self.roots)
+                continue
+            elif mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+
+            pathobj = directory / name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self.add_tree(pathobj))
+            elif is_watched(pathobj, self.ignore_prefix):
+                changed.add(pathobj)
+
+        return changed
+
+    def wait(self, debounce: float = DEBOUNCE) -> T.Set[pathlib.Path]:
+        """
+            Block until something changes and then until it has been quiet for `debounce` seconds
+
+        :return: every file that changed
+        """
+        changed = set()
+        while not changed:
+            changed = self.read_events(None)
+
+        while True:
+            more = self.read_events(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def make_watcher(roots: T.Iterable[pathlib.Path], ignore_prefix=None,
+                 use_inotify: bool = True) -> T.Union[InotifyWatcher, PollingWatcher]:
+    """
+        An InotifyWatcher where possible, otherwise a PollingWatcher
+
+    :param roots: directories to watch
+    :param ignore_prefix: see is_watched
+    :param use_inotify: False to always poll, eg for network filesystems inotify can't see changes on
+    :return: the watcher
+    """
+    roots = list(roots)
+    if use_inotify:
+        try:
+            return InotifyWatcher(roots, ignore_prefix=ignore_prefix)
+        except EnvironmentError as exc:
+            log.warning("RELOADER: inotify unavailable (%s), falling back to polling", exc)
+
+    return PollingWatcher(roots, ignore_prefix=ignore_prefix)
+
+
+def watch_thread(os_exit: bool = SENTINEL_OS_EXIT, watch_self: bool = False, ignore_prefix=None,
+                 debounce: float = DEBOUNCE, use_inotify: bool = True):
     """
 
     :param os_exit: flag to decide whether to use sys.exit or os._exit
     :param watch_self: Should reloader watch its own source code
     :param ignore_prefix: Ignore files starting with this prefix
+    :param debounce: seconds to wait for a burst of changes to end before reloading
+    :param use_inotify: False to always use the polling watcher
     :return:
 
     """
@@ -181,14 +467,19 @@ def watch_thread(os_exit: bool = SENTINEL_OS_EXIT, watch_self: bool = False, ign
     exit_func = os._exit if os_exit is True else sys.exit
     base_path = pathlib.Path(os.getcwd())
     print(f"RELOADER: Base is {base_path}")
-    build_list(base_path, watch_self=watch_self, ignore_prefix=ignore_prefix)
-    print(f"RELOADER: Watching {len(WATCH_LIST)} files for changes")
 
-    while True:
-        if file_changed():
-            exit_func(SENTINEL_CODE)
+    roots = [base_path]
+    if watch_self is True:
+        log.info("RELOADER: Watching self")
+        roots.append(pathlib.Path(txweb.__file__).parent.absolute())
+
+    watcher = make_watcher(roots, ignore_prefix=ignore_prefix, use_inotify=use_inotify)
+    print(f"RELOADER: Watching {len(watcher)} files for changes with {watcher.__class__.__name__}")
 
-        time.sleep(1)
+    changed = watcher.wait(debounce)
+    watcher.close()
+    print(f"RELOADING - {', '.join(str(pathobj) for pathobj in sorted(changed))} changed")
+    exit_func(SENTINEL_CODE)
 
 
 def run_reloader():
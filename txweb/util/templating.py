@@ -78,3 +78,26 @@ def render(template_pathname, **template_args):  # pragma: no cover
         raise EnvironmentError("Jinja2 environment not initialized, call initialize_jinja2 first")
 
     return JINJA2_ENV.get_template(template_pathname).render(**template_args)
+
+
+def precompile_templates() -> int:  # pragma: no cover
+    """
+    Load and compile every template the environment can find, eg before forking worker processes so they share the
+    compiled templates instead of each compiling their own on first use.
+
+    :return: the number of templates compiled, 0 if initialize_jinja2 has not been called
+
+    """
+    if JINJA2_ENV is None:
+        return 0
+
+    names = JINJA2_ENV.list_templates()
+    capacity = getattr(JINJA2_ENV.cache, "capacity", None)
+    if capacity is not None and len(names) > capacity:
+        # keep them all, the default cache would otherwise evict the first ones compiled
+        JINJA2_ENV.cache = type(JINJA2_ENV.cache)(len(names))
+
+    for name in names:
+        JINJA2_ENV.get_template(name)
+
+    return len(names)
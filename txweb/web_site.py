@@ -7,17 +7,20 @@ from __future__ import annotations
 
 #stdlib
 import typing as T
+import weakref
 # import pathlib
 # import copy
 
 # twisted imports
 from twisted.python import failure
-from twisted.web import server
+from twisted.web import http, server
 
 # txweb imports
 # import txweb
 # from txweb import resources as txw_resources
 from txweb.lib.str_request import StrRequest
+from txweb.lib.multipart import BodyLimits
+from txweb.lib.json_codec import JSONCodec, DEFAULT_CODEC
 # from txweb.lib import view_class_assembler as vca
 from txweb.resources import RoutingResource
 # from txweb import http_codes as HTTP_Errors
@@ -48,7 +51,17 @@ class WebSite(server.Site):
         super().__init__(routing_resource, requestFactory=request_factory)
 
         self._errorHandler = siteErrorHandler
+        self._missHandler = None
         self._lastError = None
+        # Every request and connection this site created that is still referenced somewhere, see in_flight
+        self._requests = weakref.WeakSet()  # type: T.MutableSet[StrRequest]
+        self._channels = weakref.WeakSet()  # type: T.MutableSet[T.Any]
+        # Connections that have had at least one request
+        self._used_channels = weakref.WeakSet()  # type: T.MutableSet[http.HTTPChannel]
+        # Request body limits for routes that did not set their own
+        self.default_body_limits = BodyLimits()
+        # Used by request.json and writeJSON, see Application.json_codec
+        self.json_codec = DEFAULT_CODEC  # type: JSONCodec
 
         # self._before_request_render = None
         # self._after_request_render = None
@@ -73,6 +86,30 @@ class WebSite(server.Site):
             self.my_log.error("Exception {exc!r} occurred while handling {reason!r}", exc=exc, reason=reason)
             raise
 
+    def processingMiss(self, request: StrRequest, miss):
+        """
+            Counterpart to processingFailed for requests that did not match any route.   No exception was raised
+            so unless the application provides a miss handler, one is built here and sent down the normal
+            error chain.
+
+        :param request:
+        :param miss: txweb.resources.routing.RouteMiss
+        :return:
+        """
+        if self._missHandler is not None:
+            return self._missHandler(request, miss)
+
+        return self.processingFailed(request, failure.Failure(miss.to_exception()))
+
+    def setMissHandler(self, func: T.Callable[[StrRequest, T.Any], T.Any]):
+        """
+            Like setErrorHandler, called by the Txweb application so unmatched routes can skip building a Failure
+        :param func:
+        :return:
+        """
+        self._missHandler = func
+        return func
+
     def setErrorHandler(self, func: ErrorHandler):
         """
             Kind of goofy, this should only be called by the Txweb application error handler so it can
@@ -83,3 +120,68 @@ class WebSite(server.Site):
         self._errorHandler = func
         return func
 
+    def body_limits(self, request: StrRequest) -> BodyLimits:
+        """
+            The body limits for request, called by the request as soon as its headers are in.
+
+            The routing resource is asked for the limits of the route the request will go to, routes without any of
+            their own get default_body_limits.
+        """
+        route_limits = getattr(self.resource, "body_limits", None)
+        if route_limits is None:
+            return self.default_body_limits
+
+        return route_limits(request, self.default_body_limits)
+
+    def streams_body(self, request: StrRequest) -> bool:
+        """
+            Should request be processed as soon as its headers are in, see txweb.lib.body_stream
+        """
+        route_streams = getattr(self.resource, "streams_body", None)
+        return route_streams is not None and route_streams(request)
+
+    def buildProtocol(self, addr):
+        channel = super().buildProtocol(addr)
+        self._channels.add(channel)
+        return channel
+
+    def track_request(self, request: StrRequest) -> None:
+        """
+            Called by the request factory for every new request so in_flight can find it.
+        """
+        self._requests.add(request)
+        if request.channel is not None:
+            self._used_channels.add(request.channel)
+
+    @property
+    def in_flight(self) -> T.List[StrRequest]:
+        """
+            Requests that are still being answered, ie a view returned NOT_DONE_YET or a Deferred.
+
+            Websocket upgrade requests are left out, the websocket protocol took their connection over and they are
+            never finished.
+        """
+        return [request for request in list(self._requests)
+                if not request.finished and not request._disconnected  # pylint: disable=W0212
+                and request.channel is not None and request.channel.transport is not None]
+
+    @property
+    def connections(self) -> T.List[http.HTTPChannel]:
+        """
+            Open HTTP connections, websockets that took their connection over are left out.
+        """
+        # buildProtocol returns a proxy, requests only know the HTTPChannel it wraps
+        channels = [getattr(protocol, "_channel", protocol) for protocol in list(self._channels)]
+        return [channel for channel in channels
+                if getattr(channel, "transport", None) is not None
+                and not getattr(channel.transport, "disconnected", False)]
+
+    def close_idle_connections(self) -> None:
+        """
+            Close every keep-alive connection that is between requests once its output is flushed.
+
+            Connections that have not sent their first request yet are left open for it.
+        """
+        for channel in self.connections:
+            if not getattr(channel, "requests", None) and channel in self._used_channels:
+                channel.transport.loseConnection()